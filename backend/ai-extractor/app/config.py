@@ -10,10 +10,54 @@ class Settings(BaseSettings):
     OPENAI_MODEL: str = "gpt-5"
     OPENAI_MAX_TOKENS: int = 4000
     OPENAI_TEMPERATURE: float = 0.1  # Low for consistency
+    OPENAI_BASE_URL: str | None = None  # Override to point at a local fake server
+    OPENAI_TIMEOUT: float = 120.0
+
+    # OpenAI rate limiting (per replica)
+    OPENAI_MAX_CONCURRENCY: int = 8  # upper bound for the adaptive (AIMD) limit
+    OPENAI_MIN_CONCURRENCY: int = 1
+    OPENAI_REQUESTS_PER_MINUTE: int = 500  # 0 disables the budget
+    OPENAI_TOKENS_PER_MINUTE: int = 200000  # 0 disables the budget
+    OPENAI_INPUT_TOKEN_ESTIMATE: int = 3000  # prompt + image tokens assumed before a call
+    OPENAI_MAX_RETRIES: int = 4  # retries on 429
 
     # Storage Path (must match vostra-api)
     STORAGE_PATH: str = "./storage/vostra-invoice-web/uploads"
 
+    # PDF rendering process pool
+    RENDER_WORKERS: int = 0  # 0 = one process per CPU
+    RENDER_QUEUE_SIZE: int = 16  # renders allowed to wait for a worker before 503
+
+    # Multi-page PDFs
+    PDF_MAX_PAGES: int = 50  # pages beyond this are not sent to the model
+    PDF_PAGES_PER_REQUEST: int = 8  # pages rendered and sent per OpenAI request
+
+    # PDF input: "auto" sends the text layer of born-digital PDFs instead of an image,
+    # "text+image" sends it alongside a low-res image, "image" always rasterizes
+    PDF_INPUT_MODE: str = "auto"
+    PDF_TEXT_MIN_CHARS: int = 100  # per page, below this the page is treated as a scan
+    PDF_TEXT_IMAGE_DPI: int = 72  # image resolution in text+image mode
+
+    # Image encoding for rendered pages and uploaded images
+    # (compare settings with benchmarks/render_settings.py)
+    PDF_RENDER_DPI: int = 200
+    IMAGE_FORMAT: str = "png"  # png | jpeg | webp (webp needs Pillow)
+    IMAGE_QUALITY: int = 85  # jpeg/webp quality
+    IMAGE_GRAYSCALE: bool = False
+    IMAGE_MAX_PIXELS: int = 0  # downscale images above this many pixels (0 = no cap)
+
+    # Extraction result cache (keyed by file hash + model + prompt version + extraction settings)
+    EXTRACTION_CACHE_ENABLED: bool = True
+    EXTRACTION_CACHE_PATH: str = "./storage/vostra-invoice-web/extraction-cache"  # keep on a persistent volume
+    EXTRACTION_CACHE_MAX_BYTES: int = 256 * 1024 * 1024  # 256MB
+
+    # Tracing (OpenTelemetry; continues the API's trace via traceparent, see app.utils.tracing)
+    TRACING_EXPORTER: str = "none"  # none | file | otlp
+    TRACING_FILE_PATH: str = "./traces/ai-extractor.jsonl"
+    TRACING_OTLP_ENDPOINT: str = "http://localhost:4318/v1/traces"
+    TRACING_SAMPLE_RATIO: float = 1.0  # fraction of traces started here (calls from the API follow its decision)
+    TRACING_SERVICE_NAME: str = "vostra-ai-extractor"
+
     # Environment
     ENVIRONMENT: str = "development"
 
@@ -1,9 +1,18 @@
-from fastapi import FastAPI, HTTPException
+import asyncio
+from fastapi import FastAPI, HTTPException, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from pydantic import BaseModel
 from pathlib import Path
 from app.config import get_settings
-from app.services.openai_extractor import extract_from_pdf_or_image
-from app.utils.file_loader import load_file_as_base64, load_xml_file
+from app.services.openai_extractor import extract_stored_file
+from app.services.extraction_cache import extraction_cache
+from app.services.rate_limiter import openai_limiter
+from app.services import extraction_stats
+from app.services.einvoice_parser import parse_einvoice
+from app.utils.render_pool import start_render_pool, stop_render_pool
+from app.utils.file_loader import resolve_stored_file
+from app.utils.metrics import stage, EXTRACTIONS
+from app.utils.tracing import setup_tracing, shutdown_tracing
 
 settings = get_settings()
 
@@ -14,6 +23,13 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Spans for requests, extraction stages and OpenAI calls (TRACING_EXPORTER, off by default)
+setup_tracing(app)
+
+
+# Bounds the file_type label of vostra_extractor_extractions_total
+SUPPORTED_EXTENSIONS = {'.xml', '.pdf', '.png', '.jpg', '.jpeg'}
+
 
 class ExtractRequest(BaseModel):
     """Request model for extraction"""
@@ -29,6 +45,19 @@ class ExtractResponse(BaseModel):
     error: str | None = None
 
 
+@app.on_event("startup")
+async def startup_event():
+    """Start and warm the PDF render process pool"""
+    start_render_pool()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the PDF render process pool and flush buffered spans"""
+    stop_render_pool()
+    shutdown_tracing()
+
+
 @app.get("/")
 async def root():
     """Root endpoint"""
@@ -46,10 +75,36 @@ async def health_check():
     return {
         "status": "healthy",
         "model": settings.OPENAI_MODEL,
-        "openai_configured": bool(settings.OPENAI_API_KEY and settings.OPENAI_API_KEY != "sk-your-openai-api-key-here")
+        "openai_configured": bool(settings.OPENAI_API_KEY and settings.OPENAI_API_KEY != "sk-your-openai-api-key-here"),
+        "openai_limiter": openai_limiter.stats()
     }
 
 
+@app.get("/cache/stats")
+async def cache_stats():
+    """Extraction cache hit/miss counters and size"""
+    return extraction_cache.stats()
+
+
+@app.get("/stats")
+async def request_stats():
+    """Latency, token usage and payload size per input path (text / text+image / image)"""
+    return extraction_stats.snapshot()
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics (stage histograms, extraction/OpenAI counters, token usage)"""
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+@app.delete("/cache")
+async def purge_cache():
+    """Purge the extraction cache (call after changing the extraction prompt)"""
+    removed = extraction_cache.purge()
+    return {"removed": removed}
+
+
 @app.post("/extract", response_model=ExtractResponse)
 async def extract_invoice(request: ExtractRequest):
     """
@@ -58,7 +113,7 @@ async def extract_invoice(request: ExtractRequest):
     Process:
     1. Load file from storage
     2. Determine file type (PDF/PNG vs XML)
-    3. Call appropriate extractor (OpenAI Vision vs PEPPOL parser)
+    3. Call appropriate extractor (OpenAI vs PEPPOL/Svefaktura parser)
     4. Return structured JSON
 
     Args:
@@ -67,29 +122,34 @@ async def extract_invoice(request: ExtractRequest):
     Returns:
         ExtractResponse with extracted data or error
     """
+    file_ext = Path(request.file_path).suffix.lower()
+    status = "error"
     try:
-        # Determine file type from extension
-        file_ext = Path(request.file_path).suffix.lower()
+        with stage("total", {"invoice.id": request.invoice_id, "file.type": file_ext}):
+            response = await _extract(request, file_ext)
+        status = response.status
+        return response
+    finally:
+        file_type = file_ext.lstrip(".") if file_ext in SUPPORTED_EXTENSIONS else "other"
+        EXTRACTIONS.labels(status, file_type, settings.OPENAI_MODEL).inc()
+
 
+async def _extract(request: ExtractRequest, file_ext: str) -> ExtractResponse:
+    """Route the file to the e-invoice parser or the OpenAI extractor by extension"""
+    try:
         if file_ext in ['.xml']:
-            # TODO: Implement PEPPOL XML parser
-            # xml_content = load_xml_file(request.file_path)
-            # raw_ai_data = parse_peppol_xml(xml_content)
+            # PEPPOL BIS 3 / Svefaktura: parsed directly, no OpenAI call
+            raw_ai_data = await asyncio.to_thread(parse_einvoice, resolve_stored_file(request.file_path))
+
             return ExtractResponse(
                 invoice_id=request.invoice_id,
-                status="failed",
-                error="PEPPOL XML parsing not yet implemented"
+                status="success",
+                raw_ai_data=raw_ai_data
             )
 
         elif file_ext in ['.pdf', '.png', '.jpg', '.jpeg']:
-            # Load file and extract with OpenAI Vision
-            base64_content, mime_type = load_file_as_base64(request.file_path)
-
-            raw_ai_data = await extract_from_pdf_or_image(
-                request.file_path,
-                base64_content,
-                mime_type
-            )
+            # Extract with OpenAI (the file is read once, inside the extractor)
+            raw_ai_data = await extract_stored_file(request.file_path)
 
             return ExtractResponse(
                 invoice_id=request.invoice_id,
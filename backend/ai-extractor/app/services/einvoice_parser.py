@@ -0,0 +1,375 @@
+"""
+Deterministic parser for structured e-invoices (no OpenAI call)
+
+Supports UBL 2.1 / PEPPOL BIS Billing 3.0 (Invoice and CreditNote) and
+Svefaktura 1.0 (UBL 1.0 based). The document is read with iterparse: every
+element is cleared as soon as its text has been captured, and finished
+top-level elements are dropped, so memory does not grow with the number of
+invoice lines. Attachments (AdditionalDocumentReference, usually base64 PDFs)
+and extensions are skipped: ElementTree still holds an attachment's text while
+that element is parsed, but it is dropped at its end tag and never recorded.
+
+The result has the same structure as the OpenAI extraction (raw_ai_data);
+fields that are not in the document are omitted. Credit note amounts and
+quantities are negated, like they are printed on a credit note.
+"""
+import re
+import xml.etree.ElementTree as ET
+
+LINE_ELEMENTS = {"InvoiceLine", "CreditNoteLine"}
+
+# Containers that can repeat; each occurrence is kept as its own dict
+REPEATED_ELEMENTS = {
+    "TaxSubtotal", "TaxSubTotal",  # PEPPOL / Svefaktura spelling
+    "PaymentMeans",
+    "PartyTaxScheme",
+    "AllowanceCharge",
+}
+
+# Not used in the result; attachments and signatures can be megabytes of text
+SKIPPED_ELEMENTS = {"AdditionalDocumentReference", "UBLExtensions"}
+
+ROOT_ELEMENTS = {"Invoice", "CreditNote"}
+
+# Svefaktura identifies payment accounts by clearing house
+BANKGIRO_IDS = {"BGABSESS", "SE:BANKGIRO"}
+PLUSGIRO_IDS = {"PGSISESS", "SE:PLUSGIRO"}
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _read(full_file_path: str) -> tuple[int, dict, list[dict]]:
+    """
+    Stream the document into (sign, header record, invoice lines)
+
+    A record maps "/"-joined element paths (relative to the record) to text;
+    attributes are stored as "<path>@<name>"; repeated containers are stored
+    as lists of records under their path. Lines are mapped as soon as they are
+    complete, so their raw records are not kept.
+    """
+    stack: list[str] = []
+    records: list[tuple[int, dict]] = []  # (depth, record) of open containers
+    header: dict = {}
+    lines: list[dict] = []
+    root = None
+    root_name = ""
+    skip_depth = 0  # depth of the skipped element being read, 0 if none
+
+    for event, elem in ET.iterparse(full_file_path, events=("start", "end")):
+        name = _local(elem.tag)
+
+        if event == "start":
+            if root is None:
+                root, root_name = elem, name
+                if name not in ROOT_ELEMENTS:
+                    raise ValueError(f"Not a UBL/Svefaktura invoice (root element: {name})")
+            stack.append(name)
+            if skip_depth:
+                continue
+            if name in SKIPPED_ELEMENTS:
+                skip_depth = len(stack)
+            elif (name in LINE_ELEMENTS and len(stack) == 2) or name in REPEATED_ELEMENTS:
+                records.append((len(stack), {}))
+            continue
+
+        depth = len(stack)
+        record_depth, record = records[-1] if records else (1, header)
+
+        if skip_depth:
+            if depth == skip_depth:
+                skip_depth = 0
+
+        elif records and record_depth == depth:
+            # A line or repeated container is complete
+            records.pop()
+            if name in LINE_ELEMENTS and depth == 2:
+                lines.append(_line(record, len(lines) + 1, _sign(root_name, header)))
+            else:
+                parent_depth, parent = records[-1] if records else (1, header)
+                parent.setdefault("/".join(stack[parent_depth:]), []).append(record)
+
+        elif depth > 1 and len(elem) == 0:
+            key = "/".join(stack[record_depth:])
+            text = (elem.text or "").strip()
+            if text:
+                if key not in record:
+                    record[key] = text
+                elif name == "Note":
+                    record[key] += "\n" + text
+            for attr, value in elem.attrib.items():
+                record.setdefault(f"{key}@{_local(attr)}", value)
+
+        stack.pop()
+        elem.clear()
+        if depth == 2:
+            root.clear()  # drop finished top-level elements
+
+    return _sign(root_name, header), header, lines
+
+
+def _sign(root_name: str, header: dict) -> int:
+    """-1 for credit notes (the type code precedes the lines in both formats)"""
+    type_code = _first(header, "InvoiceTypeCode", "CreditNoteTypeCode")
+    return -1 if root_name == "CreditNote" or type_code == "381" else 1
+
+
+def _first(record: dict, *keys: str):
+    """Value of the first key present in record"""
+    for key in keys:
+        if record.get(key) not in (None, ""):
+            return record[key]
+    return None
+
+
+def _number(value: str | None) -> float | None:
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def _org_number(value: str | None) -> str | None:
+    """Format Swedish org numbers as XXXXXX-XXXX (other identifiers unchanged)"""
+    if value is None:
+        return None
+    digits = re.sub(r"\D", "", value)
+    if len(digits) == 10:
+        return f"{digits[:6]}-{digits[6:]}"
+    return value
+
+
+def _compact(data):
+    """Drop None/empty values, like the model is told to omit missing fields"""
+    if isinstance(data, dict):
+        compacted = {key: _compact(value) for key, value in data.items()}
+        return {key: value for key, value in compacted.items() if value not in (None, "", [], {})}
+    if isinstance(data, list):
+        return [_compact(item) for item in data]
+    return data
+
+
+def _period(record: dict, prefix: str) -> str | None:
+    start = record.get(f"{prefix}/StartDate")
+    end = record.get(f"{prefix}/EndDate")
+    if start and end:
+        return f"{start} - {end}"
+    return start or end
+
+
+def _address(party: dict) -> tuple[str | None, str | None]:
+    """(single-line address, country code) of a party"""
+    for prefix in ("PostalAddress", "Address"):
+        street = ", ".join(
+            part for part in (
+                party.get(f"{prefix}/StreetName"),
+                party.get(f"{prefix}/AdditionalStreetName"),
+                party.get(f"{prefix}/Postbox"),
+            ) if part
+        )
+        city = " ".join(part for part in (party.get(f"{prefix}/PostalZone"), party.get(f"{prefix}/CityName")) if part)
+        address = ", ".join(part for part in (street, city) if part)
+        if address:
+            return address, party.get(f"{prefix}/Country/IdentificationCode")
+    return None, None
+
+
+def _party(header: dict, *prefixes: str) -> dict:
+    """Party fields under the first prefix present in the document, relative to that prefix"""
+    for prefix in prefixes:
+        party = {
+            key[len(prefix) + 1:]: value
+            for key, value in header.items()
+            if key.startswith(prefix + "/")
+        }
+        if party:
+            return party
+    return {}
+
+
+def _tax_schemes(party: dict) -> dict[str, str]:
+    """Tax scheme id (VAT, SWT, ...) -> CompanyID"""
+    return {
+        (scheme.get("TaxScheme/ID") or "VAT").upper(): scheme.get("CompanyID")
+        for scheme in party.get("PartyTaxScheme", [])
+        if scheme.get("CompanyID")
+    }
+
+
+def _supplier(header: dict) -> dict:
+    party = _party(header, "AccountingSupplierParty/Party", "SellerParty/Party")
+    schemes = _tax_schemes(party)
+    address, country = _address(party)
+    vat_number = schemes.get("VAT")
+    org_number = _first(party, "PartyLegalEntity/CompanyID", "PartyIdentification/ID") or schemes.get("SWT")
+
+    return {
+        "name": _first(party, "PartyName/Name", "PartyLegalEntity/RegistrationName"),
+        "org_number": _org_number(org_number),
+        "vat_number": vat_number,
+        "address": address,
+        "country": country,
+        "phone": party.get("Contact/Telephone"),
+        "email": party.get("Contact/ElectronicMail"),
+        "website": party.get("WebsiteURI"),
+    }
+
+
+def _buyer(header: dict) -> dict:
+    party = _party(header, "AccountingCustomerParty/Party", "BuyerParty/Party")
+    address, _country = _address(party)
+
+    return {
+        "name": _first(party, "PartyName/Name", "PartyLegalEntity/RegistrationName"),
+        "contact": party.get("Contact/Name"),
+        "address": address,
+        "org_number": _org_number(_first(party, "PartyLegalEntity/CompanyID") or _tax_schemes(party).get("SWT")),
+        "customer_number": party.get("PartyIdentification/ID"),
+    }
+
+
+def _payment(header: dict, supplier: dict) -> dict:
+    """Payment method, OCR and accounts from the PaymentMeans elements"""
+    payment: dict = {}
+    methods = []
+
+    for means in header.get("PaymentMeans", []):
+        account = means.get("PayeeFinancialAccount/ID")
+        institution = (_first(
+            means,
+            "PayeeFinancialAccount/FinancialInstitutionBranch/ID",
+            "PayeeFinancialAccount/FinancialInstitutionBranch/FinancialInstitution/ID",
+        ) or "").upper()
+        payment.setdefault("ocr_number", _first(means, "PaymentID", "PayeeFinancialAccount/PaymentInstructionID"))
+
+        if not account:
+            continue
+        if institution in BANKGIRO_IDS:
+            supplier.setdefault("bankgiro", account)
+            methods.append("Bankgiro")
+        elif institution in PLUSGIRO_IDS:
+            supplier.setdefault("plusgiro", account)
+            methods.append("Plusgiro")
+        elif re.fullmatch(r"[A-Z]{2}\d{2}[A-Z0-9]{10,30}", account.replace(" ", "")):
+            payment.setdefault("iban", account)
+            supplier.setdefault("iban", account)
+            if institution:
+                payment.setdefault("bic", institution)
+                supplier.setdefault("bic", institution)
+            methods.append("IBAN")
+
+    if methods:
+        payment["payment_method"] = "/".join(dict.fromkeys(methods))
+    return payment
+
+
+def _line(raw: dict, number: int, sign: int) -> dict:
+    quantity = _number(_first(raw, "InvoicedQuantity", "CreditedQuantity"))
+    amount = _number(raw.get("LineExtensionAmount"))
+    vat_rate = _number(_first(raw, "Item/ClassifiedTaxCategory/Percent", "Item/TaxCategory/Percent"))
+
+    unit_price = _number(_first(raw, "Price/PriceAmount", "Item/BasePrice/PriceAmount"))
+    base_quantity = _number(_first(raw, "Price/BaseQuantity"))
+    if unit_price is not None and base_quantity:
+        unit_price = unit_price / base_quantity
+
+    description = _first(raw, "Item/Name", "Item/Description", "Note")
+    details = raw.get("Item/Description")
+    if details and details != description:
+        description = f"{description} - {details}"
+
+    return {
+        "line_number": number,
+        "description": description,
+        "period": _period(raw, "InvoicePeriod"),
+        "quantity": sign * quantity if quantity is not None else None,
+        "unit": _first(
+            raw,
+            "InvoicedQuantity@unitCode", "CreditedQuantity@unitCode", "InvoicedQuantity@quantityUnitCode"
+        ),
+        "unit_price": unit_price,
+        "amount": sign * amount if amount is not None else None,
+        "vat_rate": int(vat_rate) if vat_rate is not None and vat_rate.is_integer() else vat_rate,
+        "vat_amount": round(sign * amount * vat_rate / 100, 2) if amount is not None and vat_rate is not None else None,
+        "cost_center": raw.get("AccountingCost"),
+    }
+
+
+def parse_einvoice(full_file_path: str) -> dict:
+    """
+    Parse a PEPPOL BIS 3 / UBL 2.1 or Svefaktura invoice
+
+    Args:
+        full_file_path: Full path to XML file
+
+    Returns:
+        Invoice data in the raw_ai_data structure
+
+    Raises:
+        ValueError: If the document is not a supported invoice
+        xml.etree.ElementTree.ParseError: If the XML is malformed
+    """
+    sign, header, lines = _read(full_file_path)
+
+    def amount(*keys: str) -> float | None:
+        value = _number(_first(header, *keys))
+        return sign * value if value is not None else None
+
+    supplier = _supplier(header)
+    payment = _payment(header, supplier)
+    due_date = header.get("DueDate") or next((
+        _first(means, "PaymentDueDate", "DuePaymentDate")
+        for means in header.get("PaymentMeans", [])
+        if _first(means, "PaymentDueDate", "DuePaymentDate")
+    ), None)
+
+    vat_breakdown = []
+    for subtotal in header.get("TaxTotal/TaxSubtotal", []) + header.get("TaxTotal/TaxSubTotal", []):
+        rate = _number(_first(subtotal, "TaxCategory/Percent"))
+        taxable = _number(subtotal.get("TaxableAmount"))
+        vat = _number(subtotal.get("TaxAmount"))
+        vat_breakdown.append({
+            "rate": int(rate) if rate is not None and rate.is_integer() else rate,
+            "taxable_amount": sign * taxable if taxable is not None else None,
+            "vat_amount": sign * vat if vat is not None else None,
+        })
+
+    result = {
+        "invoice_number": header.get("ID"),
+        "invoice_date": header.get("IssueDate"),
+        "due_date": due_date,
+        "delivery_date": _first(header, "Delivery/ActualDeliveryDate", "Delivery/ActualDeliveryDateTime"),
+        "supplier": supplier,
+        "buyer": _buyer(header),
+        "contract_number": _first(header, "ContractDocumentReference/ID"),
+        "order_number": _first(header, "OrderReference/ID", "OrderReference/BuyersID"),
+        "reference": _first(
+            header,
+            "BuyerReference",
+            "RequisitionistDocumentReference/ID",
+            "BuyerParty/Party/Contact/Name",
+            "AccountingCustomerParty/Party/Contact/Name",
+        ),
+        "lines": lines,
+        "subtotal": amount("LegalMonetaryTotal/LineExtensionAmount", "LegalTotal/LineExtensionTotalAmount"),
+        "vat_breakdown": vat_breakdown,
+        "vat_amount": amount("TaxTotal/TaxAmount", "TaxTotal/TotalTaxAmount"),
+        "rounding_adjustment": amount("LegalMonetaryTotal/PayableRoundingAmount", "LegalTotal/RoundOffAmount"),
+        "total": amount(
+            "LegalMonetaryTotal/PayableAmount",
+            "LegalMonetaryTotal/TaxInclusiveAmount",
+            "LegalTotal/TaxInclusiveTotalAmount",
+        ),
+        "currency": _first(header, "DocumentCurrencyCode", "InvoiceCurrencyCode"),
+        "payment_terms": _first(header, "PaymentTerms/Note"),
+        "period": _period(header, "InvoicePeriod"),
+        "notes": header.get("Note"),
+        **payment,
+    }
+    if sign < 0:
+        result["document_type"] = "credit_note"
+
+    return _compact(result)
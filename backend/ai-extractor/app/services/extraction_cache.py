@@ -0,0 +1,186 @@
+"""
+On-disk cache of extraction results
+
+Entries are keyed by SHA-256 of the file content + OpenAI model + prompt version,
+so retries and re-uploads of the same file skip the OpenAI call. Total size is
+capped; least recently used entries (by mtime, refreshed on every hit) are evicted
+first. Safe to share between uvicorn workers: writes are atomic renames.
+"""
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from uuid import uuid4
+from app.config import get_settings
+
+settings = get_settings()
+
+def content_sha256(data) -> str:
+    """
+    Compute SHA-256 of file contents
+
+    Args:
+        data: File contents as bytes or a buffer (e.g. an mmap from map_file)
+
+    Returns:
+        Hex digest
+    """
+    return hashlib.sha256(data).hexdigest()
+
+
+class ExtractionCache:
+    """Size-capped LRU cache of extraction results stored as JSON files"""
+
+    def __init__(self, path: str, max_bytes: int, enabled: bool = True):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self._size: int | None = None  # lazily computed total size on disk
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(content_hash: str, model: str, prompt_version: str) -> str:
+        """Build cache key from file hash, model and prompt version"""
+        return hashlib.sha256(f"{content_hash}:{model}:{prompt_version}".encode()).hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.path / key[:2] / f"{key}.json"
+
+    def _entries(self) -> list[os.DirEntry]:
+        if not self.path.exists():
+            return []
+        entries = []
+        for shard in os.scandir(self.path):
+            if shard.is_dir():
+                entries.extend(e for e in os.scandir(shard.path) if e.name.endswith(".json"))
+        return entries
+
+    def get(self, key: str) -> dict | None:
+        """
+        Look up a cached result and mark it as recently used
+
+        Args:
+            key: Cache key from make_key
+
+        Returns:
+            Cached raw_ai_data, or None on miss
+        """
+        if not self.enabled:
+            return None
+
+        entry = self._entry_path(key)
+        try:
+            with open(entry, "r", encoding="utf-8") as f:
+                result = json.load(f)
+            os.utime(entry)  # refresh LRU position
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return result
+
+    def put(self, key: str, result: dict) -> None:
+        """
+        Store a result, evicting least recently used entries above max_bytes
+
+        Args:
+            key: Cache key from make_key
+            result: Extracted raw_ai_data
+        """
+        if not self.enabled:
+            return
+
+        entry = self._entry_path(key)
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        payload = json.dumps(result, ensure_ascii=False).encode("utf-8")
+
+        temp = entry.with_name(f".{uuid4()}.tmp")
+        with open(temp, "wb") as f:
+            f.write(payload)
+        try:
+            replaced = entry.stat().st_size  # re-extraction of a cached file
+        except FileNotFoundError:
+            replaced = 0
+        os.replace(temp, entry)
+
+        with self._lock:
+            self.writes += 1
+            if self._size is None:
+                self._size = sum(e.stat().st_size for e in self._entries())
+            else:
+                self._size += len(payload) - replaced
+
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        """Delete oldest entries until the cache fits in max_bytes"""
+        entries = []
+        for e in self._entries():
+            try:
+                stat = e.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, e.path))
+        entries.sort()
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+                self.evictions += 1
+            except FileNotFoundError:
+                pass
+            total -= size
+
+        self._size = total
+
+    def purge(self) -> int:
+        """
+        Delete all entries (e.g. after the prompt changed)
+
+        Returns:
+            Number of entries removed
+        """
+        removed = 0
+        with self._lock:
+            for e in self._entries():
+                try:
+                    os.unlink(e.path)
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+            self._size = 0
+        return removed
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current size"""
+        entries = self._entries()
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "entries": len(entries),
+            "size_bytes": sum(e.stat().st_size for e in entries),
+            "max_bytes": self.max_bytes
+        }
+
+
+# Shared cache instance
+extraction_cache = ExtractionCache(
+    path=settings.EXTRACTION_CACHE_PATH,
+    max_bytes=settings.EXTRACTION_CACHE_MAX_BYTES,
+    enabled=settings.EXTRACTION_CACHE_ENABLED
+)
@@ -0,0 +1,89 @@
+"""
+Per-input-path extraction statistics
+
+Every model request is recorded under its input path ("text", "text+image" or
+"image") with latency (page preparation + OpenAI call), token usage and payload
+size, so the text-layer fast path can be compared with rasterized images.
+Token usage is also counted in vostra_extractor_openai_tokens_total (/metrics).
+"""
+import logging
+
+from app.config import get_settings
+from app.utils.metrics import OPENAI_TOKENS
+from app.utils.tracing import current_trace_id
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+_stats: dict[str, dict] = {}
+
+
+def usage_tokens(response) -> tuple[int, int]:
+    """
+    Get (input_tokens, output_tokens) from a Chat Completions or Responses API response
+    """
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return 0, 0
+    input_tokens = getattr(usage, "prompt_tokens", None) or getattr(usage, "input_tokens", 0) or 0
+    output_tokens = getattr(usage, "completion_tokens", None) or getattr(usage, "output_tokens", 0) or 0
+    return input_tokens, output_tokens
+
+
+def record_request(
+    input_path: str,
+    pages: int,
+    seconds: float,
+    input_tokens: int,
+    output_tokens: int,
+    payload_bytes: int
+) -> None:
+    """
+    Record one model request
+
+    Args:
+        input_path: "text", "text+image" or "image"
+        pages: Pages (or images) covered by the request
+        seconds: Preparation + OpenAI call latency
+        input_tokens: Prompt tokens reported by OpenAI
+        output_tokens: Completion tokens reported by OpenAI
+        payload_bytes: Size of text + base64 images sent
+    """
+    stats = _stats.setdefault(input_path, {
+        "requests": 0,
+        "pages": 0,
+        "seconds": 0.0,
+        "input_tokens": 0,
+        "output_tokens": 0,
+        "payload_bytes": 0
+    })
+    stats["requests"] += 1
+    stats["pages"] += pages
+    stats["seconds"] += seconds
+    stats["input_tokens"] += input_tokens
+    stats["output_tokens"] += output_tokens
+    stats["payload_bytes"] += payload_bytes
+
+    OPENAI_TOKENS.labels(settings.OPENAI_MODEL, input_path, "input").inc(input_tokens)
+    OPENAI_TOKENS.labels(settings.OPENAI_MODEL, input_path, "output").inc(output_tokens)
+
+    logger.info(
+        "extraction request path=%s pages=%d latency=%.2fs input_tokens=%d output_tokens=%d payload_bytes=%d trace_id=%s",
+        input_path, pages, seconds, input_tokens, output_tokens, payload_bytes, current_trace_id()
+    )
+
+
+def snapshot() -> dict:
+    """Totals and per-request averages by input path"""
+    result = {}
+    for input_path, stats in _stats.items():
+        requests = stats["requests"] or 1
+        result[input_path] = {
+            **stats,
+            "seconds": round(stats["seconds"], 3),
+            "avg_seconds": round(stats["seconds"] / requests, 3),
+            "avg_input_tokens": round(stats["input_tokens"] / requests),
+            "avg_output_tokens": round(stats["output_tokens"] / requests),
+            "avg_payload_bytes": round(stats["payload_bytes"] / requests)
+        }
+    return result
@@ -1,12 +1,21 @@
 import json
 from pathlib import Path
-from openai import OpenAI
+from openai import AsyncOpenAI
 from fastapi import HTTPException
 from app.config import get_settings
-from app.utils.pdf_converter import pdf_to_base64
+from app.services.multipage import extract_pdf, extract_image
+from app.services.rate_limiter import call_openai, openai_unavailable
+from app.utils.metrics import stage
 
 settings = get_settings()
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
+
+# 429 retries are handled by call_openai so the limiter can back off
+client = AsyncOpenAI(
+    api_key=settings.OPENAI_API_KEY,
+    base_url=settings.OPENAI_BASE_URL,
+    timeout=settings.OPENAI_TIMEOUT,
+    max_retries=0
+)
 
 
 COMPREHENSIVE_PROMPT = """Du är en expert på att läsa och extrahera data från svenska fakturor.
@@ -113,74 +122,99 @@ VIKTIGT:
 """
 
 
-async def extract_with_gpt5(full_file_path: str) -> dict:
+async def _call_gpt5(images: list[str], notes: list[str | None]) -> tuple[dict, object]:
+    """
+    Send one request with invoice images and/or page text to GPT-5
+
+    Args:
+        images: Base64 data URLs, in page order
+        notes: Extra prompt texts (page range, text layer); None entries are skipped
+
+    Returns:
+        Tuple of (parsed JSON from the model, raw API response)
+    """
+    content = [{"type": "input_text", "text": COMPREHENSIVE_PROMPT}]
+    for note in notes:
+        if note:
+            content.append({"type": "input_text", "text": note})
+    for data_url in images:
+        content.append({"type": "input_image", "image_url": data_url})
+
+    # Call GPT-5 Responses API
+    response = await call_openai(
+        lambda: client.responses.create(
+            model=settings.OPENAI_MODEL,
+            input=[
+                {
+                    "type": "message",
+                    "role": "user",
+                    "content": content
+                }
+            ],
+            reasoning={"effort": "medium"},
+            text={"verbosity": "medium"}
+        ),
+        estimated_tokens=settings.OPENAI_INPUT_TOKEN_ESTIMATE * max(len(images), 1) + settings.OPENAI_MAX_TOKENS
+    )
+
+    # Extract content from response
+    with stage("json_parse"):
+        text = response.output_text if hasattr(response, 'output_text') else str(response)
+
+        # Parse JSON
+        if "```json" in text:
+            text = text.split("```json")[1].split("```")[0].strip()
+        elif "```" in text:
+            text = text.split("```")[1].split("```")[0].strip()
+
+        result = json.loads(text)
+
+    return result, response
+
+
+async def extract_with_gpt5(full_file_path: str, data=None) -> dict:
     """
     Extract invoice data using GPT-5 with Responses API
 
+    PDFs are prepared PDF_PAGES_PER_REQUEST pages at a time (up to PDF_MAX_PAGES);
+    born-digital pages are sent as positioned text (see PDF_INPUT_MODE), scans
+    as images. Each batch is one request and the results are merged.
+
     Args:
         full_file_path: Full path to invoice file (PDF or image)
+        data: File contents already in memory (e.g. an mmap from map_file);
+            images are encoded from it instead of re-reading the file
 
     Returns:
         Extracted invoice data as dictionary
 
     Raises:
-        HTTPException: If extraction fails
+        HTTPException: Unsupported file type, or OpenAI unavailable (503/504)
+        ValueError: The model's answer is not valid JSON
+        RuntimeError: Any other failure extracting this invoice
     """
     try:
         file_ext = Path(full_file_path).suffix.lower()
 
-        # Convert PDF to PNG if needed
         if file_ext == '.pdf':
-            base64_content = pdf_to_base64(full_file_path)
+            return await extract_pdf(full_file_path, _call_gpt5)
+
         elif file_ext in ['.png', '.jpg', '.jpeg']:
-            # Load image directly
-            import base64
-            with open(full_file_path, "rb") as f:
-                base64_content = base64.b64encode(f.read()).decode('utf-8')
+            return await extract_image(full_file_path, data, _call_gpt5)
+
         else:
             raise HTTPException(
                 status_code=400,
                 detail=f"Unsupported file type: {file_ext}"
             )
 
-        # Call GPT-5 Responses API
-        response = client.responses.create(
-            model=settings.OPENAI_MODEL,
-            input=[
-                {
-                    "type": "message",
-                    "role": "user",
-                    "content": [
-                        {"type": "input_text", "text": COMPREHENSIVE_PROMPT},
-                        {"type": "input_image", "image_url": f"data:image/png;base64,{base64_content}"}
-                    ]
-                }
-            ],
-            reasoning={"effort": "medium"},
-            text={"verbosity": "medium"}
-        )
-
-        # Extract content from response
-        content = response.output_text if hasattr(response, 'output_text') else str(response)
-
-        # Parse JSON
-        if "```json" in content:
-            content = content.split("```json")[1].split("```")[0].strip()
-        elif "```" in content:
-            content = content.split("```")[1].split("```")[0].strip()
-
-        result = json.loads(content)
-        return result
-
     except HTTPException:
         raise
     except json.JSONDecodeError as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Failed to parse JSON from GPT-5 response: {str(e)}"
-        )
+        # Unreadable answer for this invoice: reported as status "failed"
+        raise ValueError(f"Failed to parse JSON from GPT-5 response: {str(e)}") from e
     except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"GPT-5 extraction failed: {str(e)}"
-        )
+        outage = openai_unavailable(e)
+        if outage is not None:
+            raise outage from e
+        raise RuntimeError(f"GPT-5 extraction failed: {str(e)}") from e
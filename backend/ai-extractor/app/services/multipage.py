@@ -0,0 +1,193 @@
+"""
+Helpers for extracting multi-page invoices in page batches
+
+Long PDFs are sent to the model PDF_PAGES_PER_REQUEST pages at a time, as images
+and/or positioned text. Each batch returns a full invoice JSON; the batches are
+merged into one result with all lines in page order.
+
+The request loop (extract_pdf, extract_image) is shared by the GPT-4 and GPT-5
+extractors, which only supply a ModelCall that builds and sends their request.
+"""
+import time
+from typing import Awaitable, Callable
+
+from app.utils.render_pool import iter_pdf_page_batches, encode_image
+from app.services.extraction_stats import record_request, usage_tokens
+
+# One model request: (image data URLs, prompt notes) -> (parsed JSON, raw API response)
+ModelCall = Callable[[list[str], list[str | None]], Awaitable[tuple[dict, object]]]
+
+# Totals are usually printed on the last page. They are taken together from one
+# batch, so a subtotal carried over on a middle page is not mixed with the total
+TOTAL_FIELDS = ("subtotal", "vat_breakdown", "vat_amount", "rounding_adjustment", "total")
+
+
+def page_note(first_page: int, last_page: int, page_count: int) -> str | None:
+    """
+    Tell the model which pages of the invoice it is looking at
+
+    Args:
+        first_page: First page in this batch (1-based)
+        last_page: Last page in this batch (1-based)
+        page_count: Total pages in the document
+
+    Returns:
+        Prompt text, or None for single-page invoices
+    """
+    if page_count <= 1:
+        return None
+    if first_page == 1 and last_page == page_count:
+        return f"Fakturan har {page_count} sidor. Alla sidor bifogas nedan i ordning."
+    return (
+        f"Fakturan har {page_count} sidor. Nedan följer sida {first_page}-{last_page}. "
+        f"Extrahera alla fakturarader som syns på dessa sidor."
+    )
+
+
+def text_layer_note(texts: list[str], first_page: int) -> str:
+    """
+    Format positioned page text for the prompt
+
+    Args:
+        texts: Positioned text per page (from page_positioned_text)
+        first_page: Page number of texts[0] (1-based)
+
+    Returns:
+        Prompt text with one section per page
+    """
+    sections = [
+        "Fakturans textlager (en rad per textrad, med x,y-position i punkter från sidans övre vänstra hörn):"
+    ]
+    for offset, text in enumerate(texts):
+        sections.append(f"--- Sida {first_page + offset} ---\n{text}")
+    return "\n\n".join(sections)
+
+
+def _is_empty(value) -> bool:
+    return value is None or value == "" or value == [] or value == {}
+
+
+def _totals_source(results: list[dict]) -> dict:
+    """The last batch with a total, else the last batch with any total field"""
+    for result in reversed(results):
+        if not _is_empty(result.get("total")):
+            return result
+    for result in reversed(results):
+        if any(not _is_empty(result.get(key)) for key in TOTAL_FIELDS):
+            return result
+    return {}
+
+
+def merge_page_results(results: list[dict]) -> dict:
+    """
+    Merge per-batch extraction results into one invoice
+
+    - lines: concatenated in page order and renumbered
+    - totals (TOTAL_FIELDS): all taken from the last batch that has a total;
+      fields that batch lacks stay out rather than coming from other batches
+    - other fields: first non-empty value wins; nested dicts (supplier, buyer)
+      are merged key by key
+
+    Args:
+        results: Extraction results, one per page batch, in page order
+
+    Returns:
+        Merged invoice data
+    """
+    if len(results) == 1:
+        return results[0]
+
+    merged: dict = {}
+    lines: list[dict] = []
+
+    for result in results:
+        lines.extend(result.get("lines") or [])
+
+        for key, value in result.items():
+            if key == "lines" or key in TOTAL_FIELDS or _is_empty(value):
+                continue
+
+            if isinstance(value, dict) and isinstance(merged.get(key), dict):
+                for sub_key, sub_value in value.items():
+                    if _is_empty(merged[key].get(sub_key)) and not _is_empty(sub_value):
+                        merged[key][sub_key] = sub_value
+            elif _is_empty(merged.get(key)):
+                merged[key] = dict(value) if isinstance(value, dict) else value
+
+    totals = _totals_source(results)
+    for key in TOTAL_FIELDS:
+        if not _is_empty(totals.get(key)):
+            merged[key] = totals[key]
+
+    for number, line in enumerate(lines, start=1):
+        line["line_number"] = number
+    merged["lines"] = lines
+
+    return merged
+
+
+def _record(input_path: str, pages: int, seconds: float, response: object, payload_bytes: int) -> None:
+    input_tokens, output_tokens = usage_tokens(response)
+    record_request(
+        input_path,
+        pages=pages,
+        seconds=seconds,
+        input_tokens=input_tokens,
+        output_tokens=output_tokens,
+        payload_bytes=payload_bytes
+    )
+
+
+async def extract_pdf(full_file_path: str, call: ModelCall) -> dict:
+    """
+    Extract a PDF with one model request per page batch
+
+    Pages are prepared PDF_PAGES_PER_REQUEST at a time (up to PDF_MAX_PAGES);
+    born-digital pages are sent as positioned text (see PDF_INPUT_MODE), scans
+    as images. The batch results are merged with merge_page_results.
+
+    Args:
+        full_file_path: Full path to PDF file
+        call: Sends one request for the model in use
+
+    Returns:
+        Merged invoice data
+    """
+    results = []
+    async for batch in iter_pdf_page_batches(full_file_path):
+        started = time.perf_counter()
+        notes = [page_note(batch.first_page, batch.last_page, batch.page_count)]
+        if batch.texts:
+            notes.append(text_layer_note(batch.texts, batch.first_page))
+
+        result, response = await call(batch.images, notes)
+        results.append(result)
+        _record(
+            batch.input_path,
+            pages=batch.last_page - batch.first_page + 1,
+            seconds=batch.prepare_seconds + time.perf_counter() - started,
+            response=response,
+            payload_bytes=sum(map(len, batch.images)) + sum(len(n) for n in notes if n)
+        )
+    return merge_page_results(results)
+
+
+async def extract_image(full_file_path: str, data, call: ModelCall) -> dict:
+    """
+    Extract an image file with one model request
+
+    The image is re-encoded (grayscale, pixel cap, format) per the IMAGE_* settings.
+
+    Args:
+        full_file_path: Full path to image file
+        data: File contents already in memory, or None to read the file
+        call: Sends one request for the model in use
+
+    Returns:
+        Extracted invoice data
+    """
+    started = time.perf_counter()
+    data_url = await encode_image(full_file_path, data)
+    result, response = await call([data_url], [])
+    _record("image", pages=1, seconds=time.perf_counter() - started, response=response, payload_bytes=len(data_url))
+    return result
@@ -1,46 +1,63 @@
 """
 Router for OpenAI extraction - delegates to appropriate extractor based on model
 """
-from pathlib import Path
+import asyncio
 from fastapi import HTTPException
 from app.config import get_settings
+from app.services.extraction_cache import extraction_cache, content_sha256
+from app.utils.image_encoding import ImageEncoding
+from app.utils.file_loader import map_file, resolve_stored_file
+from app.utils.metrics import stage, CACHE_LOOKUPS
 
 settings = get_settings()
 
+# Part of the extraction cache key - bump when COMPREHENSIVE_PROMPT changes
+# (or purge the cache with DELETE /cache)
+PROMPT_VERSION = "1"
 
-async def extract_from_pdf_or_image(file_path: str, base64_content: str, mime_type: str) -> dict:
+
+def _extraction_settings_tag() -> str:
+    """
+    Every setting that changes what is sent to the model or what it returns
+
+    Part of the extraction cache key, so changing any of them misses the cache
+    instead of serving results extracted under the old settings.
     """
-    DEPRECATED: Old signature for backward compatibility
-    Redirects to new implementation based on model
+    return ":".join([
+        PROMPT_VERSION,
+        settings.PDF_INPUT_MODE,
+        ImageEncoding.from_settings().tag,
+        f"pages{settings.PDF_MAX_PAGES}x{settings.PDF_PAGES_PER_REQUEST}",
+        f"text{settings.PDF_TEXT_MIN_CHARS}-{settings.PDF_TEXT_IMAGE_DPI}dpi",
+        f"tokens{settings.OPENAI_MAX_TOKENS}",
+        f"temp{settings.OPENAI_TEMPERATURE:g}"
+    ])
+
+
+async def extract_stored_file(file_path: str) -> dict:
+    """
+    Extract invoice data from a file in storage
 
     Args:
-        file_path: Relative file path (for logging)
-        base64_content: Base64 encoded file content (unused in new implementation)
-        mime_type: MIME type of the file (unused in new implementation)
+        file_path: Storage-relative file path
 
     Returns:
         Extracted invoice data as dictionary
 
     Raises:
-        HTTPException: If extraction fails
+        HTTPException: If the file does not exist or extraction fails
     """
-    # Construct full path from relative path
-    full_path = Path(settings.STORAGE_PATH) / file_path
-
-    if not full_path.exists():
-        raise HTTPException(
-            status_code=404,
-            detail=f"File not found: {file_path}"
-        )
-
-    return await extract_invoice(str(full_path))
+    return await extract_invoice(resolve_stored_file(file_path))
 
 
 async def extract_invoice(full_file_path: str) -> dict:
     """
     Extract invoice data using appropriate OpenAI model
 
-    Routes to GPT-4 or GPT-5 extractor based on OPENAI_MODEL setting
+    Routes to GPT-4 or GPT-5 extractor based on OPENAI_MODEL setting.
+    Results are cached by file content, model, PROMPT_VERSION and every setting
+    that affects the result (PDF input mode, page batching, text layer
+    thresholds, image encoding, token limit, temperature).
 
     Args:
         full_file_path: Full path to invoice file (PDF or image)
@@ -49,22 +66,40 @@ async def extract_invoice(full_file_path: str) -> dict:
         Extracted invoice data as dictionary
 
     Raises:
-        HTTPException: If extraction fails
+        HTTPException: Unsupported model or file type, or OpenAI unavailable
+        Exception: Extraction of this invoice failed (reported as status "failed")
     """
     model = settings.OPENAI_MODEL.lower()
 
     if model.startswith("gpt-5"):
         # Use GPT-5 Responses API
-        from app.services.gpt5_extractor import extract_with_gpt5
-        return await extract_with_gpt5(full_file_path)
+        from app.services.gpt5_extractor import extract_with_gpt5 as extractor
 
     elif model.startswith("gpt-4"):
         # Use GPT-4 Chat Completions API
-        from app.services.gpt4_extractor import extract_with_gpt4
-        return await extract_with_gpt4(full_file_path)
+        from app.services.gpt4_extractor import extract_with_gpt4 as extractor
 
     else:
         raise HTTPException(
             status_code=400,
             detail=f"Unsupported model: {settings.OPENAI_MODEL}. Use gpt-4o or gpt-5."
         )
+
+    # The file is mapped once: hashed for the cache key and, for images,
+    # base64-encoded straight from the mapping
+    with map_file(full_file_path) as data:
+        # Serve repeated extractions of the same file from the cache
+        with stage("file_load"):
+            content_hash = await asyncio.to_thread(content_sha256, data)
+        cache_key = extraction_cache.make_key(content_hash, settings.OPENAI_MODEL, _extraction_settings_tag())
+
+        with stage("cache_lookup"):
+            cached = await asyncio.to_thread(extraction_cache.get, cache_key)
+        CACHE_LOOKUPS.labels("miss" if cached is None else "hit").inc()
+        if cached is not None:
+            return cached
+
+        result = await extractor(full_file_path, data)
+
+    await asyncio.to_thread(extraction_cache.put, cache_key, result)
+    return result
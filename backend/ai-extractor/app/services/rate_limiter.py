@@ -0,0 +1,229 @@
+"""
+Per-replica concurrency and rate limiting for OpenAI calls
+
+- Concurrency is adaptive (AIMD): every successful call raises the limit by
+  1/limit (about +1 per window of calls), a 429 halves it.
+- Requests and tokens per minute are budgeted with token buckets. Token use is
+  estimated up front and corrected with the actual usage from the response.
+- 429s are retried here (the OpenAI client's own retries are disabled) so the
+  limiter sees them and can back off.
+"""
+import asyncio
+import random
+import time
+from typing import Any, Awaitable, Callable
+from fastapi import HTTPException
+from openai import (
+    APIConnectionError, APITimeoutError, AuthenticationError, InternalServerError, RateLimitError
+)
+from app.config import get_settings
+from app.utils.metrics import stage, OPENAI_REQUESTS, LIMITER_CONCURRENCY, LIMITER_IN_FLIGHT
+
+settings = get_settings()
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at rate_per_minute"""
+
+    def __init__(self, rate_per_minute: int):
+        self.rate_per_minute = rate_per_minute
+        self.capacity = float(rate_per_minute)
+        self.available = float(rate_per_minute)
+        self.updated_at = time.monotonic()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate_per_minute > 0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.available = min(
+            self.capacity,
+            self.available + (now - self.updated_at) * self.rate_per_minute / 60
+        )
+        self.updated_at = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until amount is available (0 if available now)"""
+        if not self.enabled:
+            return 0.0
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.available >= amount:
+            return 0.0
+        return (amount - self.available) * 60 / self.rate_per_minute
+
+    def take(self, amount: float) -> None:
+        if self.enabled:
+            self._refill()
+            self.available -= amount
+
+    def give_back(self, amount: float) -> None:
+        """Correct an estimate; negative amounts charge extra usage"""
+        if self.enabled:
+            self._refill()
+            self.available = min(self.capacity, self.available + amount)
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency limiter combined with request/token per-minute budgets"""
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        min_concurrency: int,
+        requests_per_minute: int,
+        tokens_per_minute: int
+    ):
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.limit = float(max_concurrency)
+        self.in_flight = 0
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.rate_limited = 0
+        self.completed = 0
+        self._last_decrease = 0.0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self, estimated_tokens: int) -> None:
+        """Wait for a concurrency slot and per-minute budget"""
+        async with self._condition:
+            while True:
+                if self.in_flight < int(self.limit):
+                    delay = max(self.requests.wait_time(1), self.tokens.wait_time(estimated_tokens))
+                    if delay == 0:
+                        break
+                else:
+                    delay = None
+
+                try:
+                    await asyncio.wait_for(self._condition.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+
+            self.in_flight += 1
+            self.requests.take(1)
+            self.tokens.take(estimated_tokens)
+
+    async def release(self, outcome: str = "success") -> None:
+        """
+        Free the slot and adjust the concurrency limit
+
+        Args:
+            outcome: "success" (additive increase), "rate_limited" (halve the
+                limit) or "error" (limit unchanged)
+        """
+        async with self._condition:
+            self.in_flight -= 1
+            if outcome == "rate_limited":
+                self.rate_limited += 1
+                # Halve at most once per second so a burst of 429s from
+                # calls already in flight counts as one congestion signal
+                now = time.monotonic()
+                if now - self._last_decrease >= 1.0:
+                    self.limit = max(float(self.min_concurrency), self.limit / 2)
+                    self._last_decrease = now
+            elif outcome == "success":
+                self.completed += 1
+                self.limit = min(float(self.max_concurrency), self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: int | None) -> None:
+        """Replace the up-front token estimate with actual usage"""
+        if actual_tokens is not None:
+            self.tokens.give_back(estimated_tokens - actual_tokens)
+
+    def stats(self) -> dict:
+        return {
+            "concurrency_limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "rate_limited": self.rate_limited
+        }
+
+
+def _retry_after(error: RateLimitError, attempt: int) -> float:
+    """Honor Retry-After if present, else jittered exponential backoff"""
+    header = error.response.headers.get("retry-after") if error.response is not None else None
+    try:
+        return float(header)
+    except (TypeError, ValueError):
+        return random.uniform(0, 2 ** attempt)
+
+
+async def call_openai(
+    request: Callable[[], Awaitable[Any]],
+    estimated_tokens: int
+) -> Any:
+    """
+    Run an OpenAI API call under the shared limiter
+
+    Args:
+        request: Zero-argument coroutine function performing the API call
+        estimated_tokens: Up-front estimate of total tokens for the call
+
+    Returns:
+        The API response
+
+    Raises:
+        RateLimitError: If still rate limited after OPENAI_MAX_RETRIES retries
+    """
+    attempt = 0
+    while True:
+        with stage("openai_wait"):
+            await openai_limiter.acquire(estimated_tokens)
+        try:
+            with stage("openai_call", {"openai.model": settings.OPENAI_MODEL, "openai.attempt": attempt}):
+                response = await request()
+        except RateLimitError as e:
+            await openai_limiter.release("rate_limited")
+            OPENAI_REQUESTS.labels(settings.OPENAI_MODEL, "rate_limited").inc()
+            if attempt >= settings.OPENAI_MAX_RETRIES:
+                raise
+            await asyncio.sleep(_retry_after(e, attempt))
+            attempt += 1
+            continue
+        except BaseException:
+            await openai_limiter.release("error")
+            OPENAI_REQUESTS.labels(settings.OPENAI_MODEL, "error").inc()
+            raise
+
+        await openai_limiter.release()
+        OPENAI_REQUESTS.labels(settings.OPENAI_MODEL, "ok").inc()
+        usage = getattr(response, "usage", None)
+        openai_limiter.record_usage(estimated_tokens, getattr(usage, "total_tokens", None))
+        return response
+
+
+def openai_unavailable(error: Exception) -> HTTPException | None:
+    """
+    Gateway error for an OpenAI failure that would hit any invoice alike
+
+    Timeouts, connection errors, OpenAI 5xx, exhausted 429 retries and a
+    rejected API key are outages: the API retries them and counts them on its
+    circuit breaker. Anything else is a failure of the one invoice.
+
+    Args:
+        error: Exception raised during extraction
+
+    Returns:
+        HTTPException (504 for timeouts, else 503), or None if not an outage
+    """
+    if isinstance(error, APITimeoutError):
+        return HTTPException(status_code=504, detail=f"OpenAI request timed out: {error}")
+    if isinstance(error, (APIConnectionError, InternalServerError, RateLimitError, AuthenticationError)):
+        return HTTPException(status_code=503, detail=f"OpenAI unavailable: {error}")
+    return None
+
+
+# Shared limiter for this replica
+openai_limiter = AdaptiveLimiter(
+    max_concurrency=settings.OPENAI_MAX_CONCURRENCY,
+    min_concurrency=settings.OPENAI_MIN_CONCURRENCY,
+    requests_per_minute=settings.OPENAI_REQUESTS_PER_MINUTE,
+    tokens_per_minute=settings.OPENAI_TOKENS_PER_MINUTE
+)
+
+LIMITER_CONCURRENCY.set_function(lambda: openai_limiter.limit)
+LIMITER_IN_FLIGHT.set_function(lambda: openai_limiter.in_flight)
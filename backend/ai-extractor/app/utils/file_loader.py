@@ -1,4 +1,6 @@
-import base64
+import mmap
+import os
+from contextlib import contextmanager
 from pathlib import Path
 from fastapi import HTTPException
 from app.config import get_settings
@@ -6,86 +8,47 @@ from app.config import get_settings
 settings = get_settings()
 
 
-def load_file_as_base64(file_path: str) -> tuple[str, str]:
+def resolve_stored_file(file_path: str) -> str:
     """
-    Load file from storage and convert to base64
+    Resolve a storage-relative path to a full path
 
     Args:
-        file_path: Relative file path (e.g., "2025/11/14/uuid_invoice.pdf")
+        file_path: Relative file path (e.g., "blobs/ab/cd/<sha256>.pdf")
 
     Returns:
-        Tuple of (base64_content, mime_type)
+        Full path to the file
 
     Raises:
-        HTTPException: If file not found or cannot be read
+        HTTPException: If file not found
     """
-    try:
-        # Construct full path
-        full_path = Path(settings.STORAGE_PATH) / file_path
+    full_path = Path(settings.STORAGE_PATH) / file_path
 
-        if not full_path.exists():
-            raise HTTPException(
-                status_code=404,
-                detail=f"File not found: {file_path}"
-            )
-
-        # Read and encode file
-        with open(full_path, "rb") as f:
-            file_content = f.read()
-
-        base64_content = base64.b64encode(file_content).decode('utf-8')
-
-        # Determine MIME type from extension
-        ext = full_path.suffix.lower()
-        mime_types = {
-            '.pdf': 'application/pdf',
-            '.png': 'image/png',
-            '.jpg': 'image/jpeg',
-            '.jpeg': 'image/jpeg',
-            '.xml': 'application/xml',
-        }
-        mime_type = mime_types.get(ext, 'application/octet-stream')
-
-        return base64_content, mime_type
-
-    except HTTPException:
-        raise
-    except Exception as e:
+    if not full_path.exists():
         raise HTTPException(
-            status_code=500,
-            detail=f"Failed to load file: {str(e)}"
+            status_code=404,
+            detail=f"File not found: {file_path}"
         )
 
+    return str(full_path)
 
-def load_xml_file(file_path: str) -> str:
-    """
-    Load XML file from storage
-
-    Args:
-        file_path: Relative file path
 
-    Returns:
-        XML content as string
-
-    Raises:
-        HTTPException: If file not found or cannot be read
+@contextmanager
+def map_file(full_file_path: str):
     """
-    try:
-        full_path = Path(settings.STORAGE_PATH) / file_path
+    Memory-map a file read-only
 
-        if not full_path.exists():
-            raise HTTPException(
-                status_code=404,
-                detail=f"File not found: {file_path}"
-            )
+    The mapping is backed by the page cache, so hashing and base64 encoding
+    read it without a private copy of the file in process memory.
 
-        with open(full_path, "r", encoding="utf-8") as f:
-            return f.read()
+    Args:
+        full_file_path: Full path to file
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Failed to load XML file: {str(e)}"
-        )
+    Yields:
+        mmap of the file contents (b"" for an empty file)
+    """
+    with open(full_file_path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b""
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            yield data
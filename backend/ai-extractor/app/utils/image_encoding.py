@@ -0,0 +1,213 @@
+"""
+Image encoding for invoice pages and uploaded images sent to the model
+
+Every image goes through the same pipeline: render (PDF pages) or decode
+(uploads), drop alpha, optionally convert to grayscale, downscale to at most
+IMAGE_MAX_PIXELS and encode as PNG, JPEG or WebP. Smaller images cost fewer
+upload bytes and vision tokens; benchmarks/render_settings.py measures what a
+setting does to render time, payload size and extraction accuracy.
+"""
+import binascii
+import math
+from dataclasses import dataclass
+import fitz  # PyMuPDF
+from app.config import get_settings
+
+MIME_TYPES = {
+    "png": "image/png",
+    "jpeg": "image/jpeg",
+    "webp": "image/webp",
+}
+
+# Multiple of 3, so chunks encode to base64 without padding in between
+DATA_URL_CHUNK_SIZE = 3 * 1024 * 1024
+
+
+@dataclass(frozen=True)
+class ImageEncoding:
+    """How images are encoded before they are sent to the model"""
+    format: str = "png"  # png | jpeg | webp
+    quality: int = 85  # jpeg/webp only
+    grayscale: bool = False
+    max_pixels: int = 0  # 0 = no cap
+    dpi: int = 200  # PDF rendering resolution
+
+    @classmethod
+    def from_settings(cls) -> "ImageEncoding":
+        """Encoding configured by the IMAGE_* and PDF_RENDER_DPI settings"""
+        settings = get_settings()
+        return cls(
+            format=settings.IMAGE_FORMAT.lower(),
+            quality=settings.IMAGE_QUALITY,
+            grayscale=settings.IMAGE_GRAYSCALE,
+            max_pixels=settings.IMAGE_MAX_PIXELS,
+            dpi=settings.PDF_RENDER_DPI
+        )
+
+    @property
+    def mime_type(self) -> str:
+        return MIME_TYPES[self.format]
+
+    @property
+    def tag(self) -> str:
+        """Short description, used in cache keys and benchmark output"""
+        colour = "gray" if self.grayscale else "rgb"
+        quality = f"-q{self.quality}" if self.format != "png" else ""
+        cap = f"-max{self.max_pixels}" if self.max_pixels else ""
+        return f"{self.format}{quality}-{colour}-{self.dpi}dpi{cap}"
+
+
+def _cap_scale(width: float, height: float, max_pixels: int) -> float:
+    """Scale factor (<= 1) that brings width x height under max_pixels"""
+    if not max_pixels or width * height <= max_pixels:
+        return 1.0
+    return math.sqrt(max_pixels / (width * height))
+
+
+def encode_pixmap(pix: fitz.Pixmap, encoding: ImageEncoding) -> bytes:
+    """
+    Encode a pixmap in the configured format
+
+    Args:
+        pix: Pixmap without alpha
+        encoding: Target encoding
+
+    Returns:
+        Encoded image bytes
+
+    Raises:
+        ValueError: If the format is not supported
+    """
+    if encoding.format == "png":
+        return pix.tobytes("png")
+    if encoding.format == "jpeg":
+        return pix.tobytes("jpeg", jpg_quality=encoding.quality)
+    if encoding.format == "webp":
+        # PyMuPDF cannot write WebP itself; this goes through Pillow
+        return pix.pil_tobytes(format="WEBP", quality=encoding.quality)
+    raise ValueError(f"Unsupported image format: {encoding.format}")
+
+
+def render_page(page: fitz.Page, encoding: ImageEncoding) -> bytes:
+    """
+    Render one PDF page
+
+    Args:
+        page: Page of an open document
+        encoding: Target encoding (dpi, colour, pixel cap, format)
+
+    Returns:
+        Encoded image bytes
+    """
+    zoom = encoding.dpi / 72
+    zoom *= _cap_scale(page.rect.width * zoom, page.rect.height * zoom, encoding.max_pixels)
+
+    pix = page.get_pixmap(
+        matrix=fitz.Matrix(zoom, zoom),
+        colorspace=fitz.csGRAY if encoding.grayscale else fitz.csRGB,
+        alpha=False
+    )
+    return encode_pixmap(pix, encoding)
+
+
+def needs_reencoding(file_path: str, encoding: ImageEncoding) -> bool:
+    """
+    Check from the image header whether an upload must be re-encoded
+
+    Args:
+        file_path: Full path to PNG/JPEG file
+        encoding: Target encoding
+
+    Returns:
+        False if the file can be sent as-is (same format, no alpha, within the
+        pixel cap and already grayscale if grayscale is requested)
+    """
+    from PIL import Image
+
+    with Image.open(file_path) as image:
+        width, height = image.size
+        source_format = {"PNG": "png", "JPEG": "jpeg"}.get(image.format)
+        alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+        gray = image.mode in ("1", "L")
+
+    return (
+        source_format != encoding.format
+        or alpha
+        or (encoding.grayscale and not gray)
+        or _cap_scale(width, height, encoding.max_pixels) < 1.0
+    )
+
+
+def encode_image_file(file_path: str, encoding: ImageEncoding) -> bytes:
+    """
+    Re-encode an uploaded PNG/JPEG image
+
+    Args:
+        file_path: Full path to image file
+        encoding: Target encoding (dpi is ignored)
+
+    Returns:
+        Encoded image bytes (the file itself if needs_reencoding is False)
+    """
+    if not needs_reencoding(file_path, encoding):
+        with open(file_path, "rb") as f:
+            return f.read()
+
+    pix = fitz.Pixmap(file_path)
+    scale = _cap_scale(pix.width, pix.height, encoding.max_pixels)
+
+    if pix.alpha:
+        pix = fitz.Pixmap(pix, 0)
+    if encoding.grayscale and pix.colorspace and pix.colorspace.n != 1:
+        pix = fitz.Pixmap(fitz.csGRAY, pix)
+    elif not encoding.grayscale and pix.colorspace and pix.colorspace.n not in (1, 3):
+        pix = fitz.Pixmap(fitz.csRGB, pix)  # e.g. CMYK JPEGs
+    if scale < 1.0:
+        pix = fitz.Pixmap(pix, max(1, int(pix.width * scale)), max(1, int(pix.height * scale)))
+
+    return encode_pixmap(pix, encoding)
+
+
+def to_data_url(data, mime_type: str) -> str:
+    """
+    Build a base64 data URL for an image
+
+    The base64 text is written chunk by chunk into one preallocated buffer that
+    already holds the "data:" prefix, and decoded to str once; for large uploads
+    this avoids the intermediate base64 bytes/str copies and the concatenation.
+
+    Args:
+        data: Image bytes or a buffer (e.g. an mmap from map_file)
+        mime_type: MIME type for the URL
+
+    Returns:
+        "data:<mime_type>;base64,<...>"
+    """
+    prefix = f"data:{mime_type};base64,".encode("ascii")
+    view = memoryview(data)
+    size = len(view)
+
+    buffer = bytearray(len(prefix) + (size + 2) // 3 * 4)
+    buffer[:len(prefix)] = prefix
+    position = len(prefix)
+    for offset in range(0, size, DATA_URL_CHUNK_SIZE):
+        encoded = binascii.b2a_base64(view[offset:offset + DATA_URL_CHUNK_SIZE], newline=False)
+        buffer[position:position + len(encoded)] = encoded
+        position += len(encoded)
+    view.release()
+
+    return buffer.decode("ascii")
+
+
+def image_file_to_data_url(file_path: str, encoding: ImageEncoding) -> str:
+    """
+    Re-encode an uploaded image and return it as a data URL
+
+    Args:
+        file_path: Full path to image file
+        encoding: Target encoding
+
+    Returns:
+        Base64 data URL
+    """
+    return to_data_url(encode_image_file(file_path, encoding), encoding.mime_type)
@@ -0,0 +1,83 @@
+"""
+Prometheus metrics of the extractor process
+
+Exposed at GET /metrics. Metrics live in this process (render pool workers
+report nothing themselves; their work is timed by the awaiting coroutine), so
+run one uvicorn worker per container. Stages timed with stage() are also trace
+spans (app.utils.tracing).
+"""
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from prometheus_client import Counter, Gauge, Histogram
+
+from app.utils.tracing import tracer
+
+# From cache lookups (ms) to multi-page GPT-5 calls (minutes)
+STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+
+STAGE_SECONDS = Histogram(
+    "vostra_extractor_stage_duration_seconds",
+    "Duration of extraction stages",
+    ["stage"],
+    buckets=STAGE_BUCKETS
+)
+
+EXTRACTIONS = Counter(
+    "vostra_extractor_extractions_total",
+    "POST /extract results",
+    ["status", "file_type", "model"]  # status: success | failed | error (HTTP error response)
+)
+
+CACHE_LOOKUPS = Counter(
+    "vostra_extractor_cache_lookups_total",
+    "Extraction cache lookups",
+    ["result"]  # hit | miss
+)
+
+OPENAI_REQUESTS = Counter(
+    "vostra_extractor_openai_requests_total",
+    "OpenAI API requests by outcome (each rate-limited retry counts)",
+    ["model", "outcome"]  # ok | rate_limited | error
+)
+
+OPENAI_TOKENS = Counter(
+    "vostra_extractor_openai_tokens_total",
+    "Tokens reported by OpenAI",
+    ["model", "input_path", "type"]  # type: input | output
+)
+
+LIMITER_CONCURRENCY = Gauge(
+    "vostra_extractor_openai_concurrency_limit",
+    "Current adaptive concurrency limit for OpenAI calls"
+)
+
+LIMITER_IN_FLIGHT = Gauge(
+    "vostra_extractor_openai_in_flight",
+    "OpenAI calls currently in flight"
+)
+
+RENDER_PENDING = Gauge(
+    "vostra_extractor_render_pending",
+    "Render pool requests admitted (waiting or running)"
+)
+
+
+@contextmanager
+def stage(name: str, attributes: dict | None = None) -> Iterator[None]:
+    """
+    Time an extraction stage into vostra_extractor_stage_duration_seconds and a span
+
+    Observed whether the stage succeeds or raises.
+
+    Args:
+        name: Stage label and span name (e.g. "pdf_render", "openai_call")
+        attributes: Span attributes (e.g. {"pdf.pages": 2})
+    """
+    started = time.perf_counter()
+    try:
+        with tracer.start_as_current_span(name, attributes=attributes):
+            yield
+    finally:
+        STAGE_SECONDS.labels(name).observe(time.perf_counter() - started)
@@ -1,39 +1,89 @@
-import base64
 import fitz  # PyMuPDF
+from app.utils.image_encoding import ImageEncoding, render_page, to_data_url
 
 
-def pdf_to_base64(file_path: str, dpi: int = 200) -> str:
+def pdf_page_count(file_path: str) -> int:
     """
-    Convert PDF first page to PNG image and encode as base64
+    Count pages in a PDF
 
     Args:
         file_path: Full path to PDF file
-        dpi: Resolution for image conversion (default 200)
 
     Returns:
-        Base64 encoded PNG image string
+        Number of pages
 
     Raises:
         ValueError: If PDF has no pages
-        Exception: If conversion fails
     """
-    doc = fitz.open(file_path)
+    with fitz.open(file_path) as doc:
+        count = len(doc)
 
-    if len(doc) == 0:
-        doc.close()
+    if count == 0:
         raise ValueError(f"PDF has no pages: {file_path}")
 
-    # Get first page
-    page = doc[0]
+    return count
 
-    # Convert to high-res image
-    zoom = dpi / 72
-    mat = fitz.Matrix(zoom, zoom)
-    pix = page.get_pixmap(matrix=mat)
 
-    # Convert to PNG bytes
-    png_bytes = pix.tobytes("png")
-    doc.close()
+def page_to_data_url(file_path: str, page_number: int, encoding: ImageEncoding) -> str:
+    """
+    Convert one PDF page to an image data URL
+
+    Args:
+        file_path: Full path to PDF file
+        page_number: Zero-based page index
+        encoding: Resolution, colour, pixel cap and image format
+
+    Returns:
+        Base64 data URL
+    """
+    with fitz.open(file_path) as doc:
+        image_bytes = render_page(doc[page_number], encoding)
+
+    return to_data_url(image_bytes, encoding.mime_type)
+
+
+def page_positioned_text(file_path: str, page_number: int) -> str:
+    """
+    Extract the text layer of one PDF page with positions
+
+    One output line per text line, prefixed with its top-left position in
+    points ("x,y: text"), in reading order.
+
+    Args:
+        file_path: Full path to PDF file
+        page_number: Zero-based page index
+
+    Returns:
+        Positioned text ("" if the page has no text layer)
+    """
+    with fitz.open(file_path) as doc:
+        words = doc[page_number].get_text("words", sort=True)
+
+    lines: dict[tuple[int, int], list] = {}
+    for x0, y0, _x1, _y1, word, block_no, line_no, _word_no in words:
+        line = lines.setdefault((block_no, line_no), [x0, y0, []])
+        line[2].append(word)
+
+    rows = sorted(lines.values(), key=lambda line: (round(line[1]), line[0]))
+    return "\n".join(f"{x:.0f},{y:.0f}: {' '.join(text)}" for x, y, text in rows)
+
 
-    # Encode to base64
-    return base64.b64encode(png_bytes).decode("utf-8")
+def is_usable_text(text: str, min_chars: int) -> bool:
+    """
+    Check whether an extracted text layer is good enough to replace the image
+
+    Scanned pages have no (or almost no) text; PDFs with broken font encodings
+    produce mostly replacement characters.
+
+    Args:
+        text: Text from page_positioned_text
+        min_chars: Minimum number of non-whitespace characters
+
+    Returns:
+        True if the text layer can be used
+    """
+    chars = [c for c in text if not c.isspace()]
+    if len(chars) < min_chars:
+        return False
+    unreadable = sum(1 for c in chars if c == "\ufffd")
+    return unreadable / len(chars) < 0.05
@@ -0,0 +1,242 @@
+"""
+Process pool for CPU-bound PDF rasterization
+
+PyMuPDF rendering and image encoding hold the GIL, so running them on the event
+loop serializes concurrent requests and stalls /health probes. Rendering runs in
+a fixed-size process pool instead, warmed at startup. Pages of one document are
+rendered in parallel across the pool. At most RENDER_WORKERS + RENDER_QUEUE_SIZE
+render requests may be pending; beyond that requests are rejected with 503 so
+callers back off instead of piling up.
+"""
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from fastapi import HTTPException
+from app.config import get_settings
+from app.utils.pdf_converter import page_to_data_url, pdf_page_count, page_positioned_text, is_usable_text
+from app.utils.image_encoding import ImageEncoding, image_file_to_data_url, needs_reencoding, to_data_url
+from app.utils.file_loader import map_file
+from app.utils.metrics import stage, RENDER_PENDING
+
+settings = get_settings()
+
+_pool: ProcessPoolExecutor | None = None
+_workers_free: asyncio.Semaphore | None = None  # one permit per worker process
+_pending = 0  # admitted render requests (waiting or running)
+
+RENDER_PENDING.set_function(lambda: _pending)
+
+
+def _warm_up() -> int:
+    """Import PyMuPDF in the worker so the first real render is not delayed"""
+    import fitz  # noqa: F401
+    return os.getpid()
+
+
+def worker_count() -> int:
+    """Configured number of render processes (RENDER_WORKERS=0 means one per CPU)"""
+    return settings.RENDER_WORKERS or os.cpu_count() or 1
+
+
+def start_render_pool() -> None:
+    """Create the process pool and start all worker processes"""
+    global _pool, _workers_free
+    if _pool is not None:
+        return
+
+    workers = worker_count()
+    _pool = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn")
+    )
+    _workers_free = asyncio.Semaphore(workers)
+
+    # Submitting one task per worker spawns every process now, not on first use
+    for future in [_pool.submit(_warm_up) for _ in range(workers)]:
+        future.result()
+
+
+def stop_render_pool() -> None:
+    """Shut down the process pool"""
+    global _pool, _workers_free
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+    _pool = None
+    _workers_free = None
+
+
+async def _run_in_pool(func, *args):
+    async with _workers_free:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_pool, func, *args)
+
+
+@contextmanager
+def _admitted():
+    """Count a render request against the admission limit, or reject it with 503"""
+    global _pending
+    if _pending >= worker_count() + settings.RENDER_QUEUE_SIZE:
+        raise HTTPException(
+            status_code=503,
+            detail="Render queue full, try again later"
+        )
+
+    _pending += 1
+    try:
+        yield
+    finally:
+        _pending -= 1
+
+
+async def _run_pages(func, file_path: str, page_numbers: list[int], *args) -> list:
+    """Run func(file_path, page_number, *args) for each page in parallel in the pool"""
+    if _pool is None:
+        await asyncio.to_thread(start_render_pool)
+
+    with _admitted():
+        return await asyncio.gather(*(
+            _run_in_pool(func, file_path, page_number, *args)
+            for page_number in page_numbers
+        ))
+
+
+async def render_pdf_pages(file_path: str, page_numbers: list[int], encoding: ImageEncoding) -> list[str]:
+    """
+    Render PDF pages to image data URLs in parallel in the render pool
+
+    Args:
+        file_path: Full path to PDF file
+        page_numbers: Zero-based page indexes to render
+        encoding: Resolution, colour, pixel cap and image format
+
+    Returns:
+        Base64 data URLs, in page order
+
+    Raises:
+        HTTPException: 503 if the render queue is full
+    """
+    with stage("pdf_render", {"pdf.pages": len(page_numbers), "image.dpi": encoding.dpi}):
+        return await _run_pages(page_to_data_url, file_path, page_numbers, encoding)
+
+
+async def encode_image(file_path: str, data=None, encoding: ImageEncoding | None = None) -> str:
+    """
+    Prepare an uploaded image as a data URL
+
+    Images that already match the encoding are encoded straight from data
+    (no decode, no extra read); others are re-encoded in the render pool.
+
+    Args:
+        file_path: Full path to PNG/JPEG file
+        data: File contents (e.g. an mmap from map_file), or None to read the file
+        encoding: Image encoding (default: from settings)
+
+    Returns:
+        Base64 data URL
+
+    Raises:
+        HTTPException: 503 if the render queue is full
+    """
+    encoding = encoding or ImageEncoding.from_settings()
+
+    with stage("image_encode"):
+        if not await asyncio.to_thread(needs_reencoding, file_path, encoding):
+            if data is not None:
+                return await asyncio.to_thread(to_data_url, data, encoding.mime_type)
+            with map_file(file_path) as data:
+                return await asyncio.to_thread(to_data_url, data, encoding.mime_type)
+
+        if _pool is None:
+            await asyncio.to_thread(start_render_pool)
+
+        with _admitted():
+            return await _run_in_pool(image_file_to_data_url, file_path, encoding)
+
+
+async def extract_pdf_texts(file_path: str, page_numbers: list[int]) -> list[str]:
+    """
+    Extract positioned text layers of PDF pages in the render pool
+
+    Args:
+        file_path: Full path to PDF file
+        page_numbers: Zero-based page indexes
+
+    Returns:
+        Positioned text per page, in page order
+
+    Raises:
+        HTTPException: 503 if the render queue is full
+    """
+    with stage("pdf_text", {"pdf.pages": len(page_numbers)}):
+        return await _run_pages(page_positioned_text, file_path, page_numbers)
+
+
+@dataclass
+class PageBatch:
+    """Pages of a PDF prepared for one model request"""
+    first_page: int  # 1-based
+    last_page: int
+    page_count: int
+    input_path: str  # "text" | "text+image" | "image"
+    texts: list[str]
+    images: list[str]  # base64 data URLs
+    prepare_seconds: float
+
+
+async def iter_pdf_page_batches(file_path: str, encoding: ImageEncoding | None = None):
+    """
+    Prepare a PDF batch by batch
+
+    Yields PDF_PAGES_PER_REQUEST pages at a time (up to PDF_MAX_PAGES), so only
+    one batch is held in memory however long the document is. Depending on
+    PDF_INPUT_MODE, born-digital pages are sent as positioned text instead of
+    (auto) or alongside a low-res image of (text+image) the rendered page;
+    scanned pages always take the image path.
+
+    Args:
+        file_path: Full path to PDF file
+        encoding: Image encoding for the image path (default: from settings)
+
+    Yields:
+        PageBatch
+    """
+    page_count = await asyncio.to_thread(pdf_page_count, file_path)
+    pages = min(page_count, settings.PDF_MAX_PAGES)
+    batch_size = settings.PDF_PAGES_PER_REQUEST
+    mode = settings.PDF_INPUT_MODE
+    encoding = encoding or ImageEncoding.from_settings()
+
+    for start in range(0, pages, batch_size):
+        started = time.perf_counter()
+        page_numbers = list(range(start, min(start + batch_size, pages)))
+
+        input_path = "image"
+        texts = []
+        if mode != "image":
+            texts = await extract_pdf_texts(file_path, page_numbers)
+            if all(is_usable_text(text, settings.PDF_TEXT_MIN_CHARS) for text in texts):
+                input_path = "text+image" if mode == "text+image" else "text"
+            else:
+                texts = []
+
+        images = []
+        if input_path == "image":
+            images = await render_pdf_pages(file_path, page_numbers, encoding)
+        elif input_path == "text+image":
+            images = await render_pdf_pages(
+                file_path, page_numbers, replace(encoding, dpi=settings.PDF_TEXT_IMAGE_DPI)
+            )
+
+        yield PageBatch(
+            first_page=page_numbers[0] + 1,
+            last_page=page_numbers[-1] + 1,
+            page_count=page_count,
+            input_path=input_path,
+            texts=texts,
+            images=images,
+            prepare_seconds=time.perf_counter() - started
+        )
@@ -0,0 +1,83 @@
+"""
+OpenTelemetry tracing of the extractor process
+
+The FastAPI server span of POST /extract continues the trace of the API's
+extraction job (W3C traceparent header). Below it are the stages timed by
+app.utils.metrics.stage: file load, cache lookup, PDF text/rendering, image
+encoding, limiter wait, OpenAI call (one span per attempt) and JSON parse.
+
+TRACING_EXPORTER selects where spans go:
+    none  tracing off (default)
+    file  JSON lines appended to TRACING_FILE_PATH
+    otlp  OTLP/HTTP to TRACING_OTLP_ENDPOINT (a local collector, Jaeger, ...)
+"""
+from pathlib import Path
+
+from opentelemetry import trace
+from opentelemetry.sdk.resources import SERVICE_NAME, Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter, SpanExporter
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+from opentelemetry.trace import format_trace_id
+
+from app.config import get_settings
+
+settings = get_settings()
+
+# Proxy until setup_tracing installs the SDK provider; no-op if it never does
+tracer = trace.get_tracer("vostra-ai-extractor")
+
+_provider: TracerProvider | None = None
+
+
+def _exporter() -> SpanExporter:
+    if settings.TRACING_EXPORTER == "file":
+        path = Path(settings.TRACING_FILE_PATH)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return ConsoleSpanExporter(
+            out=path.open("a", encoding="utf-8"),
+            formatter=lambda span: span.to_json(indent=None) + "\n"
+        )
+    if settings.TRACING_EXPORTER == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        return OTLPSpanExporter(endpoint=settings.TRACING_OTLP_ENDPOINT)
+    raise ValueError(f"Unknown TRACING_EXPORTER: {settings.TRACING_EXPORTER} (use none, file or otlp)")
+
+
+def setup_tracing(app) -> None:
+    """
+    Install the tracer provider and instrument FastAPI
+
+    Does nothing when TRACING_EXPORTER is "none". Call once, before the app
+    starts serving. Requests from the API follow the API's sampling decision.
+
+    Args:
+        app: FastAPI application
+    """
+    global _provider
+    if settings.TRACING_EXPORTER == "none":
+        return
+
+    from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
+
+    _provider = TracerProvider(
+        resource=Resource.create({SERVICE_NAME: settings.TRACING_SERVICE_NAME}),
+        sampler=ParentBased(root=TraceIdRatioBased(settings.TRACING_SAMPLE_RATIO))
+    )
+    # Spans are exported from a background thread in batches, off the request path
+    _provider.add_span_processor(BatchSpanProcessor(_exporter()))
+    trace.set_tracer_provider(_provider)
+
+    FastAPIInstrumentor.instrument_app(app, tracer_provider=_provider, excluded_urls="health,metrics")
+
+
+def shutdown_tracing() -> None:
+    """Export the spans still buffered"""
+    if _provider is not None:
+        _provider.shutdown()
+
+
+def current_trace_id() -> str | None:
+    """Hex trace id of the active span, for correlating log lines with traces"""
+    context = trace.get_current_span().get_span_context()
+    return format_trace_id(context.trace_id) if context.is_valid else None
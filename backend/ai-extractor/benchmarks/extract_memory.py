@@ -0,0 +1,113 @@
+"""
+Peak-RSS and latency of preparing a large upload for the OpenAI request
+
+Each mode runs in a fresh subprocess so ru_maxrss is not shared between runs:
+  - legacy:  the previous /extract path (load_file_as_base64 in the handler,
+             unused; file hashed, read and base64-encoded again by the extractor;
+             data URL built by f-string)
+  - current: extract_invoice's path (file mapped once, hashed and encoded to a
+             data URL from the mapping)
+
+Both stop when the image data URL for the OpenAI request exists; the OpenAI
+client's JSON serialization that follows is the same in both. "copies" is the
+peak Python heap (tracemalloc) divided by the file size; peak RSS also counts
+the mapped file's page-cache pages, which the kernel can reclaim.
+
+Usage (from backend/ai-extractor):
+    python -m benchmarks.extract_memory --size-mb 100
+"""
+import argparse
+import asyncio
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _make_png(path: str, size_mb: int) -> None:
+    """Random-noise RGB PNG of about size_mb (noise does not compress)"""
+    from PIL import Image
+    side = int((size_mb * 1024 * 1024 / 3) ** 0.5)
+    Image.frombytes("RGB", (side, side), os.urandom(side * side * 3)).save(path, compress_level=1)
+
+
+async def _legacy(path: str) -> str:
+    """Previous path: handler base64 (kept alive), hash, re-read, base64, f-string"""
+    import base64
+    import hashlib
+
+    with open(path, "rb") as f:
+        handler_base64 = base64.b64encode(f.read()).decode("utf-8")  # noqa: F841 (held by the handler)
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            digest.update(chunk)
+
+    with open(path, "rb") as f:
+        base64_content = base64.b64encode(f.read()).decode("utf-8")
+    return f"data:image/png;base64,{base64_content}"
+
+
+async def _current(path: str) -> str:
+    from app.services.extraction_cache import content_sha256
+    from app.utils.file_loader import map_file
+    from app.utils.render_pool import encode_image
+
+    with map_file(path) as data:
+        await asyncio.to_thread(content_sha256, data)
+        return await encode_image(path, data)
+
+
+async def _run_mode(mode: str, path: str) -> None:
+    import app.utils.render_pool  # noqa: F401 (import cost is not part of the measurement)
+
+    size_mb = os.path.getsize(path) / 1024 / 1024
+    baseline = _peak_rss_mb()
+    tracemalloc.start()
+    started = time.perf_counter()
+
+    data_url = await (_legacy(path) if mode == "legacy" else _current(path))
+
+    elapsed = time.perf_counter() - started
+    heap_peak = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    tracemalloc.stop()
+    peak = _peak_rss_mb()
+    print(f"{mode:<8} file={size_mb:.0f}MB data_url={len(data_url) / 1024 / 1024:.0f}MB "
+          f"heap_peak={heap_peak:.0f}MB ({heap_peak / size_mb:.1f} copies) "
+          f"peak_rss=+{peak - baseline:.0f}MB time={elapsed:.2f}s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=100, help="size of the uploaded image in MB")
+    parser.add_argument("--mode", choices=["legacy", "current"], help=argparse.SUPPRESS)
+    parser.add_argument("--file", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        asyncio.run(_run_mode(args.mode, args.file))
+        return
+
+    with tempfile.TemporaryDirectory() as storage:
+        path = os.path.join(storage, "invoice.png")
+        _make_png(path, args.size_mb)
+        env = {**os.environ, "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "unused"), "STORAGE_PATH": storage}
+        for mode in ("legacy", "current"):
+            subprocess.run(
+                [sys.executable, "-m", "benchmarks.extract_memory", "--mode", mode, "--file", path],
+                env=env,
+                check=True
+            )
+
+
+if __name__ == "__main__":
+    main()
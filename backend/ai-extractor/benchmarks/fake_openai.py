@@ -0,0 +1,143 @@
+"""
+Fake OpenAI server for benchmarks and load tests
+
+Implements POST /v1/chat/completions and POST /v1/responses with a canned
+invoice extraction. Behaviour is configured with environment variables:
+
+    FAKE_OPENAI_LATENCY          mean response latency in seconds (default 2.0)
+    FAKE_OPENAI_JITTER           +/- uniform jitter in seconds (default 0.5)
+    FAKE_OPENAI_ERROR_RATE       fraction of requests answered with 500 (default 0)
+    FAKE_OPENAI_RATE_LIMIT_RATE  fraction of requests answered with 429 (default 0)
+    FAKE_OPENAI_MAX_CONCURRENCY  requests above this many in flight get 429 (default 0 = unlimited)
+
+Usage (from backend/ai-extractor):
+    uvicorn benchmarks.fake_openai:app --port 8999
+    OPENAI_BASE_URL=http://localhost:8999/v1 OPENAI_API_KEY=fake uvicorn app.main:app --port 8001
+"""
+import asyncio
+import json
+import os
+import random
+import time
+from uuid import uuid4
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+LATENCY = float(os.getenv("FAKE_OPENAI_LATENCY", "2.0"))
+JITTER = float(os.getenv("FAKE_OPENAI_JITTER", "0.5"))
+ERROR_RATE = float(os.getenv("FAKE_OPENAI_ERROR_RATE", "0"))
+RATE_LIMIT_RATE = float(os.getenv("FAKE_OPENAI_RATE_LIMIT_RATE", "0"))
+MAX_CONCURRENCY = int(os.getenv("FAKE_OPENAI_MAX_CONCURRENCY", "0"))
+
+CANNED_INVOICE = {
+    "invoice_number": "100234",
+    "invoice_date": "2025-11-01",
+    "due_date": "2025-12-01",
+    "supplier": {"name": "Testleverantören AB", "org_number": "556000-0000"},
+    "buyer": {"name": "Exempel kommun"},
+    "lines": [
+        {"line_number": 1, "description": "Konsulttjänster", "quantity": 10.0,
+         "unit": "tim", "unit_price": 950.0, "amount": 9500.0, "vat_rate": 25, "vat_amount": 2375.0}
+    ],
+    "subtotal": 9500.0,
+    "vat_amount": 2375.0,
+    "total": 11875.0,
+    "currency": "SEK"
+}
+
+USAGE_PROMPT_TOKENS = 1800
+USAGE_COMPLETION_TOKENS = 400
+
+app = FastAPI(title="Fake OpenAI")
+stats = {"requests": 0, "rate_limited": 0, "errors": 0, "in_flight": 0, "max_in_flight": 0}
+
+
+async def _simulate() -> JSONResponse | None:
+    """Apply configured failures and latency; returns an error response or None"""
+    stats["requests"] += 1
+
+    if (MAX_CONCURRENCY and stats["in_flight"] >= MAX_CONCURRENCY) or random.random() < RATE_LIMIT_RATE:
+        stats["rate_limited"] += 1
+        return JSONResponse(
+            status_code=429,
+            headers={"retry-after": "1"},
+            content={"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}}
+        )
+
+    if random.random() < ERROR_RATE:
+        stats["errors"] += 1
+        return JSONResponse(
+            status_code=500,
+            content={"error": {"message": "Simulated server error", "type": "server_error"}}
+        )
+
+    stats["in_flight"] += 1
+    stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+    try:
+        await asyncio.sleep(max(0.0, LATENCY + random.uniform(-JITTER, JITTER)))
+    finally:
+        stats["in_flight"] -= 1
+    return None
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(body: dict):
+    error = await _simulate()
+    if error:
+        return error
+
+    return {
+        "id": f"chatcmpl-{uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "gpt-4o"),
+        "choices": [{
+            "index": 0,
+            "finish_reason": "stop",
+            "message": {"role": "assistant", "content": json.dumps(CANNED_INVOICE, ensure_ascii=False)}
+        }],
+        "usage": {
+            "prompt_tokens": USAGE_PROMPT_TOKENS,
+            "completion_tokens": USAGE_COMPLETION_TOKENS,
+            "total_tokens": USAGE_PROMPT_TOKENS + USAGE_COMPLETION_TOKENS
+        }
+    }
+
+
+@app.post("/v1/responses")
+async def responses(body: dict):
+    error = await _simulate()
+    if error:
+        return error
+
+    return {
+        "id": f"resp_{uuid4().hex}",
+        "object": "response",
+        "created_at": int(time.time()),
+        "model": body.get("model", "gpt-5"),
+        "status": "completed",
+        "output": [{
+            "id": f"msg_{uuid4().hex}",
+            "type": "message",
+            "role": "assistant",
+            "status": "completed",
+            "content": [{
+                "type": "output_text",
+                "text": json.dumps(CANNED_INVOICE, ensure_ascii=False),
+                "annotations": []
+            }]
+        }],
+        "parallel_tool_calls": True,
+        "tool_choice": "auto",
+        "tools": [],
+        "usage": {
+            "input_tokens": USAGE_PROMPT_TOKENS,
+            "output_tokens": USAGE_COMPLETION_TOKENS,
+            "total_tokens": USAGE_PROMPT_TOKENS + USAGE_COMPLETION_TOKENS
+        }
+    }
+
+
+@app.get("/stats")
+async def get_stats():
+    return stats
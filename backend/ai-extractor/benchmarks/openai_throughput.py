@@ -0,0 +1,112 @@
+"""
+Extraction throughput against the fake OpenAI server
+
+Starts benchmarks.fake_openai on a local port, points the extractor at it and
+runs extract_invoice on a generated sample invoice at increasing client
+concurrency. With the async client throughput should grow roughly linearly with
+concurrency until OPENAI_MAX_CONCURRENCY (or the fake server's own limit, which
+exercises the AIMD back-off) is reached.
+
+Usage (from backend/ai-extractor):
+    python -m benchmarks.openai_throughput --latency 1.0 --levels 1,2,4,8,16
+    python -m benchmarks.openai_throughput --server-limit 4   # provoke 429s
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _sample_invoice_png(path: str) -> None:
+    import fitz
+    doc = fitz.open()
+    page = doc.new_page(width=595, height=842)
+    page.insert_text((72, 72), "FAKTURA 100234", fontsize=20)
+    page.insert_text((72, 120), "Testleverantören AB - Konsulttjänster 10 tim a 950 kr", fontsize=11)
+    page.insert_text((72, 150), "Att betala: 11 875,00 SEK", fontsize=11)
+    page.get_pixmap(dpi=100).save(path)
+    doc.close()
+
+
+async def _run_level(extract, file_path: str, concurrency: int, requests: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            await extract(file_path)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return time.perf_counter() - started
+
+
+async def _benchmark(levels: list[int], rounds: int, file_path: str) -> None:
+    from app.services.openai_extractor import extract_invoice
+    from app.services.rate_limiter import openai_limiter
+
+    print(f"{'concurrency':>11} {'requests':>8} {'seconds':>8} {'inv/min':>8} {'limit':>6} {'429s':>5}")
+    for concurrency in levels:
+        requests = concurrency * rounds
+        elapsed = await _run_level(extract_invoice, file_path, concurrency, requests)
+        stats = openai_limiter.stats()
+        print(f"{concurrency:>11} {requests:>8} {elapsed:>8.2f} {requests / elapsed * 60:>8.0f} "
+              f"{stats['concurrency_limit']:>6} {stats['rate_limited']:>5}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--levels", default="1,2,4,8,16", help="comma-separated client concurrency levels")
+    parser.add_argument("--rounds", type=int, default=3, help="requests per level = concurrency * rounds")
+    parser.add_argument("--latency", type=float, default=1.0, help="fake OpenAI latency in seconds")
+    parser.add_argument("--server-limit", type=int, default=0, help="fake server concurrency before 429 (0 = unlimited)")
+    parser.add_argument("--model", default="gpt-4o")
+    args = parser.parse_args()
+
+    levels = [int(n) for n in args.levels.split(",")]
+    port = _free_port()
+
+    server_env = {
+        **os.environ,
+        "FAKE_OPENAI_LATENCY": str(args.latency),
+        "FAKE_OPENAI_JITTER": "0",
+        "FAKE_OPENAI_MAX_CONCURRENCY": str(args.server_limit)
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "benchmarks.fake_openai:app", "--port", str(port), "--log-level", "warning"],
+        env=server_env
+    )
+
+    # Settings are read at import time, so configure before importing app modules
+    os.environ.update({
+        "OPENAI_API_KEY": "fake",
+        "OPENAI_MODEL": args.model,
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{port}/v1",
+        "OPENAI_MAX_CONCURRENCY": str(max(levels)),
+        "OPENAI_REQUESTS_PER_MINUTE": "0",
+        "OPENAI_TOKENS_PER_MINUTE": "0",
+        "EXTRACTION_CACHE_ENABLED": "false"
+    })
+
+    try:
+        time.sleep(1.5)
+        with tempfile.TemporaryDirectory() as tmp:
+            file_path = os.path.join(tmp, "invoice.png")
+            _sample_invoice_png(file_path)
+            asyncio.run(_benchmark(levels, args.rounds, file_path))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Extraction-request concurrency vs. render pool size
+
+Sends concurrent POST /extract requests for a render-heavy PDF through the ASGI
+app (OpenAI replaced by benchmarks.fake_openai with near-zero latency, cache
+disabled), once per RENDER_WORKERS setting, while probing /health. Throughput
+should scale with render workers up to the number of cores, and /health should
+stay fast because rendering no longer runs on the event loop.
+
+Usage (from backend/ai-extractor):
+    python -m benchmarks.render_concurrency --requests 32 --workers 1,2,4
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.openai_throughput import _free_port
+
+
+def _heavy_pdf(path: str) -> None:
+    """One A4 page with enough text and vector graphics to make rendering costly"""
+    import fitz
+    doc = fitz.open()
+    page = doc.new_page(width=595, height=842)
+    for row in range(80):
+        y = 40 + row * 10
+        page.insert_text((30, y), f"Rad {row:03d}  Konsulttjänster vecka {row % 52:02d}  950,00  25%  " * 2, fontsize=6)
+        page.draw_line((30, y + 2), (565, y + 2), color=(0.7, 0.7, 0.7), width=0.3)
+    for n in range(400):
+        page.draw_circle((30 + (n * 37) % 535, 40 + (n * 53) % 780), 3 + n % 7, color=(0.2, 0.3, 0.8), width=0.4)
+    doc.save(path)
+    doc.close()
+
+
+async def _run(requests: int) -> None:
+    import httpx
+    from app.main import app
+    from app.utils.render_pool import start_render_pool, stop_render_pool, worker_count
+
+    start_render_pool()
+    health_latencies = []
+    done = asyncio.Event()
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test", timeout=300) as client:
+        async def probe():
+            while not done.is_set():
+                started = time.perf_counter()
+                await client.get("/health")
+                health_latencies.append(time.perf_counter() - started)
+                await asyncio.sleep(0.05)
+
+        async def extract(n: int):
+            response = await client.post("/extract", json={"invoice_id": n, "file_path": "invoice.pdf"})
+            return response.json()["status"]
+
+        probe_task = asyncio.create_task(probe())
+        started = time.perf_counter()
+        statuses = await asyncio.gather(*(extract(n) for n in range(requests)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await probe_task
+
+    stop_render_pool()
+    ok = statuses.count("success")
+    print(f"{worker_count():>7} {requests:>8} {ok:>3} {elapsed:>8.2f} {requests / elapsed:>7.1f} "
+          f"{max(health_latencies) * 1000:>14.0f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=32, help="concurrent /extract requests per run")
+    parser.add_argument("--workers", default=",".join(str(n) for n in (1, 2, 4, os.cpu_count()) if n <= os.cpu_count()),
+                        help="comma-separated RENDER_WORKERS values")
+    parser.add_argument("--run", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        asyncio.run(_run(args.run))
+        return
+
+    port = _free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "benchmarks.fake_openai:app", "--port", str(port), "--log-level", "warning"],
+        env={**os.environ, "FAKE_OPENAI_LATENCY": "0.01", "FAKE_OPENAI_JITTER": "0"}
+    )
+
+    try:
+        time.sleep(1.5)
+        with tempfile.TemporaryDirectory() as storage:
+            _heavy_pdf(os.path.join(storage, "invoice.pdf"))
+            print(f"{'workers':>7} {'requests':>8} {'ok':>3} {'seconds':>8} {'req/s':>7} {'max /health ms':>14}")
+            for workers in sorted({int(n) for n in args.workers.split(",")}):
+                env = {
+                    **os.environ,
+                    "OPENAI_API_KEY": "fake",
+                    "OPENAI_MODEL": "gpt-4o",
+                    "OPENAI_BASE_URL": f"http://127.0.0.1:{port}/v1",
+                    "OPENAI_MAX_CONCURRENCY": "256",
+                    "OPENAI_REQUESTS_PER_MINUTE": "0",
+                    "OPENAI_TOKENS_PER_MINUTE": "0",
+                    "EXTRACTION_CACHE_ENABLED": "false",
+                    "STORAGE_PATH": storage,
+                    "RENDER_WORKERS": str(workers),
+                    "RENDER_QUEUE_SIZE": str(args.requests)
+                }
+                subprocess.run(
+                    [sys.executable, "-m", "benchmarks.render_concurrency", "--run", str(args.requests)],
+                    env=env,
+                    check=True
+                )
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
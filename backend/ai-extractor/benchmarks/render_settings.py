@@ -0,0 +1,221 @@
+"""
+Image encoding settings: render time, payload size and extraction accuracy
+
+For each encoding preset, every page of every invoice in a corpus directory is
+rendered (uploaded images are re-encoded), and the mean render time and base64
+payload per page are reported. With --extract, each invoice is also extracted
+through OpenAI with that preset (PDF_INPUT_MODE=image, cache disabled) and
+scored against its ground truth, so the cheapest setting that is still accurate
+can be chosen for IMAGE_* / PDF_RENDER_DPI.
+
+Corpus layout: PDF/PNG/JPEG invoices; for scoring, a JSON file per invoice in the
+format of cc/ground-truth-schema.json ({"image": "<file>", "ground_truth": {...}},
+"image" relative to the JSON file).
+
+Usage (from backend/ai-extractor):
+    python -m benchmarks.render_settings --corpus ~/invoices
+    python -m benchmarks.render_settings --corpus ~/invoices --extract --presets png-200,jpeg-150-gray-q75
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from app.utils.image_encoding import ImageEncoding
+
+PRESETS = {
+    "png-200": ImageEncoding(),
+    "png-200-gray": ImageEncoding(grayscale=True),
+    "png-150-gray": ImageEncoding(grayscale=True, dpi=150),
+    "jpeg-200-q85": ImageEncoding(format="jpeg", quality=85),
+    "jpeg-150-gray-q75": ImageEncoding(format="jpeg", quality=75, grayscale=True, dpi=150),
+    "jpeg-2mp-gray-q75": ImageEncoding(format="jpeg", quality=75, grayscale=True, max_pixels=2_000_000),
+    "webp-150-gray-q75": ImageEncoding(format="webp", quality=75, grayscale=True, dpi=150),
+    "webp-1mp-gray-q60": ImageEncoding(format="webp", quality=60, grayscale=True, max_pixels=1_000_000),
+}
+
+INVOICE_SUFFIXES = {".pdf", ".png", ".jpg", ".jpeg"}
+
+# Ground-truth fields compared with the extraction (dotted = nested)
+SCORED_FIELDS = (
+    "invoice_number", "invoice_date", "due_date", "ocr_number", "currency",
+    "supplier.name", "supplier.org_number", "subtotal", "vat_amount", "total",
+)
+
+
+def load_corpus(corpus: Path) -> list[tuple[Path, dict | None]]:
+    """Invoice files in the corpus with their ground truth (None if there is none)"""
+    truths = {}
+    for json_path in corpus.glob("*.json"):
+        with open(json_path, encoding="utf-8") as f:
+            data = json.load(f)
+        if "image" in data and "ground_truth" in data:
+            truths[(json_path.parent / data["image"]).resolve()] = data["ground_truth"]
+
+    files = sorted(p for p in corpus.iterdir() if p.suffix.lower() in INVOICE_SUFFIXES)
+    return [(path, truths.get(path.resolve())) for path in files]
+
+
+def _get(data: dict, dotted: str):
+    for key in dotted.split("."):
+        if not isinstance(data, dict):
+            return None
+        data = data.get(key)
+    return data
+
+
+def _same(expected, actual) -> bool:
+    if actual is None:
+        return False
+    if isinstance(expected, (int, float)) and not isinstance(expected, bool):
+        try:
+            return abs(float(actual) - expected) <= 0.01
+        except (TypeError, ValueError):
+            return False
+    normalize = lambda value: "".join(str(value).split()).lower()
+    return normalize(expected) == normalize(actual)
+
+
+def score(extracted: dict, truth: dict) -> tuple[int, int]:
+    """
+    Compare an extraction with its ground truth
+
+    Scores SCORED_FIELDS present in the ground truth, plus one point per
+    ground-truth line whose amount appears among the extracted lines.
+
+    Returns:
+        Tuple of (matched, total)
+    """
+    matched = total = 0
+    for field in SCORED_FIELDS:
+        expected = _get(truth, field)
+        if expected is None:
+            continue
+        total += 1
+        matched += _same(expected, _get(extracted, field))
+
+    amounts = [line.get("amount") for line in extracted.get("lines") or []]
+    for line in truth.get("lines") or []:
+        if line.get("amount") is None:
+            continue
+        total += 1
+        match = next((i for i, amount in enumerate(amounts) if _same(line["amount"], amount)), None)
+        if match is not None:
+            matched += 1
+            amounts.pop(match)
+
+    return matched, total
+
+
+def _render(corpus: list[tuple[Path, dict | None]], encoding: ImageEncoding, max_pages: int) -> tuple[int, float, int]:
+    """Render every page in-process; returns (pages, seconds, base64 bytes)"""
+    import fitz
+    from app.utils.image_encoding import encode_image_file, render_page
+
+    pages = payload = 0
+    seconds = 0.0
+    for path, _truth in corpus:
+        started = time.perf_counter()
+        if path.suffix.lower() == ".pdf":
+            with fitz.open(path) as doc:
+                images = [render_page(doc[n], encoding) for n in range(min(len(doc), max_pages))]
+        else:
+            images = [encode_image_file(str(path), encoding)]
+        seconds += time.perf_counter() - started
+        pages += len(images)
+        payload += sum(len(base64.b64encode(image)) for image in images)
+    return pages, seconds, payload
+
+
+async def _extract(corpus: list[tuple[Path, dict | None]]) -> tuple[int, int, float]:
+    """Extract every invoice that has ground truth; returns (matched, total, input tokens per page)"""
+    from fastapi import HTTPException
+    from app.services import extraction_stats
+    from app.services.openai_extractor import extract_invoice
+
+    matched = total = 0
+    for path, truth in corpus:
+        if truth is None:
+            continue
+        try:
+            extracted = await extract_invoice(str(path))
+        except HTTPException as e:
+            print(f"  {path.name}: {e.detail}", file=sys.stderr)
+            extracted = {}
+        file_matched, file_total = score(extracted, truth)
+        matched += file_matched
+        total += file_total
+
+    stats = extraction_stats.snapshot().values()
+    pages = sum(path_stats["pages"] for path_stats in stats) or 1
+    return matched, total, sum(path_stats["input_tokens"] for path_stats in stats) / pages
+
+
+def _run(preset: str, corpus_dir: str, extract: bool) -> None:
+    from app.config import get_settings
+    from app.utils.render_pool import stop_render_pool
+
+    encoding = PRESETS[preset]
+    corpus = load_corpus(Path(corpus_dir))
+    pages, seconds, payload = _render(corpus, encoding, get_settings().PDF_MAX_PAGES)
+
+    accuracy = tokens = "-"
+    if extract:
+        matched, total, tokens_per_page = asyncio.run(_extract(corpus))
+        stop_render_pool()
+        if total:
+            accuracy = f"{matched / total:.1%}"
+            tokens = f"{tokens_per_page:.0f}"
+
+    print(f"{preset:<20} {pages:>5} {seconds / pages * 1000:>10.1f} {payload / pages / 1024:>8.1f} "
+          f"{tokens:>11} {accuracy:>8}", flush=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", required=True, help="directory with invoices and ground-truth JSON")
+    parser.add_argument("--presets", default=",".join(PRESETS), help="comma-separated preset names")
+    parser.add_argument("--extract", action="store_true",
+                        help="also extract through OpenAI (uses OPENAI_API_KEY / OPENAI_MODEL) and score accuracy")
+    parser.add_argument("--run", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        _run(args.run, args.corpus, args.extract)
+        return
+
+    corpus = load_corpus(Path(args.corpus))
+    if not corpus:
+        parser.error(f"no invoices in {args.corpus}")
+    scored = sum(1 for _path, truth in corpus if truth is not None)
+    print(f"{len(corpus)} invoices, {scored} with ground truth")
+    print(f"{'preset':<20} {'pages':>5} {'ms/page':>10} {'KB/page':>8} {'tokens/page':>11} {'accuracy':>8}")
+
+    for preset in args.presets.split(","):
+        if preset not in PRESETS:
+            parser.error(f"unknown preset {preset!r} (choose from {', '.join(PRESETS)})")
+        encoding = PRESETS[preset]
+        env = {
+            **os.environ,
+            "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "unused"),
+            "PDF_INPUT_MODE": "image",
+            "PDF_RENDER_DPI": str(encoding.dpi),
+            "IMAGE_FORMAT": encoding.format,
+            "IMAGE_QUALITY": str(encoding.quality),
+            "IMAGE_GRAYSCALE": str(encoding.grayscale).lower(),
+            "IMAGE_MAX_PIXELS": str(encoding.max_pixels),
+            "EXTRACTION_CACHE_ENABLED": "false"
+        }
+        command = [sys.executable, "-m", "benchmarks.render_settings", "--corpus", args.corpus, "--run", preset]
+        if args.extract:
+            command.append("--extract")
+        subprocess.run(command, env=env, check=True)
+
+
+if __name__ == "__main__":
+    main()
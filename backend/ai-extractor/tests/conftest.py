@@ -0,0 +1,4 @@
+import os
+
+# Settings require an API key; no test calls OpenAI
+os.environ.setdefault("OPENAI_API_KEY", "test")
@@ -0,0 +1,152 @@
+"""
+Tests for the e-invoice parser with PEPPOL BIS 3 and Svefaktura 1.0 documents
+
+The fixtures in fixtures/einvoice/ follow the structure of the PEPPOL BIS
+Billing 3.0 and Svefaktura 1.0 examples (the PEPPOL invoice carries an embedded
+PDF attachment, as most sent invoices do).
+"""
+from pathlib import Path
+
+import pytest
+
+from app.services.einvoice_parser import parse_einvoice, _read
+
+FIXTURES = Path(__file__).parent / "fixtures" / "einvoice"
+
+
+def test_peppol_invoice():
+    """Header, parties, lines, VAT breakdown, totals and payment details"""
+    result = parse_einvoice(str(FIXTURES / "peppol_invoice.xml"))
+
+    assert result["invoice_number"] == "2024-1187"
+    assert result["invoice_date"] == "2024-03-04"
+    assert result["due_date"] == "2024-04-03"
+    assert result["delivery_date"] == "2024-02-29"
+    assert result["currency"] == "SEK"
+    assert result["order_number"] == "PO-7781"
+    assert result["contract_number"] == "AVT-2023-12"
+    assert result["reference"] == "Anna Berg"
+    assert result["period"] == "2024-02-01 - 2024-02-29"
+    assert "document_type" not in result
+
+    assert result["supplier"] == {
+        "name": "Nordisk Kontorsservice AB",
+        "org_number": "556732-1707",
+        "vat_number": "SE556732170701",
+        "address": "Storgatan 12, 352 31 Växjö",
+        "country": "SE",
+        "phone": "0470-123 45",
+        "email": "faktura@nordiskkontor.se",
+        "bankgiro": "5050-1055",
+        "iban": "SE4550000000058398257466",
+        "bic": "ESSESESS",
+    }
+    assert result["buyer"] == {
+        "name": "Exempelkommunen",
+        "contact": "Anna Berg",
+        "address": "Box 1200, 342 80 Alvesta",
+        "org_number": "212000-0142",
+        "customer_number": "K-10442",
+    }
+
+    first, second = result["lines"]
+    assert first == {
+        "line_number": 1,
+        "description": "Städning kontor - Lokalvård enligt avtal",
+        "period": "2024-02-01 - 2024-02-29",
+        "quantity": 16,
+        "unit": "HUR",
+        "unit_price": 200,
+        "amount": 3200,
+        "vat_rate": 25,
+        "vat_amount": 800,
+        "cost_center": "Kst 1200",
+    }
+    assert second["quantity"] == 12
+    assert second["unit_price"] == pytest.approx(183.33 / 12)  # price per BaseQuantity of 12
+    assert second["vat_rate"] == 6
+
+    assert result["vat_breakdown"] == [
+        {"rate": 25, "taxable_amount": 3300, "vat_amount": 825},
+        {"rate": 6, "taxable_amount": 183.33, "vat_amount": 11},
+    ]
+    assert result["subtotal"] == 3383.33
+    assert result["vat_amount"] == 836
+    assert result["rounding_adjustment"] == -0.33
+    assert result["total"] == 4319
+
+    assert result["ocr_number"] == "118700000024"
+    assert result["payment_method"] == "Bankgiro/IBAN"
+    assert result["payment_terms"] == "30 dagar netto"
+
+
+def test_attachments_are_not_recorded():
+    """The embedded PDF of AdditionalDocumentReference is dropped while reading"""
+    _sign, header, _lines = _read(str(FIXTURES / "peppol_invoice.xml"))
+
+    assert not [key for key in header if "AdditionalDocumentReference" in key or "Attachment" in key]
+    assert all(len(str(value)) < 1000 for value in header.values())
+
+
+def test_peppol_credit_note():
+    """Credit note amounts and quantities are negated"""
+    result = parse_einvoice(str(FIXTURES / "peppol_credit_note.xml"))
+
+    assert result["document_type"] == "credit_note"
+    assert result["invoice_number"] == "K-2024-031"
+    assert result["lines"] == [{
+        "line_number": 1,
+        "description": "Städning kontor",
+        "quantity": -2,
+        "unit": "HUR",
+        "unit_price": 200,
+        "amount": -400,
+        "vat_rate": 25,
+        "vat_amount": -100,
+    }]
+    assert result["vat_breakdown"] == [{"rate": 25, "taxable_amount": -400, "vat_amount": -100}]
+    assert result["subtotal"] == -400
+    assert result["vat_amount"] == -100
+    assert result["total"] == -500
+
+
+def test_svefaktura():
+    """Svefaktura 1.0 element names, SWT org numbers and bankgiro/plusgiro accounts"""
+    result = parse_einvoice(str(FIXTURES / "svefaktura.xml"))
+
+    assert result["invoice_number"] == "73410"
+    assert result["invoice_date"] == "2024-02-15"
+    assert result["due_date"] == "2024-03-16"
+    assert result["currency"] == "SEK"
+    assert result["order_number"] == "INK-5512"
+
+    supplier = result["supplier"]
+    assert supplier["name"] == "Smålands Trädgård och Mark AB"
+    assert supplier["org_number"] == "556677-8899"
+    assert supplier["vat_number"] == "SE556677889901"
+    assert supplier["bankgiro"] == "5599-1234"
+    assert supplier["plusgiro"] == "4455667-8"
+    assert result["buyer"]["org_number"] == "212000-0142"
+    assert result["buyer"]["address"] == "Box 1200, 34280 Alvesta"
+
+    assert [(line["description"], line["quantity"], line["unit"], line["unit_price"], line["amount"])
+            for line in result["lines"]] == [
+        ("Gräsklippning, parkområde", 6, "HUR", 575, 3450),
+        ("Gödselsäck 20 kg", 4, "EA", 150, 600),
+    ]
+    assert result["vat_breakdown"] == [{"rate": 25, "taxable_amount": 4050, "vat_amount": 1012.5}]
+    assert result["subtotal"] == 4050
+    assert result["vat_amount"] == 1012.5
+    assert result["rounding_adjustment"] == 0.5
+    assert result["total"] == 5063
+    assert result["ocr_number"] == "7341000012"
+    assert result["payment_method"] == "Bankgiro/Plusgiro"
+
+
+def test_rejects_other_documents(tmp_path):
+    """Only Invoice and CreditNote roots are accepted"""
+    order = tmp_path / "order.xml"
+    order.write_text('<Order xmlns="urn:oasis:names:specification:ubl:schema:xsd:Order-2"><ID>1</ID></Order>')
+
+    with pytest.raises(ValueError):
+        parse_einvoice(str(order))
@@ -0,0 +1,39 @@
+"""
+Tests for the size accounting and eviction of the extraction cache
+"""
+import os
+import time
+
+from app.services.extraction_cache import ExtractionCache
+
+
+def test_overwrite_does_not_grow_size(tmp_path):
+    """Re-extracting a cached file replaces the entry instead of adding to the total"""
+    cache = ExtractionCache(str(tmp_path), max_bytes=10_000)
+    cache.put("aa" + "0" * 62, {"invoice_number": "1"})
+    cache.put("bb" + "0" * 62, {"invoice_number": "2"})
+
+    for _ in range(50):
+        cache.put("aa" + "0" * 62, {"invoice_number": "1", "total": 100})
+
+    assert cache._size == sum(e.stat().st_size for e in cache._entries())
+    assert cache.evictions == 0
+    assert cache.get("bb" + "0" * 62) == {"invoice_number": "2"}
+
+
+def test_evicts_least_recently_used(tmp_path):
+    """Entries above max_bytes are evicted oldest first; a hit counts as a use"""
+    keys = [f"{n:02d}" + "0" * 62 for n in range(3)]
+    cache = ExtractionCache(str(tmp_path), max_bytes=10_000)
+    for age, key in zip((300, 200), keys):
+        cache.put(key, {"key": key})
+        os.utime(cache._entry_path(key), (time.time() - age, time.time() - age))
+    cache.get(keys[0])  # now the most recently used
+
+    cache.max_bytes = cache._size * 5 // 4  # room for two entries, not three
+    cache.put(keys[2], {"key": keys[2]})
+
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) == {"key": keys[0]}
+    assert cache.get(keys[2]) == {"key": keys[2]}
+    assert cache.evictions == 1
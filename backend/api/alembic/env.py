@@ -15,6 +15,7 @@ from alembic import context
 # Import your models' Base
 from app.database import Base
 from app.models.invoice import Invoice  # Import all models here
+from app.models.extraction_job import ExtractionJob
 
 # this is the Alembic Config object
 config = context.config
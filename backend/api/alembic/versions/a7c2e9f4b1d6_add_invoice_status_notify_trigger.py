@@ -0,0 +1,46 @@
+"""add invoice status notify trigger
+
+Revision ID: a7c2e9f4b1d6
+Revises: f3b8d1e6a2c4
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+
+
+revision = 'a7c2e9f4b1d6'
+down_revision = 'f3b8d1e6a2c4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # NOTIFY on every status change; delivered to listeners when the transaction
+    # commits (app.services.invoice_events). Payloads are limited to 8000 bytes,
+    # so the error message is truncated.
+    op.execute("""
+        CREATE OR REPLACE FUNCTION notify_invoice_status() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'UPDATE' AND OLD.status IS NOT DISTINCT FROM NEW.status THEN
+                RETURN NULL;
+            END IF;
+            PERFORM pg_notify('invoice_status', json_build_object(
+                'id', NEW.id,
+                'status', NEW.status,
+                'batch_id', NEW.batch_id,
+                'error_message', left(NEW.error_message, 1000)
+            )::text);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER invoices_status_notify
+        AFTER INSERT OR UPDATE OF status ON invoices
+        FOR EACH ROW EXECUTE FUNCTION notify_invoice_status()
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS invoices_status_notify ON invoices")
+    op.execute("DROP FUNCTION IF EXISTS notify_invoice_status()")
@@ -0,0 +1,23 @@
+"""add traceparent to extraction_jobs
+
+Revision ID: b5d9e3f7a1c8
+Revises: a7c2e9f4b1d6
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'b5d9e3f7a1c8'
+down_revision = 'a7c2e9f4b1d6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('extraction_jobs', sa.Column('traceparent', sa.String(length=55), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('extraction_jobs', 'traceparent')
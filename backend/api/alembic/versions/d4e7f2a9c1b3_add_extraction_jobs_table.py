@@ -0,0 +1,50 @@
+"""add extraction_jobs table
+
+Revision ID: d4e7f2a9c1b3
+Revises: c8f3a1b9e2d4
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'd4e7f2a9c1b3'
+down_revision = 'c8f3a1b9e2d4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('extraction_jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('invoice_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('status', sa.String(length=20), server_default='queued', nullable=False),
+    sa.Column('locked_by', sa.String(length=100), nullable=True),
+    sa.Column('locked_until', sa.TIMESTAMP(timezone=True), nullable=True),
+    sa.Column('attempts', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.ForeignKeyConstraint(['invoice_id'], ['invoices.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_extraction_jobs_id'), 'extraction_jobs', ['id'], unique=False)
+    op.create_index(op.f('ix_extraction_jobs_invoice_id'), 'extraction_jobs', ['invoice_id'], unique=False)
+    op.create_index(op.f('ix_extraction_jobs_status'), 'extraction_jobs', ['status'], unique=False)
+
+    # Requeue invoices that were stuck mid-extraction before the queue existed
+    op.execute(
+        "INSERT INTO extraction_jobs (invoice_id, status) "
+        "SELECT id, 'queued' FROM invoices WHERE status IN ('uploaded', 'extracting')"
+    )
+    op.execute(
+        "UPDATE invoices SET status = 'extracting' WHERE status = 'uploaded'"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_extraction_jobs_status'), table_name='extraction_jobs')
+    op.drop_index(op.f('ix_extraction_jobs_invoice_id'), table_name='extraction_jobs')
+    op.drop_index(op.f('ix_extraction_jobs_id'), table_name='extraction_jobs')
+    op.drop_table('extraction_jobs')
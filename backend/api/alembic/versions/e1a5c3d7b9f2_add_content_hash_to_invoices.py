@@ -0,0 +1,25 @@
+"""add content_hash to invoices
+
+Revision ID: e1a5c3d7b9f2
+Revises: d4e7f2a9c1b3
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'e1a5c3d7b9f2'
+down_revision = 'd4e7f2a9c1b3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('invoices', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.create_index(op.f('ix_invoices_content_hash'), 'invoices', ['content_hash'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_invoices_content_hash'), table_name='invoices')
+    op.drop_column('invoices', 'content_hash')
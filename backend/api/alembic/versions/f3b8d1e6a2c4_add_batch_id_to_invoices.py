@@ -0,0 +1,25 @@
+"""add batch_id to invoices
+
+Revision ID: f3b8d1e6a2c4
+Revises: e1a5c3d7b9f2
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'f3b8d1e6a2c4'
+down_revision = 'e1a5c3d7b9f2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('invoices', sa.Column('batch_id', sa.String(length=36), nullable=True))
+    op.create_index(op.f('ix_invoices_batch_id'), 'invoices', ['batch_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_invoices_batch_id'), table_name='invoices')
+    op.drop_column('invoices', 'batch_id')
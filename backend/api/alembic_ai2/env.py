@@ -0,0 +1,73 @@
+from logging.config import fileConfig
+import os
+
+from sqlalchemy import engine_from_config
+from sqlalchemy import pool
+
+from alembic import context
+
+# Import the AI2 models' Base
+from app.database import BaseAI2
+from app.models.transaction import Transaction  # Import all AI2 models here
+from app.models.invoice_summary import InvoiceSummary, InvoiceSummaryState
+
+# this is the Alembic Config object
+config = context.config
+
+# Override sqlalchemy.url from environment variable if present
+if os.getenv("AI2_DATABASE_URL"):
+    config.set_main_option("sqlalchemy.url", os.getenv("AI2_DATABASE_URL"))
+
+# Interpret the config file for Python logging
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+# Add your model's MetaData object here for 'autogenerate' support
+target_metadata = BaseAI2.metadata
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    """Ignore tables of the AI2 export that have no model (suppliers, ...)"""
+    if type_ == "table" and reflected and compare_to is None:
+        return False
+    return True
+
+
+def run_migrations_offline() -> None:
+    """Run migrations in 'offline' mode."""
+    url = config.get_main_option("sqlalchemy.url")
+    context.configure(
+        url=url,
+        target_metadata=target_metadata,
+        include_object=include_object,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    """Run migrations in 'online' mode."""
+    connectable = engine_from_config(
+        config.get_section(config.config_ini_section, {}),
+        prefix="sqlalchemy.",
+        poolclass=pool.NullPool,
+    )
+
+    with connectable.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            include_object=include_object
+        )
+
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
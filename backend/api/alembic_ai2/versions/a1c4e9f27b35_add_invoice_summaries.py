@@ -0,0 +1,57 @@
+"""add invoice_summaries
+
+Revision ID: a1c4e9f27b35
+Revises:
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'a1c4e9f27b35'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # ix_transactions_imported_at, which the incremental refresh uses, is built
+    # concurrently in b7d2f5a91c68 so transactions stays writable
+    op.create_table(
+        'invoice_summaries',
+        sa.Column('fakturanr', sa.Text(), nullable=False),
+        sa.Column('first_date', sa.Date(), nullable=True),
+        sa.Column('total', sa.Float(), nullable=True),
+        sa.Column('supplier', sa.Text(), nullable=True),
+        sa.Column('line_count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('fakturanr')
+    )
+    op.create_index('ix_invoice_summaries_first_date', 'invoice_summaries', ['first_date', 'fakturanr'], unique=False)
+
+    op.create_table(
+        'invoice_summary_state',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('refreshed_until', sa.TIMESTAMP(), nullable=True),
+        sa.Column('refreshed_at', sa.TIMESTAMP(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+    # Initial full build; later imports are picked up incrementally
+    op.execute("""
+        INSERT INTO invoice_summaries (fakturanr, first_date, total, supplier, line_count)
+        SELECT fakturanr, min(ver_datum), sum(belopp), min(f_t), count(*)
+        FROM transactions
+        WHERE fakturanr IS NOT NULL
+        GROUP BY fakturanr
+    """)
+    op.execute("""
+        INSERT INTO invoice_summary_state (id, refreshed_until, refreshed_at)
+        SELECT 1, max(imported_at), now() FROM transactions
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('invoice_summary_state')
+    op.drop_index('ix_invoice_summaries_first_date', table_name='invoice_summaries')
+    op.drop_table('invoice_summaries')
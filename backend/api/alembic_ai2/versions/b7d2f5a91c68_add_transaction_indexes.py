@@ -0,0 +1,86 @@
+"""add transaction indexes and supplier filter index
+
+Revision ID: b7d2f5a91c68
+Revises: a1c4e9f27b35
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'b7d2f5a91c68'
+down_revision = 'a1c4e9f27b35'
+branch_labels = None
+depends_on = None
+
+# Our own indexes: dropped on downgrade whoever built them (a1c4e9f27b35 used
+# to build ix_transactions_imported_at without CONCURRENTLY)
+OWN_INDEXES = {
+    'ix_transactions_imported_at': 'transactions USING btree (imported_at)',
+    'ix_invoice_summaries_supplier': 'invoice_summaries USING btree (lower(supplier) text_pattern_ops)',
+}
+
+# The AI2 export may already ship indexes with these names; those are kept and
+# left alone on downgrade. Indexes built here are marked with CREATED_BY.
+TRANSACTION_INDEXES = {
+    'idx_transactions_fakturanr': 'btree (fakturanr)',
+    'idx_transactions_konto': 'btree (konto)',
+    'idx_transactions_resk_nr': 'btree (resk_nr)',
+    'idx_transactions_ver_datum': 'brin (ver_datum)',
+}
+CREATED_BY = f'alembic_ai2 {revision}'
+
+# indisvalid is false for leftovers of a CREATE INDEX CONCURRENTLY that failed
+INDEX_STATE_SQL = sa.text(
+    "SELECT i.indisvalid, obj_description(i.indexrelid, 'pg_class') "
+    "FROM pg_index i WHERE i.indexrelid = to_regclass(:name)"
+)
+
+
+def _index_state(name: str):
+    return op.get_bind().execute(INDEX_STATE_SQL, {'name': name}).first()
+
+
+def _create_index(name: str, definition: str) -> bool:
+    """
+    Build an index concurrently unless a valid one exists
+
+    Safe to repeat after a failed build or a pod that died before alembic
+    stamped the revision: an invalid leftover is dropped and rebuilt.
+
+    Returns:
+        True if the index was built here
+    """
+    state = _index_state(name)
+    if state is not None and state.indisvalid:
+        return False
+    if state is not None:
+        op.execute(f'DROP INDEX CONCURRENTLY {name}')
+    op.execute(f'CREATE INDEX CONCURRENTLY {name} ON {definition}')
+    return True
+
+
+def upgrade() -> None:
+    # CONCURRENTLY keeps the tables writable while the indexes build (this
+    # runs at pod start); it cannot run inside the migration transaction.
+    with op.get_context().autocommit_block():
+        for name, definition in TRANSACTION_INDEXES.items():
+            if _create_index(name, f'transactions USING {definition}'):
+                op.execute(f"COMMENT ON INDEX {name} IS '{CREATED_BY}'")
+
+        for name, definition in OWN_INDEXES.items():
+            _create_index(name, definition)
+
+        op.execute('ANALYZE transactions')
+        op.execute('ANALYZE invoice_summaries')  # statistics for the lower(supplier) expression
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name in OWN_INDEXES:
+            op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+        for name in TRANSACTION_INDEXES:
+            state = _index_state(name)
+            if state is not None and state[1] == CREATED_BY:
+                op.execute(f'DROP INDEX CONCURRENTLY {name}')
@@ -1,205 +1,478 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
-from sqlalchemy.orm import Session
-from datetime import datetime
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Query, Request
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from sqlalchemy import select, or_
+from sqlalchemy.orm import load_only
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import date, datetime, time
+from typing import Optional
 from pathlib import Path
+from uuid import uuid4
 
-from app.database import get_db, get_ai2_db
+from app.config import get_settings
+from app.database import get_db, get_ai2_db, SessionLocal
 from app.models.invoice import Invoice
-from app.schemas.invoice import InvoiceResponse, InvoiceListResponse, InvoiceApprove
-from app.services.file_service import save_uploaded_file
-from app.services.ai_client import extract_invoice_data
+from app.models.invoice_summary import InvoiceSummary
+from app.schemas.invoice import (
+    InvoiceResponse, InvoiceListResponse, InvoiceApprove,
+    BatchUploadResponse, BatchStatusResponse, BatchFileResult,
+    BatchApproveRequest, BatchApproveResponse
+)
+from app.services.file_service import save_uploaded_file, delete_file, lock_blob
+from app.services.batch_service import save_batch_files, create_batch_invoices
+from app.services.approval_service import approval_error, approve_invoices
+from app.services.extraction_queue import enqueue_extraction, enqueue_waiting_duplicate, worker_pool
+from app.services.response_cache import response_cache, cache_key, INVOICE, INVOICE_LIST
+from app.services.invoice_events import invoice_events, event_stream
+from app.services.invoice_summary import (
+    summary_filters, invoice_list_query, count_invoice_summaries,
+    historical_invoice_id, HISTORICAL_ID_OFFSET
+)
 from app.utils.validators import validate_file
-
-router = APIRouter(prefix="/api/invoices", tags=["invoices"])
-
-
-@router.post("/upload", response_model=InvoiceResponse, status_code=201)
+from app.utils.pagination import encode_cursor, decode_cursor
+from app.utils.etag import conditional_response
+from app.utils.serialization import dump_json, select_fields
+from app.utils.metrics import stage, UPLOADS
+
+settings = get_settings()
+
+# orjson instead of stdlib json for every response body of this router
+router = APIRouter(prefix="/api/invoices", tags=["invoices"], default_response_class=ORJSONResponse)
+
+
+async def _get_uploaded_invoice(db: AsyncSession, invoice_id: int, *options) -> Invoice | None:
+    """Load an uploaded invoice; historical (AI2) ids are never in the main database"""
+    if invoice_id >= HISTORICAL_ID_OFFSET:
+        return None
+    return await db.get(Invoice, invoice_id, options=options)
+
+
+def _historical_invoice(summary: InvoiceSummary, names: list[str]) -> dict:
+    """Selected InvoiceResponse fields of an AI2 invoice summary"""
+    created_at = datetime.combine(summary.first_date, time()) if summary.first_date else None
+    invoice = {
+        "id": historical_invoice_id(summary.fakturanr),
+        "created_at": created_at,
+        "updated_at": created_at,
+        "extracted_at": None,
+        "approved_at": None,
+        "status": "approved",
+        "original_filename": f"Faktura {summary.fakturanr}",
+        "file_type": "historical",
+        "file_path": "",  # AI2 transactions don't have file paths
+        "file_size": None,
+        "content_hash": None,
+        "batch_id": None,
+        "raw_ai_data": None,
+        "user_validated_data": None,
+        "error_message": None
+    }
+    # total, supplier and line_count are only loaded when raw_ai_data is selected
+    if "raw_ai_data" in names:
+        invoice["raw_ai_data"] = {
+            "invoice_number": summary.fakturanr,
+            "total": summary.total,
+            "supplier": {
+                "name": summary.supplier or "Okänd leverantör"
+            },
+            "line_count": summary.line_count
+        }
+    return {name: invoice[name] for name in names}
+
+
+@router.post("/upload", response_model=InvoiceResponse, status_code=202)
 async def upload_invoice(
     file: UploadFile = File(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
-    Upload and extract invoice data
+    Upload invoice and queue it for extraction
 
     Flow:
     1. Validate file (type, size)
-    2. Save to storage with organized path
-    3. Create invoice record (status='uploaded')
-    4. Call AI extractor
-    5. Update invoice with extracted data (status='extracted')
-    6. Return invoice with AI data
+    2. Save to content-addressed storage (identical files share one blob)
+    3. Create invoice record; if the same content was already extracted,
+       reuse that raw_ai_data (status='extracted')
+    4. Otherwise create the invoice (status='extracting') and an extraction job
+       in one transaction
+    5. Return 202 with the invoice; a worker calls the AI extractor and
+       moves the invoice to 'extracted' or 'extraction_failed'
     """
     # 1. Validate file
-    validate_file(file)
+    try:
+        with stage("validate"):
+            validate_file(file)
+    except HTTPException:
+        UPLOADS.labels("rejected").inc()
+        raise
 
     # 2. Save file to storage
     try:
-        relative_path, file_size = await save_uploaded_file(file)
+        with stage("save"):
+            relative_path, file_size, content_hash = await save_uploaded_file(file, db)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Failed to save file: {str(e)}"
         )
 
-    # 3. Create invoice record in database
+    # 3. Look for a previous successful extraction of identical content
+    with stage("dedup_lookup"):
+        previous = await db.scalar(select(Invoice).where(
+            Invoice.content_hash == content_hash,
+            Invoice.status.in_(["extracted", "approved"]),
+            Invoice.raw_ai_data.isnot(None)
+        ).order_by(Invoice.extracted_at.desc()).limit(1))
+
     file_ext = Path(file.filename).suffix
     invoice = Invoice(
         original_filename=file.filename,
         file_type=file_ext.lstrip('.'),
         file_path=relative_path,
         file_size=file_size,
-        status="uploaded"
+        content_hash=content_hash,
+        status="extracting"
     )
 
-    db.add(invoice)
-    db.commit()
-    db.refresh(invoice)
+    if previous:
+        invoice.raw_ai_data = previous.raw_ai_data
+        invoice.status = "extracted"
+        invoice.extracted_at = datetime.utcnow()
+        with stage("insert"):
+            db.add(invoice)
+            await db.commit()
+            await db.refresh(invoice)
+        await response_cache.invalidate(INVOICE, invoice.id)
+        UPLOADS.labels("extracted").inc()
+        return invoice
+
+    # 4. Create invoice record and extraction job atomically
+    with stage("insert"):
+        db.add(invoice)
+        await db.flush()
+        enqueue_extraction(db, invoice.id)
+        await db.commit()
+        await db.refresh(invoice)
+    await response_cache.invalidate(INVOICE, invoice.id)
+    UPLOADS.labels("queued").inc()
+
+    worker_pool.wake()
+
+    # 5. Return invoice (poll GET /api/invoices/{id} for the extraction result)
+    return invoice
 
-    # 4. Call AI extractor
-    try:
-        extraction_result = await extract_invoice_data(
-            invoice_id=invoice.id,
-            file_path=relative_path
-        )
 
-        # 5. Update invoice with extracted data
-        if extraction_result.get("status") == "success":
-            invoice.raw_ai_data = extraction_result.get("raw_ai_data")
-            invoice.status = "extracted"
-            invoice.extracted_at = datetime.utcnow()
-        else:
-            invoice.status = "extraction_failed"
-            invoice.error_message = extraction_result.get("error", "Unknown extraction error")
-
-        db.commit()
-        db.refresh(invoice)
-
-    except HTTPException as e:
-        # AI service error - mark as extraction_failed but don't raise
-        invoice.status = "extraction_failed"
-        invoice.error_message = e.detail
-        db.commit()
-        db.refresh(invoice)
+@router.post("/upload-batch", response_model=BatchUploadResponse, status_code=202)
+async def upload_invoice_batch(
+    files: list[UploadFile] = File(...),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Upload many invoices at once and queue them for extraction
 
-    except Exception as e:
-        # Unexpected error
-        invoice.status = "extraction_failed"
-        invoice.error_message = f"Extraction error: {str(e)}"
-        db.commit()
-        db.refresh(invoice)
+    Accepts invoice files and/or ZIP archives of invoices (up to
+    BATCH_MAX_FILES files in total). Files are streamed to storage, all
+    invoice rows and extraction jobs are created in one transaction, and the
+    extraction workers process the jobs with bounded concurrency.
 
-    # 6. Return invoice
-    return invoice
+    A file that fails validation is reported as 'rejected' without failing the
+    rest of the batch. Poll GET /api/invoices/batches/{batch_id} for progress.
+
+    Returns:
+        Batch id and per-file status (queued | extracted | rejected)
+    """
+    batch_id = str(uuid4())
+
+    with stage("batch_save"):
+        entries = await save_batch_files(files, db)
+    with stage("batch_insert"):
+        results = await create_batch_invoices(db, batch_id, entries)
+    for result in results:
+        UPLOADS.labels(result.status).inc()
+    await response_cache.invalidate(INVOICE, *[r.invoice_id for r in results if r.invoice_id is not None])
+
+    worker_pool.wake()
+
+    return BatchUploadResponse(
+        batch_id=batch_id,
+        total=len(results),
+        queued=sum(1 for r in results if r.status == "queued"),
+        extracted=sum(1 for r in results if r.status == "extracted"),
+        rejected=sum(1 for r in results if r.status == "rejected"),
+        files=results
+    )
+
+
+@router.get("/batches/{batch_id}", response_model=BatchStatusResponse)
+async def get_batch_status(
+    batch_id: str,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Get extraction progress of a batch upload
+
+    Args:
+        batch_id: Batch id returned by POST /upload-batch
+
+    Returns:
+        Invoice count per status and the status of every invoice in the batch
+
+    Raises:
+        HTTPException: 404 if no invoices belong to the batch
+    """
+    rows = (await db.execute(select(
+        Invoice.id, Invoice.original_filename, Invoice.status, Invoice.error_message
+    ).where(Invoice.batch_id == batch_id).order_by(Invoice.id))).all()
+
+    if not rows:
+        raise HTTPException(status_code=404, detail="Batch not found")
+
+    status_counts: dict[str, int] = {}
+    for row in rows:
+        status_counts[row.status] = status_counts.get(row.status, 0) + 1
+
+    return BatchStatusResponse(
+        batch_id=batch_id,
+        total=len(rows),
+        status_counts=status_counts,
+        files=[
+            BatchFileResult(
+                filename=row.original_filename,
+                status=row.status,
+                invoice_id=row.id,
+                error=row.error_message
+            )
+            for row in rows
+        ]
+    )
+
+
+# Declared before /{invoice_id}, which would otherwise match /events
+@router.get("/events", response_class=StreamingResponse)
+async def stream_invoice_events(
+    ids: Optional[str] = None,
+    batch_id: Optional[str] = None
+):
+    """
+    Server-sent events for invoice status changes (instead of polling)
+
+    Pushes uploaded -> extracting -> extracted / extraction_failed (and
+    approved) transitions as "status" events with data
+    {id, status, batch_id, error_message}. The stream starts with the current
+    status of the followed invoices, so nothing is missed between upload and
+    subscribing. When following ids or a batch it ends with a "done" event once
+    all of them have a final status; ids that do not exist are listed in a
+    "not_found" event first (and an unknown batch is done at once). Without
+    filters it streams every change.
+
+    Changes made on any replica arrive via Postgres LISTEN/NOTIFY. If this
+    replica's listener reconnects the stream is closed; EventSource then
+    reconnects and gets the current status again.
+
+    Args:
+        ids: Comma-separated invoice ids to follow
+        batch_id: Batch id from POST /upload-batch to follow
+
+    Returns:
+        text/event-stream
+
+    Raises:
+        400: Malformed ids or more than BATCH_MAX_FILES ids
+        503: The event listener is not connected
+    """
+    try:
+        invoice_ids = {int(i) for i in ids.split(",") if i.strip()} if ids else set()
+    except ValueError:
+        raise HTTPException(
+            status_code=400,
+            detail="ids must be comma-separated invoice ids"
+        )
+    if len(invoice_ids) > settings.BATCH_MAX_FILES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Cannot follow more than {settings.BATCH_MAX_FILES} invoices"
+        )
+    if not invoice_events.listening:
+        raise HTTPException(
+            status_code=503,
+            detail="Invoice events are temporarily unavailable"
+        )
+
+    # Subscribe first, then read the current status: a change in between is
+    # delivered as an event instead of being lost
+    subscription = invoice_events.subscribe(invoice_ids, batch_id)
+    current = []
+    try:
+        conditions = []
+        if invoice_ids:
+            conditions.append(Invoice.id.in_([i for i in invoice_ids if 0 < i < HISTORICAL_ID_OFFSET]))
+        if batch_id:
+            conditions.append(Invoice.batch_id == batch_id)
+        if conditions:
+            async with SessionLocal() as db:
+                rows = (await db.execute(select(
+                    Invoice.id, Invoice.status, Invoice.batch_id, Invoice.error_message
+                ).where(or_(*conditions)).order_by(Invoice.id))).all()
+            current = [row._asdict() for row in rows]
+    except BaseException:
+        invoice_events.unsubscribe(subscription)
+        raise
+
+    return StreamingResponse(
+        event_stream(subscription, current),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 @router.get("/{invoice_id}", response_model=InvoiceResponse)
 async def get_invoice(
     invoice_id: int,
-    db: Session = Depends(get_db)
+    request: Request,
+    fields: Optional[str] = None,
+    exclude: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Retrieve a single invoice by ID
 
+    The response carries a strong ETag; send it back in If-None-Match to get
+    304 Not Modified while the invoice is unchanged (e.g. when polling). The
+    body is cached for RESPONSE_CACHE_INVOICE_TTL and dropped on every write.
+
+    Only the requested columns are read from the database, so e.g.
+    ?exclude=raw_ai_data,user_validated_data never loads the JSONB blobs.
+
     Args:
         invoice_id: Invoice ID to retrieve
+        fields: Comma-separated fields to return (default: all; id is always returned)
+        exclude: Comma-separated fields to leave out
 
     Returns:
-        Invoice data with all fields
+        Invoice data with the selected fields, or 304 if the client's copy is current
 
     Raises:
         404: Invoice not found
+        400: Unknown field name
     """
-    invoice = db.query(Invoice).filter(Invoice.id == invoice_id).first()
+    names = select_fields(fields, exclude)
 
-    if not invoice:
-        raise HTTPException(
-            status_code=404,
-            detail=f"Invoice with id {invoice_id} not found"
+    async def load() -> bytes:
+        invoice = await _get_uploaded_invoice(
+            db, invoice_id, load_only(*[getattr(Invoice, name) for name in names])
         )
 
-    return invoice
+        if not invoice:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Invoice with id {invoice_id} not found"
+            )
+
+        return dump_json({name: getattr(invoice, name) for name in names})
+
+    key = f"{invoice_id}?{cache_key(fields=','.join(names))}"
+    return conditional_response(request, await response_cache.get_or_set(INVOICE, key, load))
 
 
 @router.get("", response_model=InvoiceListResponse)
 async def list_invoices(
-    skip: int = 0,
-    limit: int = 20,
+    request: Request,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
     status: str = None,
-    ai2_db: Session = Depends(get_ai2_db)
+    cursor: Optional[str] = None,
+    exact_total: bool = False,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    supplier: Optional[str] = None,
+    fields: Optional[str] = None,
+    exclude: Optional[str] = None,
+    ai2_db: AsyncSession = Depends(get_ai2_db)
 ):
     """
-    List invoices from AI2 database transactions table (grouped by fakturanr)
+    List invoices from AI2 database (invoice_summaries, one row per fakturanr)
+
+    Invoices are ordered newest first by (first_date, fakturanr). Page with the
+    opaque cursor from next_cursor: each page is an index range scan, so deep
+    pages cost the same as the first. skip still works but reads and discards
+    every row before the page.
+
+    Invoice ids are stable digests of fakturanr (historical_invoice_id). The
+    response carries a strong ETag; If-None-Match with it returns 304 while the
+    page is unchanged. Pages are cached for RESPONSE_CACHE_LIST_TTL and dropped
+    when a summary refresh writes rows.
 
     Args:
-        skip: Number of records to skip (default: 0)
-        limit: Maximum number of records to return (default: 20, max: 100)
+        skip: Number of records to skip (default: 0; cannot be combined with cursor)
+        limit: Maximum number of records to return (default: 20, 1-100)
         status: Filter by status (not used for ai2 data, kept for API compatibility)
+        cursor: next_cursor from the previous page (same filters)
+        exact_total: Return the exact count instead of the planner estimate
+        date_from: Only invoices dated on or after this date (YYYY-MM-DD)
+        date_to: Only invoices dated on or before this date (YYYY-MM-DD)
+        supplier: Only suppliers whose name starts with this (case-insensitive)
+        fields: Comma-separated invoice fields to return (default: all; id is always returned)
+        exclude: Comma-separated invoice fields to leave out, e.g. raw_ai_data
 
     Returns:
-        InvoiceListResponse with invoices array and total count
-    """
-    from sqlalchemy import func, distinct
-    from app.models.transaction import Transaction
-    from app.schemas.invoice import InvoiceResponse
+        InvoiceListResponse with invoices array, total count and next_cursor,
+        or 304 if the client's copy is current
 
-    # Validate limit
-    if limit > 100:
+    Raises:
+        400: Malformed cursor, cursor combined with skip, or unknown field name
+        422: limit outside 1-100 or negative skip
+    """
+    if cursor and skip:
         raise HTTPException(
             status_code=400,
-            detail="Limit cannot exceed 100"
-        )
-
-    # Get total count of unique invoice numbers
-    total = ai2_db.query(func.count(distinct(Transaction.fakturanr))).scalar()
-
-    # Query transactions grouped by fakturanr
-    grouped_invoices = ai2_db.query(
-        Transaction.fakturanr,
-        func.min(Transaction.ver_datum).label('first_date'),
-        func.sum(Transaction.belopp).label('total_amount'),
-        func.min(Transaction.f_t).label('supplier_name'),
-        func.count(Transaction.id).label('line_count')
-    ).filter(
-        Transaction.fakturanr.isnot(None)
-    ).group_by(
-        Transaction.fakturanr
-    ).order_by(
-        func.min(Transaction.ver_datum).desc()
-    ).offset(skip).limit(limit).all()
-
-    # Map to InvoiceResponse format
-    invoices = []
-    for inv in grouped_invoices:
-        invoice_data = InvoiceResponse(
-            id=hash(inv.fakturanr) % 2147483647,  # Generate numeric ID from fakturanr
-            created_at=inv.first_date,
-            updated_at=inv.first_date,
-            status="approved",
-            original_filename=f"Faktura {inv.fakturanr}",
-            file_type="historical",
-            file_path="",  # AI2 transactions don't have file paths
-            raw_ai_data={
-                "invoice_number": inv.fakturanr,
-                "total": inv.total_amount,
-                "supplier": {
-                    "name": inv.supplier_name or "Okänd leverantör"
-                },
-                "line_count": inv.line_count
-            }
+            detail="Use either cursor or skip, not both"
         )
-        invoices.append(invoice_data)
 
-    return InvoiceListResponse(
-        invoices=invoices,
-        total=total
+    names = select_fields(fields, exclude)
+
+    # The sort key is always needed (id, cursor); the rest only for raw_ai_data
+    columns = [InvoiceSummary.first_date, InvoiceSummary.fakturanr]
+    if "raw_ai_data" in names:
+        columns += [InvoiceSummary.total, InvoiceSummary.supplier, InvoiceSummary.line_count]
+
+    async def load() -> bytes:
+        conditions = summary_filters(date_from, date_to, supplier)
+        total, total_is_estimate = await count_invoice_summaries(ai2_db, conditions, exact=exact_total)
+
+        # Summaries are maintained from transactions by app.services.invoice_summary.
+        # One extra row tells whether there is a next page.
+        query = invoice_list_query(conditions, after=decode_cursor(cursor) if cursor else None, skip=skip)
+        grouped_invoices = (await ai2_db.scalars(query.options(load_only(*columns)).limit(limit + 1))).all()
+        has_more = len(grouped_invoices) > limit
+        grouped_invoices = grouped_invoices[:limit]
+        next_cursor = None
+        if has_more and grouped_invoices:
+            last = grouped_invoices[-1]
+            next_cursor = encode_cursor(last.first_date, last.fakturanr)
+
+        # Map to the InvoiceResponse shape, keeping only the selected fields
+        invoices = [_historical_invoice(inv, names) for inv in grouped_invoices]
+
+        return dump_json({
+            "invoices": invoices,
+            "total": total,
+            "total_is_estimate": total_is_estimate,
+            "next_cursor": next_cursor
+        })
+
+    key = cache_key(
+        skip=skip, limit=limit, cursor=cursor, exact_total=exact_total,
+        date_from=date_from, date_to=date_to, supplier=supplier, fields=",".join(names)
     )
+    return conditional_response(request, await response_cache.get_or_set(INVOICE_LIST, key, load))
 
 
 @router.post("/{invoice_id}/approve", response_model=InvoiceResponse)
 async def approve_invoice(
     invoice_id: int,
     approval_data: InvoiceApprove,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Approve invoice with user corrections/validations
@@ -224,7 +497,7 @@ async def approve_invoice(
         400: Invoice not in correct status for approval
     """
     # 1. Retrieve invoice
-    invoice = db.query(Invoice).filter(Invoice.id == invoice_id).first()
+    invoice = await _get_uploaded_invoice(db, invoice_id)
 
     if not invoice:
         raise HTTPException(
@@ -233,16 +506,11 @@ async def approve_invoice(
         )
 
     # 2. Validate status - can only approve extracted invoices
-    if invoice.status == "extraction_failed":
+    error = approval_error(invoice.status)
+    if error:
         raise HTTPException(
             status_code=400,
-            detail=f"Cannot approve invoice with status 'extraction_failed'. Extraction must succeed before approval."
-        )
-
-    if invoice.status != "extracted":
-        raise HTTPException(
-            status_code=400,
-            detail=f"Cannot approve invoice with status '{invoice.status}'. Only 'extracted' invoices can be approved."
+            detail=error
         )
 
     # 3. Save user-validated data
@@ -255,17 +523,56 @@ async def approve_invoice(
     invoice.approved_at = datetime.utcnow()
 
     # Commit changes
-    db.commit()
-    db.refresh(invoice)
+    await db.commit()
+    await db.refresh(invoice)
+    await response_cache.invalidate(INVOICE, invoice_id)
 
     # 6. Return updated invoice
     return invoice
 
 
+@router.post("/approve-batch", response_model=BatchApproveResponse)
+async def approve_invoice_batch(
+    batch: BatchApproveRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Approve many invoices with their user-validated data at once
+
+    All invoices are validated with one query and approved with one UPDATE in
+    a single transaction (instead of a lookup, commit and refresh per invoice).
+
+    By default the batch is all or nothing: if any invoice is missing,
+    duplicated or not in 'extracted' status, nothing is approved. With
+    skip_invalid the valid invoices are approved and the others reported as
+    'skipped'.
+
+    Args:
+        batch: Invoices ({invoice_id, validated_data}) and skip_invalid
+
+    Returns:
+        Counts and per-invoice results (approved | skipped), in request order
+
+    Raises:
+        400: More than APPROVE_BATCH_MAX_INVOICES invoices, or invalid invoices
+            without skip_invalid (detail.invalid lists them)
+    """
+    results = await approve_invoices(db, batch.invoices, skip_invalid=batch.skip_invalid)
+    await response_cache.invalidate(INVOICE, *[r.invoice_id for r in results if r.status == "approved"])
+
+    approved = sum(1 for r in results if r.status == "approved")
+    return BatchApproveResponse(
+        total=len(results),
+        approved=approved,
+        skipped=len(results) - approved,
+        results=results
+    )
+
+
 @router.delete("/{invoice_id}", status_code=204)
 async def delete_invoice(
     invoice_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Delete invoice by ID
@@ -284,7 +591,7 @@ async def delete_invoice(
         404: Invoice not found
     """
     # Retrieve invoice
-    invoice = db.query(Invoice).filter(Invoice.id == invoice_id).first()
+    invoice = await _get_uploaded_invoice(db, invoice_id)
 
     if not invoice:
         raise HTTPException(
@@ -292,18 +599,22 @@ async def delete_invoice(
             detail=f"Invoice with id {invoice_id} not found"
         )
 
-    # Delete associated file from storage (if exists)
-    if invoice.file_path:
-        try:
-            file_service = FileService()
-            file_service.delete_file(invoice.file_path)
-        except Exception as e:
-            # Log but don't fail - file might already be deleted
-            print(f"Warning: Could not delete file {invoice.file_path}: {e}")
-
-    # Delete from database
-    db.delete(invoice)
-    db.commit()
+    # Delete from database; duplicates waiting for this invoice's extraction
+    # get a job of their own
+    file_path = invoice.file_path
+    await enqueue_waiting_duplicate(db, invoice)
+    await db.delete(invoice)
+    await db.commit()
+    await response_cache.invalidate(INVOICE, invoice_id)
+
+    # Delete associated file from storage unless another invoice shares the blob.
+    # The exclusive lock waits for uploads that are reusing the blob to commit.
+    if file_path:
+        await lock_blob(db, file_path, exclusive=True)
+        shared = await db.scalar(select(Invoice.id).where(Invoice.file_path == file_path).limit(1))
+        if not shared:
+            await delete_file(file_path)
+        await db.commit()
 
     # 204 No Content - successful deletion
     return
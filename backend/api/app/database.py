@@ -1,51 +1,62 @@
-from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url, URL
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
 from app.config import get_settings
 
 settings = get_settings()
 
-# Create SQLAlchemy engine for main database
-engine = create_engine(
-    settings.DATABASE_URL,
+
+def async_url(url: str) -> URL:
+    """
+    Database URL with the asyncpg driver
+
+    DATABASE_URL / AI2_DATABASE_URL stay plain postgresql:// URLs so Alembic
+    (psycopg2) can use them unchanged.
+    """
+    return make_url(url).set(drivername="postgresql+asyncpg")
+
+
+# Create async SQLAlchemy engine for main database
+engine = create_async_engine(
+    async_url(settings.DATABASE_URL),
     pool_pre_ping=True,  # Verify connections before using
+    pool_size=settings.DATABASE_POOL_SIZE,
+    max_overflow=settings.DATABASE_MAX_OVERFLOW,
     echo=settings.ENVIRONMENT == "development"  # Log SQL in development
 )
 
-# Create SessionLocal class for main database
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Create session factory for main database. Objects stay loaded after commit:
+# an async session cannot lazy-load expired attributes during serialization.
+SessionLocal = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
 
 # Create Base class for models
 Base = declarative_base()
 
 
-# Create SQLAlchemy engine for AI2 database
-engine_ai2 = create_engine(
-    settings.AI2_DATABASE_URL,
+# Create async SQLAlchemy engine for AI2 database. It has its own pool, so slow
+# AI2 reports never hold connections that invoice requests are waiting for.
+engine_ai2 = create_async_engine(
+    async_url(settings.AI2_DATABASE_URL),
     pool_pre_ping=True,
+    pool_size=settings.AI2_DATABASE_POOL_SIZE,
+    max_overflow=settings.AI2_DATABASE_MAX_OVERFLOW,
     echo=settings.ENVIRONMENT == "development"
 )
 
-# Create SessionLocal class for AI2 database
-SessionLocalAI2 = sessionmaker(autocommit=False, autoflush=False, bind=engine_ai2)
+# Create session factory for AI2 database
+SessionLocalAI2 = async_sessionmaker(engine_ai2, autoflush=False, expire_on_commit=False)
 
 # Create Base class for AI2 models
 BaseAI2 = declarative_base()
 
 
-def get_db():
+async def get_db():
     """Dependency to get main database session"""
-    db = SessionLocal()
-    try:
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 
-def get_ai2_db():
+async def get_ai2_db():
     """Dependency to get AI2 database session"""
-    db = SessionLocalAI2()
-    try:
+    async with SessionLocalAI2() as db:
         yield db
-    finally:
-        db.close()
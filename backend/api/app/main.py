@@ -1,10 +1,17 @@
-from fastapi import FastAPI, Depends
+from fastapi import FastAPI, Depends, Response
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
-import httpx
 from app.config import get_settings
-from app.database import engine, Base, get_db
+from app.database import engine, engine_ai2, Base, get_db
+from app.services.extraction_queue import worker_pool
+from app.services.invoice_summary import summary_refresher
+from app.services.ai_client import get_client, close_client, breaker
+from app.services.response_cache import response_cache
+from app.services.invoice_events import invoice_events
+from app.utils.metrics import MetricsMiddleware
+from app.utils.tracing import setup_tracing, shutdown_tracing
 
 settings = get_settings()
 
@@ -22,14 +29,43 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],  # conditional GETs on invoice endpoints
 )
 
+# Request counts and latency per route for /metrics
+app.add_middleware(MetricsMiddleware)
+
+# Spans for requests, SQL and extractor calls (TRACING_EXPORTER, off by default)
+setup_tracing(app, engines=[engine, engine_ai2])
+
 # Create database tables (in production, use Alembic migrations instead)
 @app.on_event("startup")
 async def startup_event():
     """Create database tables on startup (development only)"""
     if settings.ENVIRONMENT == "development":
-        Base.metadata.create_all(bind=engine)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    # Start extraction workers (set EXTRACTION_WORKERS=0 to disable on this replica)
+    worker_pool.start()
+
+    # Keep AI2 invoice summaries current (set AI2_SUMMARY_REFRESH_INTERVAL=0 to disable)
+    summary_refresher.start()
+
+    # LISTEN for invoice status changes (SSE at /api/invoices/events)
+    invoice_events.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop extraction workers; unfinished jobs are reclaimed after their lease expires"""
+    await worker_pool.stop()
+    await summary_refresher.stop()
+    await invoice_events.stop()
+    await close_client()
+    await engine.dispose()
+    await engine_ai2.dispose()
+    shutdown_tracing()
 
 
 @app.get("/")
@@ -43,7 +79,7 @@ async def root():
 
 
 @app.get("/health")
-async def health_check(db: Session = Depends(get_db)):
+async def health_check(db: AsyncSession = Depends(get_db)):
     """
     Health check endpoint with real DB and AI extractor connectivity checks
 
@@ -51,16 +87,18 @@ async def health_check(db: Session = Depends(get_db)):
         - status: overall status (healthy/degraded/unhealthy)
         - database: DB connection status (connected/disconnected)
         - ai_extractor: AI service status (reachable/unreachable/not_configured)
+        - ai_extractor_circuit: circuit breaker state (closed/open/half_open)
     """
     health_status = {
         "status": "healthy",
         "database": "disconnected",
-        "ai_extractor": "not_configured"
+        "ai_extractor": "not_configured",
+        "ai_extractor_circuit": breaker.state
     }
 
     # Check database connectivity
     try:
-        db.execute(text("SELECT 1"))
+        await db.execute(text("SELECT 1"))
         health_status["database"] = "connected"
     except Exception as e:
         health_status["database"] = "disconnected"
@@ -69,13 +107,12 @@ async def health_check(db: Session = Depends(get_db)):
     # Check AI extractor connectivity
     if settings.AI_EXTRACTOR_URL:
         try:
-            async with httpx.AsyncClient(timeout=5.0) as client:
-                response = await client.get(f"{settings.AI_EXTRACTOR_URL}/health")
-                if response.status_code == 200:
-                    health_status["ai_extractor"] = "reachable"
-                else:
-                    health_status["ai_extractor"] = "unreachable"
-                    health_status["status"] = "degraded"
+            response = await get_client().get("/health", timeout=5.0)
+            if response.status_code == 200:
+                health_status["ai_extractor"] = "reachable"
+            else:
+                health_status["ai_extractor"] = "unreachable"
+                health_status["status"] = "degraded"
         except Exception:
             health_status["ai_extractor"] = "unreachable"
             health_status["status"] = "degraded"
@@ -84,11 +121,34 @@ async def health_check(db: Session = Depends(get_db)):
 
 
 @app.get("/api/health")
-async def api_health_check(db: Session = Depends(get_db)):
+async def api_health_check(db: AsyncSession = Depends(get_db)):
     """Health check endpoint with /api prefix for ingress compatibility"""
     return await health_check(db)
 
 
+@app.get("/api/cache/stats")
+async def cache_stats():
+    """
+    Response cache statistics
+
+    Returns:
+        Backend, entry count, evictions, and hits/misses/hit_rate per namespace
+        (counters are those of the worker process that answered)
+    """
+    return await response_cache.stats()
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """
+    Prometheus metrics (pipeline stage histograms, upload/extraction counters,
+    HTTP request counts and latency)
+
+    Not under /api, so only reachable inside the cluster.
+    """
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
 # Import and include routers
 from app.api.routes import invoices
 
@@ -0,0 +1,47 @@
+from sqlalchemy import Column, Integer, String, TIMESTAMP, Text, ForeignKey
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class ExtractionJob(Base):
+    """Durable extraction job, claimed by workers with SELECT ... FOR UPDATE SKIP LOCKED"""
+
+    __tablename__ = "extraction_jobs"
+
+    # Primary key
+    id = Column(Integer, primary_key=True, index=True)
+
+    # Invoice to extract
+    invoice_id = Column(
+        Integer,
+        ForeignKey("invoices.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True
+    )
+
+    # Timestamps (with timezone for UTC storage)
+    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+    # Status tracking
+    status = Column(
+        String(20),
+        default="queued",
+        server_default="queued",
+        nullable=False,
+        index=True
+    )  # queued | running | done | failed
+
+    # Lease: a 'running' job whose lease has expired is claimable again
+    locked_by = Column(String(100), nullable=True)
+    locked_until = Column(TIMESTAMP(timezone=True), nullable=True)
+    attempts = Column(Integer, default=0, server_default="0", nullable=False)
+
+    # Error tracking
+    last_error = Column(Text, nullable=True)
+
+    # W3C traceparent of the enqueuing request; the worker continues its trace
+    traceparent = Column(String(55), nullable=True)
+
+    def __repr__(self):
+        return f"<ExtractionJob(id={self.id}, invoice_id={self.invoice_id}, status={self.status})>"
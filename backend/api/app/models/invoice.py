@@ -31,6 +31,8 @@ class Invoice(Base):
     file_type = Column(String(10), nullable=False)  # 'pdf', 'png', 'xml'
     file_path = Column(String(500), nullable=False)
     file_size = Column(BigInteger, nullable=True)
+    content_hash = Column(String(64), nullable=True, index=True)  # SHA-256 of file content
+    batch_id = Column(String(36), nullable=True, index=True)  # set for batch uploads
 
     # AI extraction (JSONB for flexibility)
     raw_ai_data = Column(JSONB, nullable=True)
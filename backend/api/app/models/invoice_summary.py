@@ -0,0 +1,35 @@
+from sqlalchemy import Column, Integer, Text, Date, Float, TIMESTAMP, Index, func
+from app.database import BaseAI2
+
+
+class InvoiceSummary(BaseAI2):
+    """One row per fakturanr in AI2 transactions, maintained by app.services.invoice_summary"""
+
+    __tablename__ = "invoice_summaries"
+
+    fakturanr = Column(Text, primary_key=True)
+    first_date = Column(Date)  # min(ver_datum)
+    total = Column(Float)  # sum(belopp)
+    supplier = Column(Text)  # min(f_t)
+    line_count = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        # Newest first listing (ORDER BY first_date DESC, fakturanr DESC)
+        Index("ix_invoice_summaries_first_date", "first_date", "fakturanr"),
+        # Case-insensitive supplier prefix filter (lower(supplier) LIKE 'abc%')
+        Index(
+            "ix_invoice_summaries_supplier",
+            func.lower(supplier).label("supplier_lower"),
+            postgresql_ops={"supplier_lower": "text_pattern_ops"}
+        ),
+    )
+
+
+class InvoiceSummaryState(BaseAI2):
+    """Single-row refresh watermark: transactions imported up to here are summarized"""
+
+    __tablename__ = "invoice_summary_state"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)  # always 1
+    refreshed_until = Column(TIMESTAMP, nullable=True)  # max(transactions.imported_at) covered
+    refreshed_at = Column(TIMESTAMP, nullable=True)
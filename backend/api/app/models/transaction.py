@@ -1,4 +1,4 @@
-from sqlalchemy import Column, BigInteger, Text, Date, Float, TIMESTAMP
+from sqlalchemy import Column, BigInteger, Text, Date, Float, TIMESTAMP, Index, func
 from app.database import BaseAI2
 
 
@@ -21,4 +21,14 @@ class Transaction(BaseAI2):
     projekt = Column(BigInteger)
     projekt_t = Column(Text)
     belopp = Column(Float)
-    imported_at = Column(TIMESTAMP)
+    # Drives the incremental invoice_summaries refresh, so never NULL
+    imported_at = Column(TIMESTAMP, nullable=False, server_default=func.now(), index=True)
+
+    # Index names follow the AI2 export, which may already contain some of them
+    __table_args__ = (
+        Index("idx_transactions_fakturanr", "fakturanr"),
+        Index("idx_transactions_konto", "konto"),
+        Index("idx_transactions_resk_nr", "resk_nr"),
+        # Rows are imported roughly in date order, so a BRIN range index stays tiny
+        Index("idx_transactions_ver_datum", "ver_datum", postgresql_using="brin"),
+    )
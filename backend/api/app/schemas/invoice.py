@@ -28,6 +28,33 @@ class InvoiceApprove(BaseModel):
     validated_data: dict[str, Any]
 
 
+class InvoiceApproveItem(BaseModel):
+    """One invoice of a batch approval"""
+    invoice_id: int
+    validated_data: dict[str, Any]
+
+
+class BatchApproveRequest(BaseModel):
+    """Schema for approving many invoices at once"""
+    invoices: list[InvoiceApproveItem] = Field(..., min_length=1)
+    skip_invalid: bool = False  # approve the valid invoices instead of rejecting the whole batch
+
+
+class BatchApproveResult(BaseModel):
+    """Outcome for one invoice of a batch approval"""
+    invoice_id: int
+    status: str  # approved | skipped | invalid
+    error: Optional[str] = None
+
+
+class BatchApproveResponse(BaseModel):
+    """Schema for batch approval response"""
+    total: int
+    approved: int
+    skipped: int
+    results: list[BatchApproveResult]
+
+
 class InvoiceResponse(BaseModel):
     """Schema for invoice response"""
     id: int
@@ -42,6 +69,8 @@ class InvoiceResponse(BaseModel):
     file_type: str
     file_path: str
     file_size: Optional[int] = None
+    content_hash: Optional[str] = None
+    batch_id: Optional[str] = None
 
     raw_ai_data: Optional[dict[str, Any]] = None
     user_validated_data: Optional[dict[str, Any]] = None
@@ -56,3 +85,31 @@ class InvoiceListResponse(BaseModel):
     """Schema for paginated invoice list"""
     invoices: list[InvoiceResponse]
     total: int
+    total_is_estimate: bool = False  # True unless exact_total=true was requested
+    next_cursor: Optional[str] = None  # pass as ?cursor= for the next page; None on the last page
+
+
+class BatchFileResult(BaseModel):
+    """Outcome for one file of a batch upload"""
+    filename: str
+    status: str  # queued | extracted | rejected (upload); invoice status (batch status)
+    invoice_id: Optional[int] = None
+    error: Optional[str] = None
+
+
+class BatchUploadResponse(BaseModel):
+    """Schema for batch upload response"""
+    batch_id: str
+    total: int
+    queued: int
+    extracted: int
+    rejected: int
+    files: list[BatchFileResult]
+
+
+class BatchStatusResponse(BaseModel):
+    """Schema for batch progress"""
+    batch_id: str
+    total: int
+    status_counts: dict[str, int]
+    files: list[BatchFileResult]
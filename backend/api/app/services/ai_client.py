@@ -1,9 +1,124 @@
+"""
+Client for the AI extraction service
+
+One pooled httpx.AsyncClient is shared for the app lifetime (opened and closed by
+app.main), so calls reuse keep-alive connections. Gateway errors are retried with
+jittered exponential backoff, and a circuit breaker fails fast while the extractor
+is down instead of stacking up timeouts.
+"""
+import asyncio
+import random
+import time
 import httpx
 from fastapi import HTTPException
 from app.config import get_settings
+from app.utils.metrics import EXTRACTOR_CALLS
 
 settings = get_settings()
 
+# Gateway errors mean the extractor (or OpenAI behind it) is unavailable. A
+# plain 500 concerns one invoice and is neither retried nor a breaker failure.
+RETRY_STATUS_CODES = {502, 503, 504}
+
+_client: httpx.AsyncClient | None = None
+
+
+class CircuitOpenError(HTTPException):
+    """The circuit breaker rejected the call without contacting the extractor"""
+
+    def __init__(self):
+        super().__init__(status_code=503, detail="AI extraction service unavailable (circuit open)")
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker
+
+    closed: requests pass through; failure_threshold consecutive failures open it
+    open: requests fail immediately until reset_timeout has passed
+    half_open: one trial request is let through; success closes, failure reopens
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    @property
+    def accepting(self) -> bool:
+        """True if allow_request() would admit a request now (without taking the trial)"""
+        state = self.state
+        return state == "closed" or (state == "half_open" and not self._trial_in_flight)
+
+    def allow_request(self) -> bool:
+        """Return True if a request may be sent now"""
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def end_trial(self) -> None:
+        """Free the half-open trial slot when the trial ended without an outcome"""
+        self._trial_in_flight = False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+breaker = CircuitBreaker(
+    failure_threshold=settings.AI_EXTRACTOR_BREAKER_THRESHOLD,
+    reset_timeout=settings.AI_EXTRACTOR_BREAKER_RESET_SECONDS
+)
+
+
+def get_client() -> httpx.AsyncClient:
+    """Get the shared AI extractor client, creating it on first use"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            base_url=settings.AI_EXTRACTOR_URL,
+            timeout=settings.AI_EXTRACTOR_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=settings.AI_EXTRACTOR_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.AI_EXTRACTOR_MAX_KEEPALIVE
+            )
+        )
+    return _client
+
+
+async def close_client() -> None:
+    """Close the shared client (app shutdown)"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def _backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff"""
+    return random.uniform(0, settings.AI_EXTRACTOR_RETRY_BACKOFF * (2 ** attempt))
+
 
 async def extract_invoice_data(invoice_id: int, file_path: str) -> dict:
     """
@@ -11,7 +126,7 @@ async def extract_invoice_data(invoice_id: int, file_path: str) -> dict:
 
     Args:
         invoice_id: Database invoice ID
-        file_path: Relative file path (e.g., "2025/11/15/uuid_file.pdf")
+        file_path: Relative file path (e.g., "blobs/ab/cd/<sha256>.pdf")
 
     Returns:
         dict with keys:
@@ -21,32 +136,75 @@ async def extract_invoice_data(invoice_id: int, file_path: str) -> dict:
             - error: str (if failed)
 
     Raises:
-        HTTPException: If AI service is unreachable or times out
+        CircuitOpenError: If the circuit is open (the extractor was not called)
+        HTTPException: If AI service is unreachable, times out or returns an error
     """
+    trial = breaker.state == "half_open"
+    if not breaker.allow_request():
+        EXTRACTOR_CALLS.labels("circuit_open").inc()
+        raise CircuitOpenError()
+
     try:
-        async with httpx.AsyncClient(timeout=60.0) as client:
+        return await _post_extract(invoice_id, file_path)
+    finally:
+        if trial:
+            # A trial that raised something unrecorded (cancelled, bad JSON, ...)
+            # must not keep every later request out
+            breaker.end_trial()
+
+
+async def _post_extract(invoice_id: int, file_path: str) -> dict:
+    """POST /extract with retries, recording the outcome on the breaker"""
+    client = get_client()
+    attempt = 0
+
+    while True:
+        try:
             response = await client.post(
-                f"{settings.AI_EXTRACTOR_URL}/extract",
+                "/extract",
                 json={
                     "invoice_id": invoice_id,
                     "file_path": file_path
                 }
             )
+
+            if response.status_code in RETRY_STATUS_CODES and attempt < settings.AI_EXTRACTOR_RETRIES:
+                EXTRACTOR_CALLS.labels("retried").inc()
+                await asyncio.sleep(_backoff_delay(attempt))
+                attempt += 1
+                continue
+
             response.raise_for_status()
+            breaker.record_success()
+            EXTRACTOR_CALLS.labels("ok").inc()
             return response.json()
 
-    except httpx.TimeoutException:
-        raise HTTPException(
-            status_code=504,
-            detail=f"AI extraction service timeout after 60s for invoice {invoice_id}"
-        )
-    except httpx.HTTPStatusError as e:
-        raise HTTPException(
-            status_code=e.response.status_code,
-            detail=f"AI extraction failed: {e.response.text}"
-        )
-    except httpx.RequestError as e:
-        raise HTTPException(
-            status_code=503,
-            detail=f"AI extraction service unreachable: {str(e)}"
-        )
+        except httpx.TimeoutException:
+            breaker.record_failure()
+            EXTRACTOR_CALLS.labels("timeout").inc()
+            raise HTTPException(
+                status_code=504,
+                detail=f"AI extraction service timeout after {settings.AI_EXTRACTOR_TIMEOUT:g}s for invoice {invoice_id}"
+            )
+        except httpx.HTTPStatusError as e:
+            EXTRACTOR_CALLS.labels(f"http_{e.response.status_code}").inc()
+            if e.response.status_code in RETRY_STATUS_CODES:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            raise HTTPException(
+                status_code=e.response.status_code,
+                detail=f"AI extraction failed: {e.response.text}"
+            )
+        except httpx.RequestError as e:
+            if isinstance(e, httpx.ConnectError) and attempt < settings.AI_EXTRACTOR_RETRIES:
+                EXTRACTOR_CALLS.labels("retried").inc()
+                await asyncio.sleep(_backoff_delay(attempt))
+                attempt += 1
+                continue
+            breaker.record_failure()
+            EXTRACTOR_CALLS.labels("unreachable").inc()
+            raise HTTPException(
+                status_code=503,
+                detail=f"AI extraction service unreachable: {str(e)}"
+            )
@@ -0,0 +1,125 @@
+"""
+Invoice approval rules and batch approval
+
+A batch is approved in one transaction with two statements, however many
+invoices it holds: one SELECT ... FOR UPDATE reads and locks every invoice for
+validation, and one UPDATE ... FROM unnest() writes all validated data.
+"""
+from fastapi import HTTPException
+from sqlalchemy import Integer, bindparam, select, text
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.models.invoice import Invoice
+from app.schemas.invoice import InvoiceApproveItem, BatchApproveResult
+from app.services.invoice_summary import HISTORICAL_ID_OFFSET
+
+settings = get_settings()
+
+# One row per invoice in the two arrays, zipped by unnest
+APPROVE_BATCH_SQL = text("""
+    UPDATE invoices AS i
+    SET status = 'approved',
+        user_validated_data = v.validated_data,
+        approved_at = now(),
+        updated_at = now()
+    FROM unnest(:ids, :validated_data) AS v(id, validated_data)
+    WHERE i.id = v.id
+""").bindparams(
+    bindparam("ids", type_=ARRAY(Integer)),
+    bindparam("validated_data", type_=ARRAY(JSONB))
+)
+
+
+def approval_error(status: str) -> str | None:
+    """
+    Reason an invoice with this status cannot be approved
+
+    Args:
+        status: Current invoice status
+
+    Returns:
+        Error message, or None if the invoice can be approved
+    """
+    if status == "extraction_failed":
+        return "Cannot approve invoice with status 'extraction_failed'. Extraction must succeed before approval."
+    if status != "extracted":
+        return f"Cannot approve invoice with status '{status}'. Only 'extracted' invoices can be approved."
+    return None
+
+
+async def approve_invoices(
+    db: AsyncSession,
+    items: list[InvoiceApproveItem],
+    skip_invalid: bool = False
+) -> list[BatchApproveResult]:
+    """
+    Approve many invoices in one transaction
+
+    Args:
+        db: Open database session
+        items: Invoice ids with their user-validated data
+        skip_invalid: Approve the valid invoices and report the others as
+            'skipped', instead of approving nothing
+
+    Returns:
+        Per-invoice results (approved | skipped), in the order of items
+
+    Raises:
+        HTTPException: 400 if the batch is too large, or if an invoice is
+            missing, duplicated or not 'extracted' and skip_invalid is False
+            (detail lists the invalid invoices; nothing is approved)
+    """
+    if len(items) > settings.APPROVE_BATCH_MAX_INVOICES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch limit of {settings.APPROVE_BATCH_MAX_INVOICES} invoices exceeded"
+        )
+
+    # Historical (AI2) ids are never in the main database and overflow its int4 ids
+    ids = {item.invoice_id for item in items if 0 < item.invoice_id < HISTORICAL_ID_OFFSET}
+    statuses: dict[int, str] = {}
+    if ids:
+        statuses = dict((await db.execute(
+            select(Invoice.id, Invoice.status).where(Invoice.id.in_(ids)).with_for_update()
+        )).all())
+
+    results: list[BatchApproveResult] = []
+    valid: list[InvoiceApproveItem] = []
+    seen: set[int] = set()
+    for item in items:
+        if item.invoice_id in seen:
+            error = "Invoice appears more than once in the batch"
+        elif item.invoice_id not in statuses:
+            error = f"Invoice with id {item.invoice_id} not found"
+        else:
+            error = approval_error(statuses[item.invoice_id])
+        seen.add(item.invoice_id)
+
+        if error is None:
+            valid.append(item)
+            results.append(BatchApproveResult(invoice_id=item.invoice_id, status="approved"))
+        else:
+            results.append(BatchApproveResult(invoice_id=item.invoice_id, status="skipped", error=error))
+
+    if len(valid) < len(items) and not skip_invalid:
+        await db.rollback()
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "message": "Some invoices cannot be approved; nothing was approved",
+                "invalid": [
+                    result.model_copy(update={"status": "invalid"}).model_dump()
+                    for result in results if result.status == "skipped"
+                ]
+            }
+        )
+
+    if valid:
+        await db.execute(APPROVE_BATCH_SQL, {
+            "ids": [item.invoice_id for item in valid],
+            "validated_data": [item.validated_data for item in valid]
+        })
+    await db.commit()
+    return results
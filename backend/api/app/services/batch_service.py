@@ -0,0 +1,204 @@
+"""
+Batch upload of many invoices (individual files and/or ZIP archives)
+
+Every file, including every member of a ZIP archive, is streamed to
+content-addressed storage with save_stream, so neither uploads nor archive
+members are held in memory. All invoice rows and extraction jobs of a batch are
+then inserted in one transaction; the extraction worker pool fans the jobs out
+with EXTRACTION_WORKERS concurrency per replica. Identical files within a batch
+are extracted once.
+"""
+import asyncio
+import zipfile
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import PurePosixPath
+from fastapi import UploadFile, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.models.invoice import Invoice
+from app.schemas.invoice import BatchFileResult
+from app.services.file_service import save_stream, save_uploaded_file
+from app.services.extraction_queue import enqueue_extraction
+from app.utils.validators import validate_file, validate_file_extension, get_file_extension
+
+settings = get_settings()
+
+
+@dataclass
+class BatchEntry:
+    """A file of a batch after it has been saved (or rejected)"""
+    filename: str
+    file_path: str | None = None
+    file_size: int | None = None
+    content_hash: str | None = None
+    error: str | None = None
+
+
+def is_archive(file: UploadFile) -> bool:
+    """Check whether an uploaded file is a ZIP archive"""
+    return (
+        file.content_type in settings.ALLOWED_ARCHIVE_TYPES
+        or get_file_extension(file.filename or "") == "zip"
+    )
+
+
+def _member_filename(info: zipfile.ZipInfo) -> str | None:
+    """Filename of an archive member, or None for entries that are not invoices"""
+    path = PurePosixPath(info.filename)
+    if info.is_dir() or "__MACOSX" in path.parts or path.name.startswith("."):
+        return None
+    return path.name
+
+
+async def _save_archive(file: UploadFile, entries: list[BatchEntry], db: AsyncSession) -> None:
+    """Stream every invoice in a ZIP archive to storage"""
+    try:
+        archive = zipfile.ZipFile(file.file)
+    except zipfile.BadZipFile:
+        entries.append(BatchEntry(filename=file.filename, error="Invalid ZIP archive"))
+        return
+
+    with archive:
+        for info in archive.infolist():
+            filename = _member_filename(info)
+            if filename is None:
+                continue
+
+            entry = BatchEntry(filename=filename)
+            entries.append(entry)
+            if len(entries) > settings.BATCH_MAX_FILES:
+                entry.error = f"Batch limit of {settings.BATCH_MAX_FILES} files exceeded"
+                continue
+
+            try:
+                validate_file_extension(filename)
+                if info.file_size > settings.MAX_FILE_SIZE:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"File too large: {info.file_size} bytes. Maximum: {settings.MAX_FILE_SIZE} bytes"
+                    )
+                with archive.open(info) as member:
+                    entry.file_path, entry.file_size, entry.content_hash = await save_stream(
+                        lambda n: asyncio.to_thread(member.read, n),
+                        filename,
+                        db
+                    )
+            except HTTPException as e:
+                entry.error = e.detail
+            except (zipfile.BadZipFile, NotImplementedError, RuntimeError) as e:
+                # Corrupt member, unsupported compression or encrypted entry
+                entry.error = f"Cannot read from archive: {str(e)}"
+
+
+async def save_batch_files(files: list[UploadFile], db: AsyncSession) -> list[BatchEntry]:
+    """
+    Save all files of a batch to storage, expanding ZIP archives
+
+    A file that fails validation or cannot be saved is recorded with its error;
+    the rest of the batch continues. The blobs stay locked against deletion
+    until create_batch_invoices commits on the same session.
+
+    Args:
+        files: Uploaded invoice files and/or ZIP archives
+        db: Session that create_batch_invoices will use
+
+    Returns:
+        One BatchEntry per invoice file, in upload (and archive) order
+    """
+    entries: list[BatchEntry] = []
+
+    for file in files:
+        if is_archive(file):
+            await _save_archive(file, entries, db)
+            continue
+
+        entry = BatchEntry(filename=file.filename)
+        entries.append(entry)
+        if len(entries) > settings.BATCH_MAX_FILES:
+            entry.error = f"Batch limit of {settings.BATCH_MAX_FILES} files exceeded"
+            continue
+
+        try:
+            validate_file(file)
+            entry.file_path, entry.file_size, entry.content_hash = await save_uploaded_file(file, db)
+        except HTTPException as e:
+            entry.error = e.detail
+
+    return entries
+
+
+async def create_batch_invoices(db: AsyncSession, batch_id: str, entries: list[BatchEntry]) -> list[BatchFileResult]:
+    """
+    Insert invoices and extraction jobs for a batch in one transaction
+
+    Files whose content was already extracted reuse that raw_ai_data
+    (status='extracted'); the others are 'extracting'. Only the first file of
+    each content hash gets an extraction job: the extraction queue copies its
+    result to the duplicates when the job finishes.
+
+    Args:
+        db: Open database session
+        batch_id: Batch id stored on every invoice
+        entries: Saved files from save_batch_files
+
+    Returns:
+        Per-file results, in the order of entries
+    """
+    saved = [entry for entry in entries if entry.error is None]
+
+    # One query for all previous extractions of identical content
+    previous: dict[str, Invoice] = {}
+    hashes = {entry.content_hash for entry in saved}
+    if hashes:
+        for invoice in await db.scalars(select(Invoice).where(
+            Invoice.content_hash.in_(hashes),
+            Invoice.status.in_(["extracted", "approved"]),
+            Invoice.raw_ai_data.isnot(None)
+        ).order_by(Invoice.extracted_at.desc())):
+            previous.setdefault(invoice.content_hash, invoice)
+
+    invoices: dict[int, Invoice] = {}
+    for index, entry in enumerate(entries):
+        if entry.error is not None:
+            continue
+
+        invoice = Invoice(
+            original_filename=entry.filename,
+            file_type=get_file_extension(entry.filename),
+            file_path=entry.file_path,
+            file_size=entry.file_size,
+            content_hash=entry.content_hash,
+            batch_id=batch_id,
+            status="extracting"
+        )
+        if entry.content_hash in previous:
+            invoice.raw_ai_data = previous[entry.content_hash].raw_ai_data
+            invoice.status = "extracted"
+            invoice.extracted_at = datetime.utcnow()
+        invoices[index] = invoice
+
+    db.add_all(invoices.values())
+    await db.flush()
+    queued_hashes: set[str] = set()
+    for invoice in invoices.values():
+        if invoice.status == "extracting" and invoice.content_hash not in queued_hashes:
+            queued_hashes.add(invoice.content_hash)
+            enqueue_extraction(db, invoice.id)
+
+    results = []
+    for index, entry in enumerate(entries):
+        invoice = invoices.get(index)
+        if invoice is None:
+            results.append(BatchFileResult(filename=entry.filename, status="rejected", error=entry.error))
+        else:
+            results.append(BatchFileResult(
+                filename=entry.filename,
+                status="queued" if invoice.status == "extracting" else "extracted",
+                invoice_id=invoice.id
+            ))
+
+    await db.commit()
+    return results
@@ -0,0 +1,481 @@
+"""
+Durable extraction job queue backed by Postgres
+
+Upload inserts an extraction job in the same transaction as the invoice row and
+returns immediately. Worker tasks in every API replica claim jobs with
+SELECT ... FOR UPDATE SKIP LOCKED and hold a lease while the AI extractor runs.
+The lease is renewed while the call is in flight (retries and backoff included),
+so a slow extraction is not claimed a second time. If a pod dies mid-extraction
+renewals stop, the lease expires and another worker picks the job up.
+
+Each job stores the traceparent of the request that enqueued it, so the
+worker's spans (and the extractor's, via the HTTP hop) land in the trace of
+the upload.
+
+Identical files uploaded together get a single job (see
+batch_service.create_batch_invoices); the job's outcome is copied to the
+duplicates waiting on it.
+"""
+import asyncio
+import logging
+import os
+import socket
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from fastapi import HTTPException
+from opentelemetry.trace import SpanKind
+from sqlalchemy import Select, select, text, func, exists
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.database import SessionLocal
+from app.models.invoice import Invoice
+from app.models.extraction_job import ExtractionJob
+from app.services.ai_client import extract_invoice_data, breaker, CircuitOpenError
+from app.services.response_cache import response_cache, INVOICE
+from app.utils.metrics import stage, STAGE_SECONDS, EXTRACTIONS
+from app.utils.tracing import tracer, current_traceparent, traceparent_context
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Claim the oldest job that is queued (and not backing off) or whose lease expired.
+# SKIP LOCKED lets concurrent workers on all replicas claim different rows.
+CLAIM_JOB_SQL = text("""
+    UPDATE extraction_jobs
+    SET status = 'running',
+        locked_by = :worker_id,
+        locked_until = now() + make_interval(secs => :lease_seconds),
+        attempts = attempts + 1,
+        updated_at = now()
+    WHERE id = (
+        SELECT id FROM extraction_jobs
+        WHERE status IN ('queued', 'running')
+          AND (locked_until IS NULL OR locked_until < now())
+        ORDER BY id
+        FOR UPDATE SKIP LOCKED
+        LIMIT 1
+    )
+    RETURNING id, invoice_id, attempts, traceparent,
+              extract(epoch FROM now() - created_at) AS queued_seconds
+""")
+
+# Extend the lease of a job this worker still holds
+RENEW_LEASE_SQL = text("""
+    UPDATE extraction_jobs
+    SET locked_until = now() + make_interval(secs => :lease_seconds),
+        updated_at = now()
+    WHERE id = :job_id AND status = 'running' AND locked_by = :worker_id
+""")
+
+# Extractor responses worth retrying: gateway errors, timeouts and rate limiting.
+# Other errors (file not found, unsupported or corrupt file, a plain 500 for this
+# invoice) fail the same way again and would pay for OpenAI again.
+TRANSIENT_STATUS_CODES = {408, 429, 502, 503, 504}
+
+
+def _is_transient_error(status_code: int) -> bool:
+    """True if an extractor error status may succeed on a later attempt"""
+    return status_code in TRANSIENT_STATUS_CODES
+
+
+@dataclass
+class ClaimedJob:
+    """Job claimed by a worker, valid until its lease expires"""
+    job_id: int
+    invoice_id: int
+    file_path: str
+    attempts: int
+    queued_seconds: float = 0.0  # since the job was enqueued, at claim time
+    traceparent: str | None = None
+    claimed_at: float = field(default_factory=time.perf_counter)
+
+    def seconds_since_enqueued(self) -> float:
+        return self.queued_seconds + time.perf_counter() - self.claimed_at
+
+
+def enqueue_extraction(db: AsyncSession, invoice_id: int) -> ExtractionJob:
+    """
+    Add an extraction job for an invoice to the current transaction
+
+    The caller commits, so the invoice row and its job become visible atomically.
+    The job records the current trace, which the worker continues.
+
+    Args:
+        db: Open database session
+        invoice_id: Invoice to extract
+
+    Returns:
+        The pending ExtractionJob
+    """
+    job = ExtractionJob(invoice_id=invoice_id, status="queued", traceparent=current_traceparent())
+    db.add(job)
+    return job
+
+
+def _waiting_duplicates(invoice: Invoice) -> Select:
+    """Invoices of the same content that wait for this invoice's extraction (no job of their own)"""
+    return select(Invoice).where(
+        Invoice.content_hash == invoice.content_hash,
+        Invoice.id != invoice.id,
+        Invoice.status == "extracting",
+        ~exists().where(
+            ExtractionJob.invoice_id == Invoice.id,
+            ExtractionJob.status.in_(["queued", "running"])
+        )
+    )
+
+
+async def enqueue_waiting_duplicate(db: AsyncSession, invoice: Invoice) -> None:
+    """
+    Give one waiting duplicate its own job when the extracting invoice goes away
+
+    Called before deleting an invoice, whose job is deleted with it.
+
+    Args:
+        db: Open database session (the caller commits)
+        invoice: Invoice about to be deleted
+    """
+    if invoice.status != "extracting" or invoice.content_hash is None:
+        return
+    duplicate = await db.scalar(_waiting_duplicates(invoice).order_by(Invoice.id).limit(1))
+    if duplicate is not None:
+        enqueue_extraction(db, duplicate.id)
+
+
+async def _settle_duplicates(db: AsyncSession, invoice: Invoice) -> list[int]:
+    """Copy a finished extraction to the duplicates waiting on it; returns their ids"""
+    if invoice.content_hash is None:
+        return []
+    duplicates = (await db.scalars(_waiting_duplicates(invoice).with_for_update())).all()
+    for duplicate in duplicates:
+        duplicate.raw_ai_data = invoice.raw_ai_data
+        duplicate.status = invoice.status
+        duplicate.extracted_at = invoice.extracted_at
+        duplicate.error_message = invoice.error_message
+    return [duplicate.id for duplicate in duplicates]
+
+
+async def claim_next_job(worker_id: str) -> ClaimedJob | None:
+    """
+    Claim the next available job and take a lease on it
+
+    Args:
+        worker_id: Identifier of the claiming worker (host:pid:n)
+
+    Returns:
+        ClaimedJob, or None if the queue is empty
+    """
+    async with SessionLocal() as db:
+        row = (await db.execute(
+            CLAIM_JOB_SQL,
+            {"worker_id": worker_id, "lease_seconds": settings.EXTRACTION_LEASE_SECONDS}
+        )).first()
+
+        if row is None:
+            await db.commit()
+            return None
+
+        file_path = await db.scalar(select(Invoice.file_path).where(Invoice.id == row.invoice_id))
+        await db.commit()
+
+    queued_seconds = float(row.queued_seconds)
+    if row.attempts == 1:
+        # Later attempts include the retry backoff, which is not queueing
+        STAGE_SECONDS.labels("queue_wait").observe(queued_seconds)
+
+    return ClaimedJob(
+        job_id=row.id,
+        invoice_id=row.invoice_id,
+        file_path=file_path,
+        attempts=row.attempts,
+        queued_seconds=queued_seconds,
+        traceparent=row.traceparent
+    )
+
+
+async def renew_lease(job: ClaimedJob, worker_id: str) -> bool:
+    """
+    Push the job's lease EXTRACTION_LEASE_SECONDS into the future
+
+    Args:
+        job: Claimed job
+        worker_id: Worker that claimed the job
+
+    Returns:
+        False if the lease was already lost (expired and claimed by another worker)
+    """
+    async with SessionLocal() as db:
+        result = await db.execute(RENEW_LEASE_SQL, {
+            "job_id": job.job_id,
+            "worker_id": worker_id,
+            "lease_seconds": settings.EXTRACTION_LEASE_SECONDS
+        })
+        await db.commit()
+    return result.rowcount == 1
+
+
+async def _keep_lease(job: ClaimedJob, worker_id: str) -> None:
+    """Renew the lease every third of its length until cancelled or lost"""
+    while True:
+        await asyncio.sleep(settings.EXTRACTION_LEASE_SECONDS / 3)
+        try:
+            if not await renew_lease(job, worker_id):
+                logger.warning("Lease lost for extraction job %s", job.job_id)
+                return
+        except Exception:
+            # Keep trying: the lease is still valid for two more intervals
+            logger.exception("Failed to renew lease for extraction job %s", job.job_id)
+
+
+async def _lock_owned_job(db: AsyncSession, job: ClaimedJob, worker_id: str) -> ExtractionJob | None:
+    """Lock the job row if this worker still holds its lease"""
+    return await db.scalar(select(ExtractionJob).where(
+        ExtractionJob.id == job.job_id,
+        ExtractionJob.status == "running",
+        ExtractionJob.locked_by == worker_id
+    ).with_for_update())
+
+
+async def complete_job(job: ClaimedJob, worker_id: str, extraction_result: dict) -> None:
+    """
+    Store the extractor response on the invoice and finish the job
+
+    Results from a worker that lost its lease are discarded.
+
+    Args:
+        job: Claimed job
+        worker_id: Worker that claimed the job
+        extraction_result: Response from the AI extractor
+    """
+    with stage("store_result"):
+        status = await _store_result(job, worker_id, extraction_result)
+    EXTRACTIONS.labels(status).inc()
+    if status != "lease_lost":
+        STAGE_SECONDS.labels("end_to_end").observe(job.seconds_since_enqueued())
+
+
+async def _store_result(job: ClaimedJob, worker_id: str, extraction_result: dict) -> str:
+    async with SessionLocal() as db:
+        db_job = await _lock_owned_job(db, job, worker_id)
+        if db_job is None:
+            logger.warning("Lease lost for extraction job %s, discarding result", job.job_id)
+            await db.rollback()
+            return "lease_lost"
+
+        invoice = await db.get(Invoice, job.invoice_id)
+
+        if extraction_result.get("status") == "success":
+            invoice.raw_ai_data = extraction_result.get("raw_ai_data")
+            invoice.status = "extracted"
+            invoice.extracted_at = datetime.utcnow()
+            invoice.error_message = None
+            db_job.status = "done"
+        else:
+            invoice.status = "extraction_failed"
+            invoice.error_message = extraction_result.get("error", "Unknown extraction error")
+            db_job.status = "failed"
+            db_job.last_error = invoice.error_message
+
+        db_job.locked_by = None
+        db_job.locked_until = None
+        duplicates = await _settle_duplicates(db, invoice)
+        await db.commit()
+        await response_cache.invalidate(INVOICE, job.invoice_id, *duplicates)
+        return invoice.status
+
+
+async def retry_or_fail_job(job: ClaimedJob, worker_id: str, error: str, permanent: bool = False) -> None:
+    """
+    Requeue a job after a transient error, or fail it once attempts are exhausted
+
+    Retries back off exponentially by pushing locked_until into the future.
+
+    Args:
+        job: Claimed job
+        worker_id: Worker that claimed the job
+        error: Error message from the failed attempt
+        permanent: The error will not go away on retry - fail the job now
+    """
+    async with SessionLocal() as db:
+        db_job = await _lock_owned_job(db, job, worker_id)
+        if db_job is None:
+            await db.rollback()
+            EXTRACTIONS.labels("lease_lost").inc()
+            return
+
+        db_job.last_error = error
+        db_job.locked_by = None
+        duplicates: list[int] = []
+
+        if permanent or job.attempts >= settings.EXTRACTION_MAX_ATTEMPTS:
+            db_job.status = "failed"
+            db_job.locked_until = None
+            invoice = await db.get(Invoice, job.invoice_id)
+            invoice.status = "extraction_failed"
+            invoice.error_message = error
+            duplicates = await _settle_duplicates(db, invoice)
+        else:
+            backoff_seconds = 2 ** job.attempts
+            db_job.status = "queued"
+            db_job.locked_until = func.now() + timedelta(seconds=backoff_seconds)
+
+        await db.commit()
+        if db_job.status == "failed":
+            await response_cache.invalidate(INVOICE, job.invoice_id, *duplicates)
+            EXTRACTIONS.labels("extraction_failed").inc()
+            STAGE_SECONDS.labels("end_to_end").observe(job.seconds_since_enqueued())
+        else:
+            EXTRACTIONS.labels("retried").inc()
+
+
+async def release_job(job: ClaimedJob, worker_id: str) -> None:
+    """
+    Put a job back in the queue without counting the attempt
+
+    Used when the extractor was never called (circuit breaker open), so a
+    job is not failed for an outage it did not reach.
+
+    Args:
+        job: Claimed job
+        worker_id: Worker that claimed the job
+    """
+    async with SessionLocal() as db:
+        db_job = await _lock_owned_job(db, job, worker_id)
+        if db_job is None:
+            await db.rollback()
+            EXTRACTIONS.labels("lease_lost").inc()
+            return
+
+        db_job.status = "queued"
+        db_job.attempts = job.attempts - 1
+        db_job.locked_by = None
+        db_job.locked_until = None
+        await db.commit()
+    EXTRACTIONS.labels("deferred").inc()
+
+
+async def process_job(job: ClaimedJob, worker_id: str) -> None:
+    """
+    Run extraction for a claimed job and record the outcome
+
+    Runs in an "extraction_job" span that continues the trace of the upload.
+
+    Args:
+        job: Claimed job
+        worker_id: Worker that claimed the job
+    """
+    with tracer.start_as_current_span(
+        "extraction_job",
+        context=traceparent_context(job.traceparent),
+        kind=SpanKind.CONSUMER,
+        attributes={"invoice.id": job.invoice_id, "job.id": job.job_id, "job.attempt": job.attempts}
+    ):
+        await _process_job(job, worker_id)
+
+
+async def _extract(job: ClaimedJob, worker_id: str) -> dict:
+    """Call the AI extractor, renewing the job's lease until the call returns"""
+    heartbeat = asyncio.create_task(_keep_lease(job, worker_id))
+    try:
+        with stage("extractor_call"):
+            return await extract_invoice_data(
+                invoice_id=job.invoice_id,
+                file_path=job.file_path
+            )
+    finally:
+        heartbeat.cancel()
+        await asyncio.gather(heartbeat, return_exceptions=True)
+
+
+async def _process_job(job: ClaimedJob, worker_id: str) -> None:
+    if job.attempts > settings.EXTRACTION_MAX_ATTEMPTS:
+        # Lease expired repeatedly (e.g. the pod crashed every time) - give up
+        await retry_or_fail_job(
+            job, worker_id,
+            f"Extraction abandoned after {job.attempts - 1} attempts"
+        )
+        return
+
+    try:
+        extraction_result = await _extract(job, worker_id)
+    except CircuitOpenError:
+        # Another worker holds the half-open trial, or the circuit opened since the claim
+        await release_job(job, worker_id)
+        return
+    except HTTPException as e:
+        # AI service unreachable, timed out or failing - retry later; a 4xx for
+        # this file (not found, unsupported, unreadable) fails it right away
+        await retry_or_fail_job(job, worker_id, e.detail, permanent=not _is_transient_error(e.status_code))
+        return
+    except Exception as e:
+        await retry_or_fail_job(job, worker_id, f"Extraction error: {str(e)}")
+        return
+
+    await complete_job(job, worker_id, extraction_result)
+
+
+class ExtractionWorkerPool:
+    """Fixed-size pool of asyncio tasks that drain the extraction job queue"""
+
+    def __init__(self, concurrency: int, poll_interval: float):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self._tasks: list[asyncio.Task] = []
+        self._stopping = asyncio.Event()
+        self._wakeup = asyncio.Event()
+
+    def start(self) -> None:
+        """Start worker tasks on the running event loop"""
+        prefix = f"{socket.gethostname()}:{os.getpid()}"
+        self._stopping.clear()
+        self._tasks = [
+            asyncio.create_task(self._run(f"{prefix}:{n}"))
+            for n in range(self.concurrency)
+        ]
+
+    async def stop(self) -> None:
+        """Stop workers; in-flight jobs are picked up again after their lease expires"""
+        self._stopping.set()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def wake(self) -> None:
+        """Skip the poll delay after a job was enqueued in this process"""
+        self._wakeup.set()
+
+    async def _run(self, worker_id: str) -> None:
+        while not self._stopping.is_set():
+            if not breaker.accepting:
+                # Extractor is down, or another worker's trial request is testing
+                # it - leave jobs queued instead of claiming them
+                job = None
+            else:
+                try:
+                    job = await claim_next_job(worker_id)
+                except Exception:
+                    logger.exception("Failed to claim extraction job")
+                    job = None
+
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                continue
+
+            try:
+                await process_job(job, worker_id)
+            except Exception:
+                logger.exception("Extraction job %s failed", job.job_id)
+
+
+# Shared pool instance, started and stopped by app.main
+worker_pool = ExtractionWorkerPool(
+    concurrency=settings.EXTRACTION_WORKERS,
+    poll_interval=settings.EXTRACTION_POLL_INTERVAL
+)
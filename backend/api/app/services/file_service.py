@@ -1,61 +1,121 @@
+import hashlib
 import os
 import aiofiles
-from datetime import datetime
 from pathlib import Path
+from typing import Awaitable, Callable
 from uuid import uuid4
 from fastapi import UploadFile, HTTPException
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.config import get_settings
 from app.utils.validators import sanitize_filename, get_file_extension
 
 settings = get_settings()
 
+# Transaction-level advisory locks on a blob path (64-bit hash of the path).
+# Uploads hold the shared lock from placing the blob until their invoice row is
+# committed; deleting an invoice takes the exclusive lock to check for other
+# references and remove the blob, so it cannot remove a blob an upload is reusing.
+BLOB_LOCK_SHARED_SQL = text("SELECT pg_advisory_xact_lock_shared(hashtextextended(:path, 0))")
+BLOB_LOCK_EXCLUSIVE_SQL = text("SELECT pg_advisory_xact_lock(hashtextextended(:path, 0))")
 
-async def save_uploaded_file(file: UploadFile) -> tuple[str, int]:
+
+def blob_path(content_hash: str, ext: str) -> str:
     """
-    Save uploaded file to storage
+    Get content-addressed relative path for a file
 
     Args:
-        file: Uploaded file
+        content_hash: SHA-256 hex digest of the file content
+        ext: File extension without dot (e.g., 'pdf')
 
     Returns:
-        Tuple of (file_path, file_size)
+        Relative path, e.g. "blobs/ab/cd/abcd...ef.pdf"
+    """
+    filename = f"{content_hash}.{ext}" if ext.isalnum() else content_hash
+    return f"blobs/{content_hash[:2]}/{content_hash[2:4]}/{filename}"
 
-    Raises:
-        HTTPException: If file save fails
+
+async def lock_blob(db: AsyncSession, file_path: str, exclusive: bool = False) -> None:
     """
-    try:
-        # Generate file path: /storage/uploads/YYYY/MM/DD/uuid_filename.ext
-        now = datetime.now()
-        date_path = now.strftime("%Y/%m/%d")
+    Lock a blob path until the current transaction of db ends
+
+    Args:
+        db: Open database session (the lock is released by its commit or rollback)
+        file_path: Relative blob path
+        exclusive: Exclusive lock (removing the blob) instead of shared (using it)
+    """
+    await db.execute(BLOB_LOCK_EXCLUSIVE_SQL if exclusive else BLOB_LOCK_SHARED_SQL, {"path": file_path})
 
-        # Create unique filename
-        sanitized = sanitize_filename(file.filename)
-        ext = get_file_extension(sanitized)
-        unique_filename = f"{uuid4()}_{sanitized}"
 
-        # Full path
-        full_dir = Path(settings.STORAGE_PATH) / date_path
-        full_dir.mkdir(parents=True, exist_ok=True)
+async def save_stream(
+    read_chunk: Callable[[int], Awaitable[bytes]],
+    filename: str,
+    db: AsyncSession | None = None
+) -> tuple[str, int, str]:
+    """
+    Stream content to content-addressed storage
 
-        file_path = full_dir / unique_filename
-        relative_path = f"{date_path}/{unique_filename}"
+    Content is copied in UPLOAD_CHUNK_SIZE chunks into a temporary file, hashed
+    on the way, and atomically renamed to blobs/<hash>. If a blob with the same
+    content already exists the copy is discarded, so identical uploads share one
+    file. Memory stays bounded regardless of file size, readers never see a
+    partially written file, and copying stops as soon as MAX_FILE_SIZE is exceeded.
 
-        # Read and save file
-        content = await file.read()
-        file_size = len(content)
+    With db, a shared lock_blob is taken before the blob is created or reused and
+    held until the caller commits the invoice row that references it.
 
-        # Check file size
-        if file_size > settings.MAX_FILE_SIZE:
-            raise HTTPException(
-                status_code=413,
-                detail=f"File too large: {file_size} bytes. Maximum: {settings.MAX_FILE_SIZE} bytes"
-            )
+    Args:
+        read_chunk: Async callable returning up to n bytes, b"" at end of stream
+        filename: Original filename (used for the extension)
+        db: Session whose transaction will insert the referencing invoice
 
-        # Save file
-        async with aiofiles.open(file_path, 'wb') as f:
-            await f.write(content)
+    Returns:
+        Tuple of (file_path, file_size, sha256 hex digest)
 
-        return str(relative_path), file_size
+    Raises:
+        HTTPException: If file is too large or save fails
+    """
+    temp_path = None
+    try:
+        ext = get_file_extension(sanitize_filename(filename))
+
+        temp_dir = Path(settings.STORAGE_PATH) / "tmp"
+        temp_dir.mkdir(parents=True, exist_ok=True)
+        temp_path = temp_dir / f"{uuid4()}.part"
+
+        # Stream to temp file, hashing and counting as we go
+        digest = hashlib.sha256()
+        file_size = 0
+
+        async with aiofiles.open(temp_path, 'wb') as f:
+            while chunk := await read_chunk(settings.UPLOAD_CHUNK_SIZE):
+                file_size += len(chunk)
+
+                # Check file size
+                if file_size > settings.MAX_FILE_SIZE:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"File too large: more than {settings.MAX_FILE_SIZE} bytes. Maximum: {settings.MAX_FILE_SIZE} bytes"
+                    )
+
+                digest.update(chunk)
+                await f.write(chunk)
+
+        content_hash = digest.hexdigest()
+        relative_path = blob_path(content_hash, ext)
+        file_path = Path(settings.STORAGE_PATH) / relative_path
+
+        if db is not None:
+            await lock_blob(db, relative_path)
+        if file_path.exists():
+            # Identical content already stored - reuse existing blob
+            temp_path.unlink()
+        else:
+            file_path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(temp_path, file_path)
+        temp_path = None
+
+        return relative_path, file_size, content_hash
 
     except HTTPException:
         raise
@@ -64,6 +124,27 @@ async def save_uploaded_file(file: UploadFile) -> tuple[str, int]:
             status_code=500,
             detail=f"Failed to save file: {str(e)}"
         )
+    finally:
+        if temp_path is not None:
+            temp_path.unlink(missing_ok=True)
+
+
+async def save_uploaded_file(file: UploadFile, db: AsyncSession | None = None) -> tuple[str, int, str]:
+    """
+    Save uploaded file to content-addressed storage
+
+    Args:
+        file: Uploaded file
+        db: Session whose transaction will insert the referencing invoice
+            (see save_stream)
+
+    Returns:
+        Tuple of (file_path, file_size, sha256 hex digest)
+
+    Raises:
+        HTTPException: If file is too large or save fails
+    """
+    return await save_stream(file.read, file.filename, db)
 
 
 async def delete_file(file_path: str) -> None:
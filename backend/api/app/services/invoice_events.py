@@ -0,0 +1,215 @@
+"""
+Invoice status events from Postgres LISTEN/NOTIFY
+
+A trigger on invoices (migration a7c2e9f4b1d6) sends a NOTIFY on the
+invoice_status channel whenever an invoice is inserted or its status changes,
+whichever replica or worker made the change. Each API replica holds one
+dedicated connection that LISTENs on the channel and fans the events out to its
+subscribers (the SSE streams of GET /api/invoices/events), so clients learn about
+uploaded -> extracting -> extracted / extraction_failed without polling.
+
+Notifications sent while the listener is reconnecting are lost; every
+subscription is then ended so clients reconnect and re-read the current status.
+"""
+import asyncio
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import AsyncIterator
+
+import asyncpg
+from sqlalchemy.engine import make_url
+
+from app.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+CHANNEL = "invoice_status"
+
+# Statuses after which extraction is finished
+FINAL_STATUSES = {"extracted", "extraction_failed", "approved"}
+
+
+@dataclass(eq=False)
+class Subscription:
+    """
+    Events for a set of invoices (by id and/or batch), or for all invoices
+
+    The queue is bounded; a subscriber that falls behind is closed instead of
+    holding events in memory without limit. Closing replaces the pending events
+    with None, which ends the stream.
+    """
+    ids: set[int] = field(default_factory=set)
+    batch_id: str | None = None
+    queue: asyncio.Queue = field(default_factory=lambda: asyncio.Queue(settings.INVOICE_EVENTS_QUEUE_SIZE))
+    closed: bool = False
+
+    @property
+    def filtered(self) -> bool:
+        return bool(self.ids) or self.batch_id is not None
+
+    def matches(self, event: dict) -> bool:
+        if not self.filtered:
+            return True
+        return event["id"] in self.ids or (self.batch_id is not None and event.get("batch_id") == self.batch_id)
+
+    def close(self) -> None:
+        self.closed = True
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+
+class InvoiceEventListener:
+    """LISTEN connection of this replica and its subscribers"""
+
+    def __init__(self, reconnect_delay: float):
+        self.reconnect_delay = reconnect_delay
+        self.subscriptions: set[Subscription] = set()
+        self.listening = False  # False while (re)connecting: events would be missed
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        """Start listening on the running event loop"""
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Close the LISTEN connection and end all subscriptions"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self._close_all()
+
+    def subscribe(self, ids: set[int] | None = None, batch_id: str | None = None) -> Subscription:
+        """
+        Register a subscriber
+
+        Args:
+            ids: Invoice ids to follow
+            batch_id: Batch whose invoices to follow (no ids and no batch: all invoices)
+
+        Returns:
+            Subscription; pass it to unsubscribe when the client disconnects
+        """
+        subscription = Subscription(ids=ids or set(), batch_id=batch_id)
+        self.subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self.subscriptions.discard(subscription)
+
+    def publish(self, event: dict) -> None:
+        """Deliver an event to every matching subscriber of this replica"""
+        for subscription in list(self.subscriptions):
+            if subscription.closed or not subscription.matches(event):
+                continue
+            try:
+                subscription.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                logger.warning("Invoice event subscriber fell behind, closing its stream")
+                subscription.close()
+                self.unsubscribe(subscription)
+
+    def _close_all(self) -> None:
+        for subscription in list(self.subscriptions):
+            subscription.close()
+        self.subscriptions.clear()
+
+    def _on_notify(self, connection, pid: int, channel: str, payload: str) -> None:
+        try:
+            self.publish(json.loads(payload))
+        except (ValueError, KeyError, TypeError):
+            logger.warning("Ignoring malformed invoice event: %s", payload)
+
+    async def _run(self) -> None:
+        # Plain asyncpg connection outside the SQLAlchemy pool: LISTEN holds it for good
+        dsn = make_url(settings.DATABASE_URL).set(drivername="postgresql").render_as_string(hide_password=False)
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(dsn)
+                lost = asyncio.Event()
+                connection.add_termination_listener(lambda _: lost.set())
+                await connection.add_listener(CHANNEL, self._on_notify)
+                self.listening = True
+                logger.info("Listening for invoice status events")
+                while not lost.is_set():
+                    try:
+                        await asyncio.wait_for(lost.wait(), timeout=settings.INVOICE_EVENTS_HEARTBEAT)
+                    except asyncio.TimeoutError:
+                        # A half-open TCP connection never reports itself as closed
+                        await connection.execute("SELECT 1", timeout=settings.INVOICE_EVENTS_HEARTBEAT)
+                logger.warning("Invoice event connection lost")
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Invoice event listener failed")
+            finally:
+                self.listening = False
+                if connection is not None and not connection.is_closed():
+                    await connection.close()
+                # Events may have been missed: make clients reconnect and re-read
+                self._close_all()
+            await asyncio.sleep(self.reconnect_delay)
+
+
+# Shared listener instance, started and stopped by app.main
+invoice_events = InvoiceEventListener(reconnect_delay=settings.INVOICE_EVENTS_RECONNECT_DELAY)
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def event_stream(subscription: Subscription, current: list[dict]) -> AsyncIterator[str]:
+    """
+    Server-sent events body for a subscription
+
+    Sends the current status of the followed invoices, then a "status" event
+    per change. When following ids or a batch, requested ids that are not in
+    the snapshot are reported in one "not_found" event, and a "done" event ends
+    the stream once every invoice in the snapshot has a final status (at once
+    if there is none). Unfiltered streams keep no per-invoice state. Idle
+    streams get a comment every INVOICE_EVENTS_HEARTBEAT seconds so proxies
+    keep them open.
+
+    Args:
+        subscription: Subscription from invoice_events.subscribe (unsubscribed
+            when the stream ends or the client disconnects)
+        current: Status rows ({id, status, batch_id, error_message}) read
+            after subscribing
+
+    Yields:
+        SSE messages
+    """
+    statuses: dict[int, str] = {}  # followed invoices; filtered streams only
+    try:
+        yield "retry: 3000\n\n"
+        for event in current:
+            if subscription.filtered:
+                statuses[event["id"]] = event["status"]
+            yield _sse("status", event)
+
+        missing = sorted(subscription.ids - {event["id"] for event in current})
+        if missing:
+            # Unknown, deleted or historical (AI2) invoices: no status will ever come
+            yield _sse("not_found", {"ids": missing})
+
+        while True:
+            if subscription.filtered and all(s in FINAL_STATUSES for s in statuses.values()):
+                yield _sse("done", {"statuses": statuses})
+                return
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), timeout=settings.INVOICE_EVENTS_HEARTBEAT)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if event is None:
+                return
+            if subscription.filtered:
+                statuses[event["id"]] = event["status"]
+            yield _sse("status", event)
+    finally:
+        invoice_events.unsubscribe(subscription)
@@ -0,0 +1,299 @@
+"""
+Incrementally maintained invoice summaries for the AI2 transactions table
+
+invoice_summaries holds one row per fakturanr (first date, total, supplier,
+line count), so listing invoices no longer groups the whole transactions table.
+A refresh finds the invoices that have transactions imported after the stored
+watermark (invoice_summary_state.refreshed_until, via the imported_at index),
+recomputes just those groups and upserts them. New lines for an existing
+invoice therefore update its summary as well. imported_at is NOT NULL
+(defaulting to the insert time), so every imported row falls in some window.
+
+Deleted transactions are not seen by an incremental refresh; after a re-import
+(see cc/how-to-re-import-ai2-database.md) or any deletion, run a full rebuild:
+
+    python -m app.services.invoice_summary --full
+"""
+import argparse
+import asyncio
+import hashlib
+import logging
+import time
+from datetime import date, datetime
+from sqlalchemy import Select, select, and_, or_, tuple_, func, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.database import SessionLocalAI2
+from app.models.invoice_summary import InvoiceSummary
+from app.services.response_cache import response_cache, INVOICE_LIST
+from app.utils.query_plan import estimate_rows
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Lock the watermark row; a replica that finds it locked skips this round
+LOCK_STATE_SQL = text("""
+    SELECT refreshed_until FROM invoice_summary_state
+    WHERE id = 1
+    FOR UPDATE SKIP LOCKED
+""")
+
+UPSERT_CHANGED_SQL = text("""
+    INSERT INTO invoice_summaries (fakturanr, first_date, total, supplier, line_count)
+    SELECT fakturanr, min(ver_datum), sum(belopp), min(f_t), count(*)
+    FROM transactions
+    WHERE fakturanr IN (
+        SELECT DISTINCT fakturanr FROM transactions
+        WHERE imported_at > :since AND imported_at <= :until
+          AND fakturanr IS NOT NULL
+    )
+    GROUP BY fakturanr
+    ON CONFLICT (fakturanr) DO UPDATE SET
+        first_date = EXCLUDED.first_date,
+        total = EXCLUDED.total,
+        supplier = EXCLUDED.supplier,
+        line_count = EXCLUDED.line_count
+""")
+
+REBUILD_SQL = text("""
+    INSERT INTO invoice_summaries (fakturanr, first_date, total, supplier, line_count)
+    SELECT fakturanr, min(ver_datum), sum(belopp), min(f_t), count(*)
+    FROM transactions
+    WHERE fakturanr IS NOT NULL
+    GROUP BY fakturanr
+""")
+
+
+async def refresh_invoice_summaries(db: AsyncSession, full: bool = False) -> int | None:
+    """
+    Bring invoice_summaries up to date with the transactions table
+
+    Assumes imports do not overlap in time: rows of an import that is still
+    uncommitted while a later import's rows are summarized may be skipped (a
+    full rebuild picks them up).
+
+    Args:
+        db: AI2 database session
+        full: Rebuild every summary instead of only changed invoices
+
+    Returns:
+        Number of summary rows written, or None if another replica is refreshing
+    """
+    state = (await db.execute(LOCK_STATE_SQL)).first()
+    if state is None:
+        await db.rollback()
+        return None
+
+    until = await db.scalar(text("SELECT max(imported_at) FROM transactions"))
+
+    if full:
+        await db.execute(text("TRUNCATE invoice_summaries"))
+        written = (await db.execute(REBUILD_SQL)).rowcount
+        await db.execute(text("ANALYZE invoice_summaries"))
+    elif until is None or (state.refreshed_until is not None and until <= state.refreshed_until):
+        await db.rollback()
+        return 0
+    else:
+        written = (await db.execute(UPSERT_CHANGED_SQL, {
+            "since": state.refreshed_until or datetime.min,
+            "until": until
+        })).rowcount
+
+    await db.execute(
+        text("UPDATE invoice_summary_state SET refreshed_until = :until, refreshed_at = now() WHERE id = 1"),
+        {"until": until}
+    )
+    await db.commit()
+    _exact_count.clear()
+    if written:
+        await response_cache.invalidate_all(INVOICE_LIST)
+    return written
+
+
+# Historical ids start above the main database's int4 serial ids and stay below
+# 2**53, so they never collide with uploaded invoices and are exact in JavaScript
+HISTORICAL_ID_OFFSET = 2 ** 31
+HISTORICAL_ID_BITS = 52
+HISTORICAL_ID_KEY = b"vostra-ai2-invoice-id"
+
+
+def historical_invoice_id(fakturanr: str) -> int:
+    """
+    Stable numeric id for an AI2 invoice
+
+    A keyed BLAKE2b digest of the invoice number: the same in every process and
+    after restarts (unlike hash(), which is randomized per process).
+
+    Args:
+        fakturanr: AI2 invoice number
+
+    Returns:
+        Id in [HISTORICAL_ID_OFFSET, HISTORICAL_ID_OFFSET + 2**52)
+    """
+    digest = hashlib.blake2b(fakturanr.encode("utf-8"), digest_size=8, key=HISTORICAL_ID_KEY).digest()
+    return HISTORICAL_ID_OFFSET + (int.from_bytes(digest, "big") >> (64 - HISTORICAL_ID_BITS))
+
+
+def summary_filters(
+    date_from: date | None = None,
+    date_to: date | None = None,
+    supplier: str | None = None
+) -> list:
+    """
+    WHERE conditions for listing invoice summaries
+
+    Each condition is served by an index: the date range by
+    ix_invoice_summaries_first_date, the supplier prefix by
+    ix_invoice_summaries_supplier.
+
+    Args:
+        date_from: Earliest first_date (inclusive)
+        date_to: Latest first_date (inclusive)
+        supplier: Case-insensitive prefix of the supplier name
+
+    Returns:
+        List of SQLAlchemy conditions (empty without filters)
+    """
+    conditions = []
+    if date_from is not None:
+        conditions.append(InvoiceSummary.first_date >= date_from)
+    if date_to is not None:
+        conditions.append(InvoiceSummary.first_date <= date_to)
+    if supplier:
+        escaped = supplier.lower().replace("/", "//").replace("%", "/%").replace("_", "/_")
+        conditions.append(func.lower(InvoiceSummary.supplier).like(f"{escaped}%", escape="/"))
+    return conditions
+
+
+def invoice_list_query(
+    conditions: list,
+    after: tuple[date | None, str] | None = None,
+    skip: int = 0
+) -> Select:
+    """
+    Newest-first page query over invoice_summaries
+
+    Ordered by (first_date DESC NULLS FIRST, fakturanr DESC), matching
+    ix_invoice_summaries_first_date scanned backwards. With a keyset (the sort
+    key of the previous page's last row) the page starts right after it, so
+    deep pages cost the same as the first.
+
+    Args:
+        conditions: Filters from summary_filters
+        after: (first_date, fakturanr) of the previous page's last row
+        skip: Offset, only used without a keyset
+
+    Returns:
+        Select without LIMIT
+    """
+    query = select(InvoiceSummary).where(*conditions).order_by(
+        InvoiceSummary.first_date.desc().nulls_first(),
+        InvoiceSummary.fakturanr.desc()
+    )
+    if after is None:
+        return query.offset(skip)
+
+    first_date, fakturanr = after
+    if first_date is None:
+        # Undated invoices sort first; continue among them, then all dated ones
+        return query.where(or_(
+            and_(InvoiceSummary.first_date.is_(None), InvoiceSummary.fakturanr < fakturanr),
+            InvoiceSummary.first_date.isnot(None)
+        ))
+    return query.where(tuple_(InvoiceSummary.first_date, InvoiceSummary.fakturanr) < (first_date, fakturanr))
+
+
+# Planner row estimate, kept current by autovacuum/ANALYZE (-1 if never analyzed)
+ESTIMATE_COUNT_SQL = text("""
+    SELECT reltuples::bigint FROM pg_class WHERE oid = 'invoice_summaries'::regclass
+""")
+
+# Cached exact count of all invoices: {"value": int, "expires": monotonic seconds}
+_exact_count: dict[str, float] = {}
+
+
+async def count_invoice_summaries(db: AsyncSession, conditions: list, exact: bool = False) -> tuple[int, bool]:
+    """
+    Number of invoices in invoice_summaries matching the filters
+
+    The estimate is the planner's row count (constant time, typically within a
+    few percent without filters): pg_class.reltuples for the whole table, the
+    EXPLAIN row estimate with filters. The exact count of all invoices is cached
+    for AI2_COUNT_CACHE_SECONDS per replica and also used while no estimate
+    exists; exact filtered counts are not cached.
+
+    Args:
+        db: AI2 database session
+        conditions: Filters from summary_filters
+        exact: Return the exact count instead of the estimate
+
+    Returns:
+        Tuple of (count, is_estimate)
+    """
+    count_query = select(func.count()).select_from(InvoiceSummary).where(*conditions)
+
+    if conditions:
+        if exact:
+            return await db.scalar(count_query), False
+        return await estimate_rows(db, select(InvoiceSummary.fakturanr).where(*conditions)), True
+
+    if not exact:
+        estimate = await db.scalar(ESTIMATE_COUNT_SQL)
+        if estimate is not None and estimate > 0:
+            return estimate, True
+
+    if _exact_count.get("expires", 0) < time.monotonic():
+        _exact_count["value"] = await db.scalar(count_query)
+        _exact_count["expires"] = time.monotonic() + settings.AI2_COUNT_CACHE_SECONDS
+    return int(_exact_count["value"]), False
+
+
+class InvoiceSummaryRefresher:
+    """Background task that refreshes invoice_summaries at a fixed interval"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        """Start refreshing on the running event loop (interval 0 disables)"""
+        if self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the refresh task; an interrupted refresh is rolled back"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                async with SessionLocalAI2() as db:
+                    written = await refresh_invoice_summaries(db)
+                if written:
+                    logger.info("Refreshed %s invoice summaries", written)
+            except Exception:
+                logger.exception("Invoice summary refresh failed")
+            await asyncio.sleep(self.interval)
+
+
+# Shared refresher instance, started and stopped by app.main
+summary_refresher = InvoiceSummaryRefresher(interval=settings.AI2_SUMMARY_REFRESH_INTERVAL)
+
+
+async def _main(full: bool) -> None:
+    async with SessionLocalAI2() as db:
+        written = await refresh_invoice_summaries(db, full=full)
+    if written is None:
+        print("Another refresh is running")
+    else:
+        print(f"Wrote {written} invoice summaries")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refresh AI2 invoice summaries")
+    parser.add_argument("--full", action="store_true", help="rebuild all summaries (after a re-import or deletions)")
+    asyncio.run(_main(parser.parse_args().full))
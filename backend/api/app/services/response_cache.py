@@ -0,0 +1,382 @@
+"""
+Response cache for the invoice read endpoints
+
+Serialized bodies of GET /api/invoices and GET /api/invoices/{id} are cached by
+namespace and request parameters. The cache holds at most
+RESPONSE_CACHE_MAX_ENTRIES bodies (least recently used are evicted first) and
+every namespace has its own TTL.
+
+Backends (RESPONSE_CACHE_BACKEND):
+    memory: an OrderedDict in each process (default). An invalidation only
+        reaches the process that made the write; other workers and replicas
+        serve their copy until its TTL runs out.
+    sqlite: one SQLite file (RESPONSE_CACHE_SQLITE_PATH) shared by all worker
+        processes on a host, so an invalidation is seen by every worker there.
+
+Writes invalidate: upload, approve, delete and extraction results drop the
+invoice's entries, and a summary refresh that wrote rows drops every list page.
+Invalidating a key also drops its variants "<key>?<params>" (e.g. the same
+invoice with other ?fields=).
+Each namespace has a generation that every invalidation bumps; a body computed
+before an invalidation is not stored, so a slow read cannot bring back data
+that was invalidated while it ran.
+"""
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Awaitable, Callable
+from urllib.parse import urlencode
+
+from app.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Namespaces
+INVOICE = "invoice"  # GET /api/invoices/{id}, keyed by "<id>?<query parameters>"
+INVOICE_LIST = "invoice_list"  # GET /api/invoices, keyed by query parameters
+
+
+def _matches(key: str, keys: list[str]) -> bool:
+    """True if key is one of keys or a "<key>?<params>" variant of one"""
+    return any(key == k or key.startswith(f"{k}?") for k in keys)
+
+
+def cache_key(**params) -> str:
+    """
+    Canonical cache key for request parameters (None values are left out)
+
+    Args:
+        **params: Parsed request parameters
+
+    Returns:
+        Query-string style key, independent of parameter order
+    """
+    return urlencode(sorted((name, str(value)) for name, value in params.items() if value is not None))
+
+
+class MemoryBackend:
+    """LRU dict with per-entry expiry, local to this process"""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._entries: OrderedDict[tuple[str, str], tuple[float, bytes]] = OrderedDict()
+        self._generations: dict[str, int] = {}
+
+    async def lookup(self, namespace: str, key: str) -> tuple[bytes | None, int]:
+        generation = self._generations.get(namespace, 0)
+        entry = self._entries.get((namespace, key))
+        if entry is None:
+            return None, generation
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[(namespace, key)]
+            return None, generation
+        self._entries.move_to_end((namespace, key))
+        return value, generation
+
+    async def store(self, namespace: str, key: str, value: bytes, ttl: float, generation: int) -> bool:
+        if self._generations.get(namespace, 0) != generation:
+            return False
+        self._entries[(namespace, key)] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end((namespace, key))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return True
+
+    async def invalidate(self, namespace: str, keys: list[str] | None) -> None:
+        self._generations[namespace] = self._generations.get(namespace, 0) + 1
+        for entry in [
+            entry for entry in self._entries
+            if entry[0] == namespace and (keys is None or _matches(entry[1], keys))
+        ]:
+            del self._entries[entry]
+
+    async def size(self) -> int:
+        return len(self._entries)
+
+
+SQLITE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS entries (
+        namespace TEXT NOT NULL,
+        key TEXT NOT NULL,
+        value BLOB NOT NULL,
+        expires_at REAL NOT NULL,
+        accessed_at REAL NOT NULL,
+        PRIMARY KEY (namespace, key)
+    );
+    CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at);
+    CREATE TABLE IF NOT EXISTS generations (
+        namespace TEXT PRIMARY KEY,
+        generation INTEGER NOT NULL
+    );
+"""
+
+# A hit refreshes accessed_at at most this often, so reads rarely take the write lock
+SQLITE_TOUCH_INTERVAL = 1.0
+
+
+class SQLiteBackend:
+    """
+    LRU cache in a SQLite file shared by the worker processes of one host
+
+    Calls run in a thread (SQLite blocks while another process holds the write
+    lock). Timestamps are wall-clock seconds because they are compared across
+    processes.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str, max_entries: int):
+        self.path = path
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SQLITE_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    async def _run(self, fn: Callable, *args):
+        def locked():
+            with self._lock:
+                return fn(self._connect(), *args)
+        return await asyncio.to_thread(locked)
+
+    @staticmethod
+    @contextmanager
+    def _write(conn: sqlite3.Connection):
+        """Transaction holding the write lock from the start (no lock upgrade deadlocks)"""
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    @staticmethod
+    def _generation(conn: sqlite3.Connection, namespace: str) -> int:
+        row = conn.execute("SELECT generation FROM generations WHERE namespace = ?", (namespace,)).fetchone()
+        return row[0] if row else 0
+
+    def _lookup(self, conn: sqlite3.Connection, namespace: str, key: str) -> tuple[bytes | None, int]:
+        generation = self._generation(conn, namespace)
+        row = conn.execute(
+            "SELECT value, expires_at, accessed_at FROM entries WHERE namespace = ? AND key = ?",
+            (namespace, key)
+        ).fetchone()
+        if row is None:
+            return None, generation
+        value, expires_at, accessed_at = row
+        now = time.time()
+        if expires_at <= now:
+            conn.execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key))
+            return None, generation
+        if accessed_at < now - SQLITE_TOUCH_INTERVAL:
+            conn.execute(
+                "UPDATE entries SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                (now, namespace, key)
+            )
+        return value, generation
+
+    def _store(self, conn: sqlite3.Connection, namespace: str, key: str, value: bytes, ttl: float,
+               generation: int) -> bool:
+        now = time.time()
+        with self._write(conn):
+            if self._generation(conn, namespace) != generation:
+                return False
+            conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+                (namespace, key, value, now + ttl, now)
+            )
+            conn.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+            # max(0, ...): a negative LIMIT means no limit in SQLite
+            self.evictions += conn.execute("""
+                DELETE FROM entries WHERE rowid IN (
+                    SELECT rowid FROM entries ORDER BY accessed_at
+                    LIMIT max(0, (SELECT count(*) FROM entries) - ?)
+                )
+            """, (self.max_entries,)).rowcount
+        return True
+
+    def _invalidate(self, conn: sqlite3.Connection, namespace: str, keys: list[str] | None) -> None:
+        with self._write(conn):
+            conn.execute("""
+                INSERT INTO generations VALUES (?, 1)
+                ON CONFLICT (namespace) DO UPDATE SET generation = generation + 1
+            """, (namespace,))
+            if keys is None:
+                conn.execute("DELETE FROM entries WHERE namespace = ?", (namespace,))
+            else:
+                conn.executemany(
+                    "DELETE FROM entries WHERE namespace = ? AND (key = ? OR substr(key, 1, ?) = ?)",
+                    [(namespace, key, len(key) + 1, f"{key}?") for key in keys]
+                )
+
+    async def lookup(self, namespace: str, key: str) -> tuple[bytes | None, int]:
+        return await self._run(self._lookup, namespace, key)
+
+    async def store(self, namespace: str, key: str, value: bytes, ttl: float, generation: int) -> bool:
+        return await self._run(self._store, namespace, key, value, ttl, generation)
+
+    async def invalidate(self, namespace: str, keys: list[str] | None) -> None:
+        await self._run(self._invalidate, namespace, keys)
+
+    async def size(self) -> int:
+        return await self._run(lambda conn: conn.execute("SELECT count(*) FROM entries").fetchone()[0])
+
+
+class ResponseCache:
+    """
+    Cache of serialized responses with per-namespace TTLs and hit counters
+
+    Backend errors are logged and counted, never raised: a failed lookup falls
+    back to computing the response, a failed invalidation leaves the entry to
+    expire with its TTL.
+    """
+
+    def __init__(self, backend: MemoryBackend | SQLiteBackend, ttls: dict[str, float]):
+        self.backend = backend
+        self.ttls = ttls
+        self._counters: dict[str, dict[str, int]] = defaultdict(
+            lambda: {"hits": 0, "misses": 0, "stores": 0, "invalidations": 0, "errors": 0}
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend.max_entries > 0
+
+    async def get_or_set(self, namespace: str, key: str, compute: Callable[[], Awaitable[bytes]]) -> bytes:
+        """
+        Cached response body, computing and storing it on a miss
+
+        Args:
+            namespace: INVOICE or INVOICE_LIST
+            key: Request parameters (see cache_key)
+            compute: Coroutine function producing the body; exceptions propagate
+                and nothing is cached
+
+        Returns:
+            Response body
+        """
+        if not self.enabled or self.ttls[namespace] <= 0:
+            return await compute()
+
+        counters = self._counters[namespace]
+        try:
+            value, generation = await self.backend.lookup(namespace, key)
+        except Exception:
+            logger.exception("Response cache lookup failed")
+            counters["errors"] += 1
+            return await compute()
+
+        if value is not None:
+            counters["hits"] += 1
+            return value
+
+        counters["misses"] += 1
+        value = await compute()
+        try:
+            if await self.backend.store(namespace, key, value, self.ttls[namespace], generation):
+                counters["stores"] += 1
+        except Exception:
+            logger.exception("Response cache store failed")
+            counters["errors"] += 1
+        return value
+
+    async def invalidate(self, namespace: str, *keys: object) -> None:
+        """
+        Drop cached responses after a write
+
+        Args:
+            namespace: INVOICE or INVOICE_LIST
+            *keys: Keys to drop with their variants (e.g. invoice ids); no keys
+                drops nothing
+        """
+        if keys:
+            await self._invalidate(namespace, [str(key) for key in keys])
+
+    async def invalidate_all(self, namespace: str) -> None:
+        """
+        Drop every cached response of a namespace
+
+        Args:
+            namespace: INVOICE or INVOICE_LIST
+        """
+        await self._invalidate(namespace, None)
+
+    async def _invalidate(self, namespace: str, keys: list[str] | None) -> None:
+        if not self.enabled:
+            return
+        counters = self._counters[namespace]
+        try:
+            await self.backend.invalidate(namespace, keys)
+            counters["invalidations"] += 1
+        except Exception:
+            logger.exception("Response cache invalidation failed")
+            counters["errors"] += 1
+
+    async def stats(self) -> dict:
+        """
+        Hit rates and size of the cache
+
+        Counters are per process (a request reaches one worker); entries and
+        evictions are those of the backend, shared between workers for sqlite.
+
+        Returns:
+            Backend settings, entry count and per-namespace counters
+        """
+        namespaces = {}
+        for namespace, ttl in self.ttls.items():
+            counters = dict(self._counters[namespace])
+            lookups = counters["hits"] + counters["misses"]
+            counters["hit_rate"] = round(counters["hits"] / lookups, 4) if lookups else None
+            counters["ttl_seconds"] = ttl
+            namespaces[namespace] = counters
+
+        try:
+            entries = await self.backend.size()
+        except Exception:
+            logger.exception("Response cache size failed")
+            entries = None
+
+        return {
+            "backend": self.backend.name,
+            "enabled": self.enabled,
+            "max_entries": self.backend.max_entries,
+            "entries": entries,
+            "evictions": self.backend.evictions,
+            "namespaces": namespaces
+        }
+
+
+def _create_backend() -> MemoryBackend | SQLiteBackend:
+    if settings.RESPONSE_CACHE_BACKEND == "memory":
+        return MemoryBackend(settings.RESPONSE_CACHE_MAX_ENTRIES)
+    if settings.RESPONSE_CACHE_BACKEND == "sqlite":
+        return SQLiteBackend(settings.RESPONSE_CACHE_SQLITE_PATH, settings.RESPONSE_CACHE_MAX_ENTRIES)
+    raise ValueError(f"Unknown RESPONSE_CACHE_BACKEND: {settings.RESPONSE_CACHE_BACKEND!r}")
+
+
+# Shared cache instance, used by the invoice routes and invalidated by every write path
+response_cache = ResponseCache(_create_backend(), ttls={
+    INVOICE: settings.RESPONSE_CACHE_INVOICE_TTL,
+    INVOICE_LIST: settings.RESPONSE_CACHE_LIST_TTL
+})
@@ -0,0 +1,60 @@
+import hashlib
+from fastapi import Request, Response
+
+
+def compute_etag(body: bytes) -> str:
+    """
+    Strong ETag for a response body
+
+    Args:
+        body: Serialized response
+
+    Returns:
+        Quoted entity tag (changes whenever any byte of the body changes)
+    """
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def matches_if_none_match(request: Request, etag: str) -> bool:
+    """
+    Check a request's If-None-Match header against an ETag
+
+    Uses the weak comparison that RFC 9110 prescribes for If-None-Match, so a
+    W/ prefix added by a proxy still matches.
+
+    Args:
+        request: Incoming request
+        etag: Current entity tag of the resource
+
+    Returns:
+        True if the client's cached copy is current
+    """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+def conditional_response(request: Request, body: bytes) -> Response:
+    """
+    JSON response with a strong ETag, or 304 Not Modified if the client has it
+
+    Cache-Control: no-cache lets browsers keep the body but revalidate on every
+    request, so polling an unchanged resource costs a 304 without a body.
+
+    Args:
+        request: Incoming request (for If-None-Match)
+        body: Serialized JSON body
+
+    Returns:
+        200 with the JSON body, or an empty 304
+    """
+    etag = compute_etag(body)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if matches_if_none_match(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
@@ -0,0 +1,120 @@
+"""
+Prometheus metrics of the API process
+
+Exposed at GET /metrics (outside /api, so not routed by the public ingress).
+Stages timed with stage() are also trace spans (app.utils.tracing).
+Metrics live in this process: run one uvicorn worker per container, or point
+PROMETHEUS_MULTIPROC_DIR at a shared directory when running several.
+"""
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from prometheus_client import Counter, Histogram
+
+from app.utils.tracing import tracer
+
+# Stages range from sub-millisecond lookups to extractor calls of a minute or more
+STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+STAGE_SECONDS = Histogram(
+    "vostra_api_stage_duration_seconds",
+    "Duration of upload and extraction pipeline stages",
+    ["stage"],
+    buckets=STAGE_BUCKETS
+)
+
+UPLOADS = Counter(
+    "vostra_api_uploads_total",
+    "Uploaded files by result",
+    ["result"]  # queued | extracted (earlier extraction reused) | rejected
+)
+
+EXTRACTIONS = Counter(
+    "vostra_api_extractions_total",
+    "Extraction job outcomes",
+    ["status"]  # extracted | extraction_failed | retried | deferred (circuit open) | lease_lost
+)
+
+EXTRACTOR_CALLS = Counter(
+    "vostra_api_extractor_calls_total",
+    "Calls to the AI extractor service by outcome",
+    ["outcome"]  # ok | retried | circuit_open | timeout | unreachable | http_<status>
+)
+
+HTTP_REQUESTS = Counter(
+    "vostra_api_http_requests_total",
+    "HTTP requests by route template and status",
+    ["method", "route", "status"]
+)
+
+HTTP_SECONDS = Histogram(
+    "vostra_api_http_request_duration_seconds",
+    "Time until the response headers were sent, by route template",
+    ["method", "route"],
+    buckets=STAGE_BUCKETS
+)
+
+
+@contextmanager
+def stage(name: str, attributes: dict | None = None) -> Iterator[None]:
+    """
+    Time a pipeline stage into vostra_api_stage_duration_seconds and a span
+
+    Observed whether the stage succeeds or raises.
+
+    Args:
+        name: Stage label and span name (e.g. "save", "extractor_call")
+        attributes: Span attributes (e.g. {"invoice.id": 42})
+    """
+    started = time.perf_counter()
+    try:
+        with tracer.start_as_current_span(name, attributes=attributes):
+            yield
+    finally:
+        STAGE_SECONDS.labels(name).observe(time.perf_counter() - started)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware counting and timing HTTP requests
+
+    Labels use the route template (/api/invoices/{invoice_id}) so the number of
+    series stays bounded; unmatched paths are counted as "unmatched". Duration
+    runs until the response starts, which keeps long-lived SSE streams from
+    distorting the histogram. Plain ASGI rather than BaseHTTPMiddleware, which
+    would add a task and a memory stream to every request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+        timed = False
+
+        def observe() -> None:
+            route = scope.get("route")
+            template = getattr(route, "path", "unmatched")
+            HTTP_SECONDS.labels(scope["method"], template).observe(time.perf_counter() - started)
+            HTTP_REQUESTS.labels(scope["method"], template, str(status)).inc()
+
+        async def send_wrapper(message):
+            nonlocal status, timed
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                timed = True
+                observe()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if not timed:
+                # Failed before a response was started (unhandled exception)
+                observe()
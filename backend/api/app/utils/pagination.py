@@ -0,0 +1,42 @@
+import base64
+import binascii
+import json
+from datetime import date
+from fastapi import HTTPException
+
+
+def encode_cursor(first_date: date | None, fakturanr: str) -> str:
+    """
+    Encode the sort key of the last row on a page as an opaque cursor
+
+    Args:
+        first_date: Invoice date of the row (None sorts first)
+        fakturanr: Invoice number of the row (tie-breaker)
+
+    Returns:
+        URL-safe cursor token
+    """
+    key = [first_date.isoformat() if first_date else None, fakturanr]
+    return base64.urlsafe_b64encode(json.dumps(key, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[date | None, str]:
+    """
+    Decode a cursor from encode_cursor
+
+    Returns:
+        Tuple of (first_date, fakturanr)
+
+    Raises:
+        HTTPException: 400 if the cursor is malformed
+    """
+    try:
+        first_date, fakturanr = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(fakturanr, str):
+            raise ValueError("fakturanr must be a string")
+        return (date.fromisoformat(first_date) if first_date is not None else None), fakturanr
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        raise HTTPException(
+            status_code=400,
+            detail="Invalid cursor"
+        )
@@ -0,0 +1,40 @@
+import json
+from sqlalchemy import ClauseElement, Select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+async def explain(db: AsyncSession, query: ClauseElement) -> dict:
+    """
+    Planner output for a query, without executing it
+
+    The statement is compiled by the session's dialect and sent with its bound
+    parameters, so the plan is the one chosen for these values.
+
+    Args:
+        db: Open database session
+        query: SQLAlchemy statement
+
+    Returns:
+        Root plan node of EXPLAIN (FORMAT JSON)
+    """
+    compiled = query.compile(dialect=db.bind.dialect)
+    parameters = tuple(compiled.params[name] for name in compiled.positiontup or ())
+    result = await (await db.connection()).exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", parameters)
+    plan = result.scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]["Plan"]
+
+
+async def estimate_rows(db: AsyncSession, query: Select) -> int:
+    """
+    Planner's row estimate for a query (constant time, no rows are read)
+
+    Args:
+        db: Open database session
+        query: SQLAlchemy select
+
+    Returns:
+        Estimated number of rows
+    """
+    return int((await explain(db, query))["Plan Rows"])
@@ -0,0 +1,54 @@
+import orjson
+from fastapi import HTTPException
+
+from app.schemas.invoice import InvoiceResponse
+
+# Response fields in schema order; id is always included
+INVOICE_FIELDS = list(InvoiceResponse.model_fields)
+
+
+def dump_json(content) -> bytes:
+    """
+    Serialize a response body with orjson
+
+    Datetimes are rendered like Pydantic does (UTC as Z), so bodies match
+    model_dump_json output for the same values.
+
+    Args:
+        content: JSON-compatible value (dicts, lists, str, numbers, datetimes)
+
+    Returns:
+        UTF-8 JSON
+    """
+    return orjson.dumps(content, option=orjson.OPT_UTC_Z)
+
+
+def select_fields(fields: str | None, exclude: str | None) -> list[str]:
+    """
+    Resolve ?fields= and ?exclude= into the invoice fields to return
+
+    Args:
+        fields: Comma-separated fields to include (default: all)
+        exclude: Comma-separated fields to leave out
+
+    Returns:
+        Field names in schema order, always including id
+
+    Raises:
+        HTTPException: 400 if a name is not an InvoiceResponse field
+    """
+    included = _parse(fields) if fields else set(INVOICE_FIELDS)
+    excluded = _parse(exclude) if exclude else set()
+    excluded.discard("id")
+    return [name for name in INVOICE_FIELDS if (name in included or name == "id") and name not in excluded]
+
+
+def _parse(names: str) -> set[str]:
+    requested = {name.strip() for name in names.split(",") if name.strip()}
+    unknown = requested - set(INVOICE_FIELDS)
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown field(s): {', '.join(sorted(unknown))}. Available: {', '.join(INVOICE_FIELDS)}"
+        )
+    return requested
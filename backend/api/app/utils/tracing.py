@@ -0,0 +1,144 @@
+"""
+OpenTelemetry tracing of the API process
+
+Spans cover the FastAPI request, every SQL statement on both engines, the
+pipeline stages timed by app.utils.metrics.stage, and the httpx call to the AI
+extractor. That call carries a W3C traceparent header, so the extractor's spans
+(rendering, OpenAI) join the same trace. Extraction runs after the upload
+request has returned: the upload's traceparent is stored on the extraction job
+and the worker continues that trace, making one invoice one trace from upload
+to final status.
+
+TRACING_EXPORTER selects where spans go:
+    none  tracing off (default)
+    file  JSON lines appended to TRACING_FILE_PATH (see benchmarks/trace_breakdown.py)
+    otlp  OTLP/HTTP to TRACING_OTLP_ENDPOINT (a local collector, Jaeger, ...)
+"""
+from pathlib import Path
+from typing import Sequence
+
+from opentelemetry import trace
+from opentelemetry.context import Context
+from opentelemetry.propagate import extract, inject
+from opentelemetry.sdk.resources import SERVICE_NAME, Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter, SpanExporter
+from opentelemetry.sdk.trace.sampling import Decision, ParentBased, Sampler, SamplingResult, TraceIdRatioBased
+from opentelemetry.trace import SpanKind
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.config import get_settings
+
+settings = get_settings()
+
+# Proxy until setup_tracing installs the SDK provider; no-op if it never does
+tracer = trace.get_tracer("vostra-api")
+
+_provider: TracerProvider | None = None
+
+
+class _RootSampler(Sampler):
+    """
+    Sample new traces by ratio, except parentless client spans
+
+    Those are the SQL statements of worker polls and the summary refresher and
+    would otherwise each start a trace of their own.
+    """
+
+    def __init__(self, ratio: float):
+        self._ratio = TraceIdRatioBased(ratio)
+
+    def should_sample(self, parent_context, trace_id, name, kind=None, attributes=None, links=None, trace_state=None):
+        if kind == SpanKind.CLIENT:
+            return SamplingResult(Decision.DROP)
+        return self._ratio.should_sample(parent_context, trace_id, name, kind, attributes, links, trace_state)
+
+    def get_description(self) -> str:
+        return f"RootSampler{{{self._ratio.get_description()}}}"
+
+
+def _exporter() -> SpanExporter:
+    if settings.TRACING_EXPORTER == "file":
+        path = Path(settings.TRACING_FILE_PATH)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return ConsoleSpanExporter(
+            out=path.open("a", encoding="utf-8"),
+            formatter=lambda span: span.to_json(indent=None) + "\n"
+        )
+    if settings.TRACING_EXPORTER == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        return OTLPSpanExporter(endpoint=settings.TRACING_OTLP_ENDPOINT)
+    raise ValueError(f"Unknown TRACING_EXPORTER: {settings.TRACING_EXPORTER} (use none, file or otlp)")
+
+
+def setup_tracing(app, engines: Sequence[AsyncEngine]) -> None:
+    """
+    Install the tracer provider and instrument FastAPI, SQLAlchemy and httpx
+
+    Does nothing when TRACING_EXPORTER is "none". Call once, before the app
+    starts serving.
+
+    Args:
+        app: FastAPI application
+        engines: Async engines whose statements get spans
+    """
+    global _provider
+    if settings.TRACING_EXPORTER == "none":
+        return
+
+    from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
+    from opentelemetry.instrumentation.httpx import HTTPXClientInstrumentor
+    from opentelemetry.instrumentation.sqlalchemy import SQLAlchemyInstrumentor
+
+    _provider = TracerProvider(
+        resource=Resource.create({SERVICE_NAME: settings.TRACING_SERVICE_NAME}),
+        sampler=ParentBased(root=_RootSampler(settings.TRACING_SAMPLE_RATIO))
+    )
+    # Spans are exported from a background thread in batches, off the request path
+    _provider.add_span_processor(BatchSpanProcessor(_exporter()))
+    trace.set_tracer_provider(_provider)
+
+    # Health probes, scrapes and long-lived SSE streams are not worth a trace
+    FastAPIInstrumentor.instrument_app(
+        app,
+        tracer_provider=_provider,
+        excluded_urls="health,metrics,invoices/events"
+    )
+    SQLAlchemyInstrumentor().instrument(
+        engines=[engine.sync_engine for engine in engines],
+        tracer_provider=_provider
+    )
+    HTTPXClientInstrumentor().instrument(tracer_provider=_provider)
+
+
+def shutdown_tracing() -> None:
+    """Export the spans still buffered"""
+    if _provider is not None:
+        _provider.shutdown()
+
+
+def current_traceparent() -> str | None:
+    """
+    W3C traceparent of the active span
+
+    Returns:
+        Header value, or None if there is no active span (e.g. tracing is off)
+    """
+    carrier: dict[str, str] = {}
+    inject(carrier)
+    return carrier.get("traceparent")
+
+
+def traceparent_context(traceparent: str | None) -> Context | None:
+    """
+    Context continuing a trace from a stored traceparent
+
+    Args:
+        traceparent: Header value saved with current_traceparent, or None
+
+    Returns:
+        Context to start a child span in, or None to start a new trace
+    """
+    if not traceparent:
+        return None
+    return extract({"traceparent": traceparent})
@@ -18,16 +18,36 @@ def validate_file_type(file: UploadFile) -> None:
         )
 
 
+def validate_file_extension(filename: str) -> None:
+    """
+    Validate file type by extension (for files without a content type, e.g. in ZIP archives)
+
+    Raises:
+        HTTPException: If file extension is not allowed
+    """
+    if get_file_extension(filename) not in settings.ALLOWED_FILE_EXTENSIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid file type: {filename}. Allowed extensions: {', '.join(settings.ALLOWED_FILE_EXTENSIONS)}"
+        )
+
+
 def validate_file_size(file: UploadFile) -> None:
     """
     Validate uploaded file size
 
+    Rejects oversized uploads before they are copied to storage. file.size is set
+    by the multipart parser; when it is unknown, save_uploaded_file enforces the
+    limit while streaming.
+
     Raises:
         HTTPException: If file size exceeds maximum
     """
-    # Note: file.size is not always available, will check during read
-    # This is a placeholder for future implementation
-    pass
+    if file.size is not None and file.size > settings.MAX_FILE_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"File too large: {file.size} bytes. Maximum: {settings.MAX_FILE_SIZE} bytes"
+        )
 
 
 def get_file_extension(filename: str) -> str:
@@ -0,0 +1,71 @@
+"""
+Fill a scratch AI2 database with synthetic transactions
+
+Creates the transactions table (same columns as the AI2 export) if it is missing
+and inserts --rows rows, about --lines-per-invoice per fakturanr, spread over ten
+years and --suppliers suppliers. Refuses to touch a table that already has rows
+unless --append is given, so it cannot be pointed at the real AI2 data by mistake.
+
+Usage (from backend/api, AI2_DATABASE_URL pointing at a scratch database):
+    python -m benchmarks.ai2_seed --rows 2000000
+"""
+import argparse
+import time
+
+from sqlalchemy import create_engine, text
+
+from app.config import get_settings
+from app.database import BaseAI2
+from app.models.transaction import Transaction
+
+SEED_SQL = text("""
+    INSERT INTO transactions (id, vt, ver_datum, ver_nr, fakturanr, resk_nr, resk_nr_t,
+                              konto, f, f_t, kst, kst_t, belopp, imported_at)
+    SELECT n,
+           'LF',
+           date '2015-01-01' + ((n / :lines) % 3650)::int,
+           n / :lines,
+           'F' || (n / :lines),
+           (n / :lines) % :suppliers,
+           'Reskontra ' || (n / :lines) % :suppliers,
+           4000 + n % 50,
+           (n / :lines) % :suppliers,
+           'Leverantör ' || (n / :lines) % :suppliers,
+           n % 40,
+           'Kostnadsställe ' || n % 40,
+           round((random() * 10000)::numeric, 2),
+           now()
+    FROM generate_series(:first, :last) AS n
+""")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000, help="transactions to insert")
+    parser.add_argument("--lines-per-invoice", type=int, default=5)
+    parser.add_argument("--suppliers", type=int, default=500)
+    parser.add_argument("--append", action="store_true", help="insert even if the table already has rows")
+    args = parser.parse_args()
+
+    engine = create_engine(get_settings().AI2_DATABASE_URL)
+    BaseAI2.metadata.create_all(engine, tables=[Transaction.__table__])
+
+    with engine.begin() as conn:
+        first = conn.scalar(text("SELECT coalesce(max(id), 0) + 1 FROM transactions"))
+        if first > 1 and not args.append:
+            parser.error("transactions is not empty (use --append to add more rows)")
+
+        started = time.perf_counter()
+        conn.execute(SEED_SQL, {
+            "first": first,
+            "last": first + args.rows - 1,
+            "lines": args.lines_per_invoice,
+            "suppliers": args.suppliers
+        })
+        conn.execute(text("ANALYZE transactions"))
+
+    print(f"inserted {args.rows} transactions in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Latency of GET /api/invoices/{id} while slow list queries are running
+
+Runs two phases against a running API:
+  - idle:      only the GET /{id} probes
+  - list load: the same probes while --list-concurrency clients loop over
+               GET /api/invoices (the AI2 GROUP BY over all transactions)
+
+and reports p50/p95/p99/max probe latency for each. With a blocking database
+driver every list query stalls the event loop, so probe p99 approaches the list
+query time; with the async layer the probes only wait for their own query.
+
+The list query is only slow with realistic AI2 volumes; for a scratch database
+use benchmarks/ai2_seed.py first.
+
+Usage (from backend/api, with the API running):
+    python -m benchmarks.ai2_seed --rows 2000000
+    python -m benchmarks.db_latency --invoice-id 1 --duration 20
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def _probe(client: httpx.AsyncClient, invoice_id: int, deadline: float, samples: list[float]) -> None:
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        response = await client.get(f"/api/invoices/{invoice_id}")
+        response.raise_for_status()
+        samples.append(time.perf_counter() - started)
+
+
+async def _list_loop(client: httpx.AsyncClient, limit: int, deadline: float, samples: list[float]) -> None:
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        response = await client.get("/api/invoices", params={"limit": limit}, timeout=None)
+        response.raise_for_status()
+        samples.append(time.perf_counter() - started)
+
+
+async def _phase(args: argparse.Namespace, list_load: bool) -> tuple[list[float], list[float]]:
+    probes: list[float] = []
+    lists: list[float] = []
+    limits = httpx.Limits(max_connections=args.probe_concurrency + args.list_concurrency)
+
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60.0) as client:
+        deadline = time.perf_counter() + args.duration
+        tasks = [_probe(client, args.invoice_id, deadline, probes) for _ in range(args.probe_concurrency)]
+        if list_load:
+            tasks += [_list_loop(client, args.list_limit, deadline, lists) for _ in range(args.list_concurrency)]
+        await asyncio.gather(*tasks)
+
+    return probes, lists
+
+
+def _report(name: str, probes: list[float], lists: list[float]) -> None:
+    ms = lambda seconds: f"{seconds * 1000:8.1f}"
+    line = (f"{name:<10} {len(probes):>7} {ms(_percentile(probes, 50))} {ms(_percentile(probes, 95))} "
+            f"{ms(_percentile(probes, 99))} {ms(max(probes))}")
+    if lists:
+        line += f" {len(lists):>6} {ms(statistics.mean(lists))}"
+    print(line, flush=True)
+
+
+async def _run(args: argparse.Namespace) -> None:
+    async with httpx.AsyncClient(base_url=args.base_url) as client:
+        (await client.get(f"/api/invoices/{args.invoice_id}")).raise_for_status()
+
+    print(f"{'phase':<10} {'probes':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} "
+          f"{'lists':>6} {'list ms':>8}")
+    _report("idle", *await _phase(args, list_load=False))
+    _report("list load", *await _phase(args, list_load=True))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--invoice-id", type=int, required=True, help="existing invoice to probe")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds per phase")
+    parser.add_argument("--probe-concurrency", type=int, default=4)
+    parser.add_argument("--list-concurrency", type=int, default=2)
+    parser.add_argument("--list-limit", type=int, default=100)
+    args = parser.parse_args()
+
+    asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Fail if an AI2 query the API depends on cannot use an index
+
+Every query is planned (EXPLAIN, not executed) with enable_seqscan = off. The
+planner then only picks a Seq Scan when no index can serve the query at all, so
+the check does not depend on table sizes or statistics: a dropped index or a
+query change that defeats one shows up as a Seq Scan and the script exits 1.
+
+Checked: the invoice list (first page, cursor page, date range, supplier
+prefix), the filtered count, the incremental summary refresh, and transaction
+lookups by fakturanr, konto, resk_nr and ver_datum range.
+
+Usage (from backend/api, after `alembic -c alembic_ai2.ini upgrade head`):
+    python -m benchmarks.explain_check
+"""
+import asyncio
+import sys
+from datetime import date, datetime
+
+from sqlalchemy import TIMESTAMP, bindparam, func, select, text
+
+from app.database import SessionLocalAI2
+from app.models.invoice_summary import InvoiceSummary
+from app.models.transaction import Transaction
+from app.services.invoice_summary import UPSERT_CHANGED_SQL, invoice_list_query, summary_filters
+from app.utils.query_plan import explain
+
+
+def _queries() -> dict:
+    no_filters = summary_filters()
+    date_range = summary_filters(date_from=date(2020, 1, 1), date_to=date(2020, 3, 31))
+    supplier = summary_filters(supplier="Leverantör 4")
+    return {
+        "list first page": invoice_list_query(no_filters).limit(21),
+        "list cursor page": invoice_list_query(no_filters, after=(date(2020, 6, 1), "F1000")).limit(21),
+        "list deep undated cursor": invoice_list_query(no_filters, after=(None, "F1000")).limit(21),
+        "list date range": invoice_list_query(date_range).limit(21),
+        "list supplier prefix": invoice_list_query(supplier).limit(21),
+        "count date range": select(func.count()).select_from(InvoiceSummary).where(*date_range),
+        "refresh changed invoices": UPSERT_CHANGED_SQL.bindparams(
+            bindparam("since", datetime(2026, 1, 1), type_=TIMESTAMP),
+            bindparam("until", datetime(2026, 1, 2), type_=TIMESTAMP)
+        ),
+        "transactions by fakturanr": select(Transaction).where(Transaction.fakturanr == "F1000"),
+        "transactions by konto": select(Transaction).where(Transaction.konto == 4010),
+        "transactions by resk_nr": select(Transaction).where(Transaction.resk_nr == 42),
+        "transactions by date range": select(Transaction).where(
+            Transaction.ver_datum.between(date(2020, 1, 1), date(2020, 1, 31))
+        ),
+    }
+
+
+def _scans(plan: dict) -> list[str]:
+    """Scan nodes of a plan tree, e.g. 'Index Scan on invoice_summaries (ix_...)'"""
+    scans = []
+    if "Scan" in plan["Node Type"]:
+        target = plan.get("Relation Name") or plan.get("Alias") or plan.get("Index Name", "")
+        index = f" ({plan['Index Name']})" if "Relation Name" in plan and "Index Name" in plan else ""
+        scans.append(f"{plan['Node Type']} on {target}{index}")
+    for child in plan.get("Plans", []):
+        scans.extend(_scans(child))
+    return scans
+
+
+async def _check() -> bool:
+    passed = True
+    async with SessionLocalAI2() as db:
+        await db.execute(text("SET LOCAL enable_seqscan = off"))
+        for name, query in _queries().items():
+            scans = _scans(await explain(db, query))
+            ok = not any(scan.startswith("Seq Scan") for scan in scans)
+            passed &= ok
+            print(f"{'ok  ' if ok else 'FAIL'} {name:<28} {'; '.join(scans)}")
+        await db.rollback()
+    return passed
+
+
+def main() -> None:
+    if not asyncio.run(_check()):
+        print("Sequential scans found: a query no longer matches its index", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,440 @@
+"""
+Load test of the upload -> extraction -> approval path
+
+Drives a running stack (docker-compose.loadtest.yml at the repository root, or
+any deployment) at fixed arrival rates for --duration seconds:
+
+  upload   POST /api/invoices/upload with a small generated PDF that is unique
+           per request, so content deduplication never skips the extraction
+  list     GET /api/invoices (--list-query)
+  approve  POST /api/invoices/{id}/approve for uploads whose extraction finished
+
+Arrivals are open-loop: requests start on schedule whether or not earlier ones
+have returned, so a slow server shows up as latency instead of a lower request
+rate. At most --max-in-flight requests are open at once; arrivals beyond that
+are counted as dropped.
+
+Extraction progress is followed on GET /api/invoices/events, which gives the
+pipeline latency from upload to extracted / extraction_failed and the invoices
+ready for approval. After the run, unfinished extractions get up to --drain
+seconds; invoices still unfinished are reported as pending.
+
+The report has, per operation, throughput, latency percentiles and errors by
+HTTP status or exception, and for the pipeline the invoices extracted per
+minute and upload-to-extracted percentiles. --json writes it as JSON.
+--max-error-rate and --max-p99-ms make the exit status non-zero when exceeded,
+so a CI job can fail before deploy.
+
+Usage (from backend/api, with the load-test stack up):
+    python -m benchmarks.load_test --base-url http://localhost:8100 --duration 120 \\
+        --upload-rate 2 --list-rate 10 --approve-rate 1
+    python -m benchmarks.load_test --files ~/invoices --max-p99-ms upload=1000,list=300 --max-error-rate 0.01
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import sys
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import httpx
+
+FINAL_STATUSES = {"extracted", "extraction_failed"}
+OPERATIONS = ("upload", "list", "approve")
+
+
+@dataclass
+class OperationStats:
+    """Latencies and outcomes of one operation"""
+    latencies: list[float] = field(default_factory=list)  # seconds, successful requests
+    errors: Counter = field(default_factory=Counter)  # "HTTP 503", "ReadTimeout", ...
+    dropped: int = 0  # arrivals skipped at the in-flight limit
+    idle: int = 0  # approve arrivals with nothing ready to approve
+
+    @property
+    def requests(self) -> int:
+        return len(self.latencies) + sum(self.errors.values())
+
+
+@dataclass
+class Pipeline:
+    """Upload-to-final-status tracking, fed by upload responses and SSE events"""
+    uploaded_at: dict[int, float] = field(default_factory=dict)
+    finished: dict[int, tuple[str, float]] = field(default_factory=dict)  # id -> (status, time)
+    ready: deque = field(default_factory=deque)  # extracted ids not yet approved
+    events_connected: bool = False
+
+    def uploaded(self, invoice_id: int, started: float, status: str) -> None:
+        self.uploaded_at[invoice_id] = started
+        if status in FINAL_STATUSES:
+            # Identical content extracted earlier: finished at upload
+            self.finish(invoice_id, status, time.perf_counter())
+        elif invoice_id in self.finished and self.finished[invoice_id][0] == "extracted":
+            # The event arrived before the upload response
+            self.ready.append(invoice_id)
+
+    def finish(self, invoice_id: int, status: str, at: float) -> None:
+        if invoice_id in self.finished:
+            return
+        self.finished[invoice_id] = (status, at)
+        if status == "extracted" and invoice_id in self.uploaded_at:
+            self.ready.append(invoice_id)
+
+    def pending(self) -> list[int]:
+        return [invoice_id for invoice_id in self.uploaded_at if invoice_id not in self.finished]
+
+
+def _pdf(lines: list[str]) -> bytes:
+    """Minimal one-page PDF with a text layer"""
+    text = "".join(f"({line}) Tj 0 -18 Td " for line in lines)
+    stream = f"BT /F1 12 Tf 72 770 Td {text}ET".encode("latin-1")
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents 4 0 R "
+        b"/Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length " + str(len(stream)).encode() + b" >>\nstream\n" + stream + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    body = b"%PDF-1.4\n"
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(body))
+        body += f"{number} 0 obj\n".encode() + obj + b"\nendobj\n"
+    xref = len(body)
+    body += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    body += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    body += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return body
+
+
+def _generated_invoice(number: int) -> tuple[str, bytes]:
+    amount = random.randint(100, 100_000)
+    return f"loadtest-{number}.pdf", _pdf([
+        f"FAKTURA {number}-{random.getrandbits(48):012x}",
+        f"Fakturadatum 2026-01-{number % 28 + 1:02d}  Forfallodatum 2026-02-{number % 28 + 1:02d}",
+        f"Leverantor {number % 50} AB, Org.nr 556{number % 1000:03d}-0000",
+        f"Konsulttjanster {amount // 1000 + 1} tim",
+        f"Att betala: {amount},00 SEK  varav moms {amount // 5},00 SEK",
+    ])
+
+
+def _sample_invoice(paths: list[Path], number: int) -> tuple[str, bytes]:
+    path = paths[number % len(paths)]
+    # A trailing comment after %%EOF changes the content hash, not the document
+    return path.name, path.read_bytes() + f"\n%loadtest {random.getrandbits(128):032x}\n".encode()
+
+
+def _percentile(values: list[float], percent: float) -> float:
+    # Nearest rank
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(percent / 100 * len(ordered)) - 1)]
+
+
+def _summary(values: list[float]) -> dict:
+    if not values:
+        return {}
+    return {
+        "p50_ms": round(_percentile(values, 50) * 1000, 1),
+        "p90_ms": round(_percentile(values, 90) * 1000, 1),
+        "p95_ms": round(_percentile(values, 95) * 1000, 1),
+        "p99_ms": round(_percentile(values, 99) * 1000, 1),
+        "max_ms": round(max(values) * 1000, 1),
+    }
+
+
+class LoadTest:
+    def __init__(self, args):
+        self.args = args
+        self.stats = {name: OperationStats() for name in OPERATIONS}
+        self.pipeline = Pipeline()
+        self.in_flight = 0
+        self.tasks: set[asyncio.Task] = set()
+        self.uploads = 0
+        self.started = 0.0
+        self.samples = sorted(Path(args.files).glob("*.pdf")) if args.files else []
+        if args.files and not self.samples:
+            raise SystemExit(f"No PDF files in {args.files}")
+        self.client = httpx.AsyncClient(
+            base_url=args.base_url,
+            timeout=args.timeout,
+            # One more connection for the event stream
+            limits=httpx.Limits(max_connections=args.max_in_flight + 1, max_keepalive_connections=args.max_in_flight + 1)
+        )
+
+    async def _timed(self, name: str, request) -> httpx.Response | None:
+        stats = self.stats[name]
+        started = time.perf_counter()
+        try:
+            response = await request()
+        except httpx.HTTPError as e:
+            stats.errors[type(e).__name__] += 1
+            return None
+        if response.status_code >= 400:
+            stats.errors[f"HTTP {response.status_code}"] += 1
+            return None
+        stats.latencies.append(time.perf_counter() - started)
+        return response
+
+    async def _upload(self) -> None:
+        self.uploads += 1
+        number = self.uploads
+        filename, content = (
+            _sample_invoice(self.samples, number) if self.samples else _generated_invoice(number)
+        )
+        started = time.perf_counter()
+        response = await self._timed("upload", lambda: self.client.post(
+            "/api/invoices/upload", files={"file": (filename, content, "application/pdf")}
+        ))
+        if response is not None:
+            invoice = response.json()
+            self.pipeline.uploaded(invoice["id"], started, invoice["status"])
+
+    async def _list(self) -> None:
+        await self._timed("list", lambda: self.client.get(f"/api/invoices?{self.args.list_query}"))
+
+    async def _approve(self) -> None:
+        if not self.pipeline.ready:
+            self.stats["approve"].idle += 1
+            return
+        invoice_id = self.pipeline.ready.popleft()
+        await self._timed("approve", lambda: self.client.post(
+            f"/api/invoices/{invoice_id}/approve",
+            json={"validated_data": {"approved_by": "load_test"}}
+        ))
+
+    async def _run_request(self, name: str) -> None:
+        try:
+            await getattr(self, f"_{name}")()
+        finally:
+            self.in_flight -= 1
+
+    async def drive(self, name: str, rate: float, until: float) -> None:
+        """Start requests at rate per second until the deadline (open loop)"""
+        if rate <= 0:
+            return
+        next_at = time.perf_counter()
+        while True:
+            gap = random.expovariate(rate) if self.args.arrival == "poisson" else 1 / rate
+            next_at += gap
+            if next_at >= until:
+                return
+            await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+            if self.in_flight >= self.args.max_in_flight:
+                self.stats[name].dropped += 1
+                continue
+            self.in_flight += 1
+            task = asyncio.create_task(self._run_request(name))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def follow_events(self) -> None:
+        """Record final statuses from the SSE stream, reconnecting when it ends"""
+        while True:
+            try:
+                async with self.client.stream("GET", "/api/invoices/events", timeout=None) as response:
+                    response.raise_for_status()
+                    self.pipeline.events_connected = True
+                    event, data = None, None
+                    async for line in response.aiter_lines():
+                        if line.startswith("event:"):
+                            event = line[6:].strip()
+                        elif line.startswith("data:"):
+                            data = line[5:].strip()
+                        elif not line and event == "status" and data:
+                            payload = json.loads(data)
+                            if payload["status"] in FINAL_STATUSES:
+                                self.pipeline.finish(payload["id"], payload["status"], time.perf_counter())
+                            event, data = None, None
+            except httpx.HTTPError:
+                pass
+            self.pipeline.events_connected = False
+            await asyncio.sleep(1.0)
+
+    async def reconcile(self) -> None:
+        """Read the status of invoices without a final event (events missed while reconnecting)"""
+        for invoice_id in self.pipeline.pending():
+            try:
+                response = await self.client.get(f"/api/invoices/{invoice_id}?fields=status")
+            except httpx.HTTPError:
+                continue
+            if response.status_code == 200 and response.json()["status"] in FINAL_STATUSES:
+                # Finish time unknown: counted, but not in the latency percentiles
+                self.pipeline.finish(invoice_id, response.json()["status"], float("nan"))
+
+    async def wait_ready(self) -> None:
+        """Wait for /health to answer (the stack may still be starting)"""
+        deadline = time.perf_counter() + self.args.startup_timeout
+        while True:
+            try:
+                if (await self.client.get("/health")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            if time.perf_counter() > deadline:
+                raise SystemExit(f"{self.args.base_url} not healthy after {self.args.startup_timeout:g} s")
+            await asyncio.sleep(1.0)
+
+    async def run(self) -> dict:
+        await self.wait_ready()
+        events = asyncio.create_task(self.follow_events())
+        for _ in range(50):
+            if self.pipeline.events_connected:
+                break
+            await asyncio.sleep(0.1)
+        else:
+            print("warning: event stream not connected, pipeline latency comes from the final status check",
+                  file=sys.stderr)
+
+        started = self.started = time.perf_counter()
+        until = started + self.args.duration
+        await asyncio.gather(
+            self.drive("upload", self.args.upload_rate, until),
+            self.drive("list", self.args.list_rate, until),
+            self.drive("approve", self.args.approve_rate, until),
+        )
+        if self.tasks:
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+        elapsed = time.perf_counter() - started
+
+        drain_until = time.perf_counter() + self.args.drain
+        while self.pipeline.pending() and time.perf_counter() < drain_until:
+            await asyncio.sleep(0.5)
+        events.cancel()
+        await asyncio.gather(events, return_exceptions=True)
+        await self.reconcile()
+        await self.client.aclose()
+        return self.report(elapsed)
+
+    def report(self, elapsed: float) -> dict:
+        operations = {}
+        for name, stats in self.stats.items():
+            operations[name] = {
+                "requests": stats.requests,
+                "ok": len(stats.latencies),
+                "throughput_rps": round(len(stats.latencies) / elapsed, 2),
+                "error_rate": round(sum(stats.errors.values()) / stats.requests, 4) if stats.requests else 0.0,
+                "errors": dict(stats.errors),
+                "dropped": stats.dropped,
+                "idle": stats.idle,
+                **_summary(stats.latencies),
+            }
+
+        ours = {
+            invoice_id: finished for invoice_id, finished in self.pipeline.finished.items()
+            if invoice_id in self.pipeline.uploaded_at
+        }
+        # Finish times are NaN for invoices whose final event was missed
+        finish_times = {invoice_id: at for invoice_id, (_, at) in ours.items() if not math.isnan(at)}
+        durations = [at - self.pipeline.uploaded_at[invoice_id] for invoice_id, at in finish_times.items()]
+        statuses = Counter(status for status, _ in ours.values())
+        extracted = statuses.get("extracted", 0)
+        # Over the time from the first upload to the last finished extraction
+        busy = max(finish_times.values(), default=self.started) - self.started
+        pipeline = {
+            "uploaded": len(self.pipeline.uploaded_at),
+            "extracted": extracted,
+            "extraction_failed": statuses.get("extraction_failed", 0),
+            "pending": len(self.pipeline.pending()),
+            "extracted_per_minute": round(extracted / busy * 60, 1) if extracted and busy > 0 else 0.0,
+            **_summary(durations),
+        }
+        return {"duration_s": round(elapsed, 1), "operations": operations, "pipeline": pipeline}
+
+
+def _print_report(report: dict) -> None:
+    print(f"\n{report['duration_s']} s")
+    header = f"{'operation':<10} {'requests':>8} {'ok':>7} {'req/s':>7} {'p50':>8} {'p90':>8} {'p95':>8} {'p99':>8} {'max':>8}  errors"
+    print(header)
+    for name, op in report["operations"].items():
+        if not op["requests"] and not op["dropped"]:
+            continue
+        errors = ", ".join(f"{kind}: {count}" for kind, count in sorted(op["errors"].items())) or "-"
+        if op["dropped"]:
+            errors += f" (dropped {op['dropped']})"
+        print(
+            f"{name:<10} {op['requests']:>8} {op['ok']:>7} {op['throughput_rps']:>7} "
+            f"{op.get('p50_ms', 0):>8} {op.get('p90_ms', 0):>8} {op.get('p95_ms', 0):>8} "
+            f"{op.get('p99_ms', 0):>8} {op.get('max_ms', 0):>8}  {errors}"
+        )
+    p = report["pipeline"]
+    print(
+        f"\npipeline: {p['uploaded']} uploaded, {p['extracted']} extracted, {p['extraction_failed']} failed, "
+        f"{p['pending']} pending; {p['extracted_per_minute']} extracted/min"
+    )
+    if "p50_ms" in p:
+        print(
+            f"upload -> final status ms: p50 {p['p50_ms']}  p90 {p['p90_ms']}  p95 {p['p95_ms']}  "
+            f"p99 {p['p99_ms']}  max {p['max_ms']}"
+        )
+
+
+def _check_thresholds(report: dict, max_error_rate: float | None, max_p99: dict[str, float]) -> list[str]:
+    failures = []
+    for name, op in report["operations"].items():
+        if max_error_rate is not None and op["error_rate"] > max_error_rate:
+            failures.append(f"{name} error rate {op['error_rate']:.2%} > {max_error_rate:.2%}")
+        if name in max_p99 and op.get("p99_ms", 0) > max_p99[name]:
+            failures.append(f"{name} p99 {op['p99_ms']} ms > {max_p99[name]:g} ms")
+    if "pipeline" in max_p99 and report["pipeline"].get("p99_ms", 0) > max_p99["pipeline"]:
+        failures.append(f"pipeline p99 {report['pipeline']['p99_ms']} ms > {max_p99['pipeline']:g} ms")
+    return failures
+
+
+def _parse_limits(value: str) -> dict[str, float]:
+    limits = {}
+    for item in filter(None, value.split(",")):
+        name, _, ms = item.partition("=")
+        if name not in (*OPERATIONS, "pipeline") or not ms:
+            raise argparse.ArgumentTypeError(f"expected op=ms with op in {', '.join((*OPERATIONS, 'pipeline'))}")
+        limits[name] = float(ms)
+    return limits
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8100")
+    parser.add_argument("--duration", type=float, default=60.0, help="seconds of load")
+    parser.add_argument("--upload-rate", type=float, default=1.0, help="uploads per second")
+    parser.add_argument("--list-rate", type=float, default=5.0, help="list requests per second")
+    parser.add_argument("--approve-rate", type=float, default=0.5, help="approvals per second")
+    parser.add_argument("--arrival", choices=["constant", "poisson"], default="poisson")
+    parser.add_argument("--list-query", default="limit=20", help="query string of GET /api/invoices")
+    parser.add_argument("--files", help="directory of sample PDFs to upload instead of generated ones")
+    parser.add_argument("--max-in-flight", type=int, default=200)
+    parser.add_argument("--timeout", type=float, default=30.0, help="seconds per request")
+    parser.add_argument("--drain", type=float, default=60.0, help="seconds to wait for pending extractions")
+    parser.add_argument("--startup-timeout", type=float, default=120.0, help="seconds to wait for /health")
+    parser.add_argument("--seed", type=int, help="random seed for arrivals and invoice contents "
+                        "(rerun against a fresh database: repeated files reuse earlier extractions)")
+    parser.add_argument("--json", help="also write the report to this file")
+    parser.add_argument("--max-error-rate", type=float, help="fail if any operation's error rate exceeds this")
+    parser.add_argument("--max-p99-ms", type=_parse_limits, default={},
+                        help="fail if p99 exceeds these, e.g. upload=1000,list=300,pipeline=30000")
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    print(
+        f"{args.base_url}: {args.duration:g} s at upload {args.upload_rate:g}/s, list {args.list_rate:g}/s, "
+        f"approve {args.approve_rate:g}/s ({args.arrival} arrivals)"
+    )
+    report = asyncio.run(LoadTest(args).run())
+    _print_report(report)
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2))
+
+    failures = _check_thresholds(report, args.max_error_rate, args.max_p99_ms)
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Serialization time and size of one invoice list page
+
+Builds a page of uploaded invoices in memory (no database) whose raw_ai_data
+and user_validated_data have --lines invoice lines each, shaped like the
+extractor output, and times the ways a page can be turned into JSON:
+
+  pydantic + json:     validate into InvoiceListResponse, dump to Python and
+                       json.dumps (FastAPI's default path for response_model)
+  pydantic dump_json:  validate and model_dump_json
+  orjson:              plain dicts of the ORM attributes and orjson (the
+                       invoice routes)
+  orjson summary:      the same with ?exclude=raw_ai_data,user_validated_data
+
+Usage (from backend/api):
+    python -m benchmarks.serialization --page-size 100 --lines 100
+"""
+import argparse
+import json
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+
+from app.models.invoice import Invoice
+from app.schemas.invoice import InvoiceListResponse, InvoiceResponse
+from app.utils.serialization import dump_json, select_fields
+
+
+def _invoice_data(number: int, lines: int) -> dict:
+    return {
+        "invoice_number": f"INV-{number}",
+        "invoice_date": "2026-01-15",
+        "due_date": "2026-02-14",
+        "supplier": {"name": "Leverantör AB", "org_number": "556000-0000", "vat_number": "SE556000000001"},
+        "buyer": {"name": "Vostra Kommun", "org_number": "212000-0000"},
+        "currency": "SEK",
+        "total_amount": 12500.0,
+        "vat_amount": 2500.0,
+        "lines": [
+            {
+                "description": f"Artikel {line} med en längre beskrivning",
+                "quantity": 2,
+                "unit": "st",
+                "unit_price": 62.5,
+                "amount": 125.0,
+                "vat_rate": 25,
+                "vat_amount": 31.25,
+                "cost_center": "4010",
+            }
+            for line in range(lines)
+        ],
+    }
+
+
+def _page(page_size: int, lines: int) -> list[Invoice]:
+    created = datetime(2026, 1, 15, 8, 30, tzinfo=timezone.utc)
+    return [
+        Invoice(
+            id=number,
+            created_at=created,
+            updated_at=created + timedelta(seconds=5),
+            extracted_at=created + timedelta(seconds=4),
+            approved_at=None,
+            status="extracted",
+            original_filename=f"faktura-{number}.pdf",
+            file_type="pdf",
+            file_path=f"blobs/ab/cd/{number:064x}.pdf",
+            file_size=250_000,
+            content_hash=f"{number:064x}",
+            batch_id=None,
+            raw_ai_data=_invoice_data(number, lines),
+            user_validated_data=_invoice_data(number, lines),
+            error_message=None,
+        )
+        for number in range(1, page_size + 1)
+    ]
+
+
+def _pydantic_json(invoices: list[Invoice]) -> bytes:
+    page = InvoiceListResponse(invoices=[InvoiceResponse.model_validate(i) for i in invoices], total=len(invoices))
+    return json.dumps(page.model_dump(mode="json"), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _pydantic_dump_json(invoices: list[Invoice]) -> bytes:
+    page = InvoiceListResponse(invoices=[InvoiceResponse.model_validate(i) for i in invoices], total=len(invoices))
+    return page.model_dump_json().encode("utf-8")
+
+
+def _orjson(names: list[str]):
+    def serialize(invoices: list[Invoice]) -> bytes:
+        return dump_json({
+            "invoices": [{name: getattr(invoice, name) for name in names} for invoice in invoices],
+            "total": len(invoices),
+            "total_is_estimate": False,
+            "next_cursor": None
+        })
+    return serialize
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--lines", type=int, default=100, help="invoice lines per JSONB blob")
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    invoices = _page(args.page_size, args.lines)
+    methods = {
+        "pydantic + json": _pydantic_json,
+        "pydantic dump_json": _pydantic_dump_json,
+        "orjson": _orjson(select_fields(None, None)),
+        "orjson summary": _orjson(select_fields(None, "raw_ai_data,user_validated_data")),
+    }
+
+    print(f"{args.page_size} invoices per page, {args.lines} lines per JSONB blob, median of {args.repeat} runs")
+    print(f"{'method':<20} {'ms/page':>9} {'KB/page':>9}")
+    for name, serialize in methods.items():
+        timings = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            body = serialize(invoices)
+            timings.append(time.perf_counter() - started)
+        print(f"{name:<20} {statistics.median(timings) * 1000:>9.2f} {len(body) / 1024:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Break one invoice down end to end from exported trace files
+
+Reads the span files written with TRACING_EXPORTER=file by the API and the AI
+extractor (JSON lines), picks a trace and prints its span tree with the start
+offset and duration of every span:
+
+    upload request -> SQL -> extraction_job (worker) -> extractor_call
+        -> HTTP POST /extract -> pdf_text / pdf_render / openai_wait / openai_call ...
+
+Usage (from backend/api):
+    python -m benchmarks.trace_breakdown storage/vostra-invoice-web/traces/api.jsonl \\
+        ../ai-extractor/traces/ai-extractor.jsonl --invoice-id 42
+    python -m benchmarks.trace_breakdown api.jsonl ai-extractor.jsonl   # slowest trace
+"""
+import argparse
+import json
+from collections import defaultdict
+from datetime import datetime
+
+
+def _time(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def _load(paths: list[str]) -> dict[str, list[dict]]:
+    traces: dict[str, list[dict]] = defaultdict(list)
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                span = json.loads(line)
+                span["start"] = _time(span["start_time"])
+                span["end"] = _time(span["end_time"])
+                span["service"] = span.get("resource", {}).get("attributes", {}).get("service.name", "?")
+                traces[span["context"]["trace_id"]].append(span)
+    return traces
+
+
+def _duration(spans: list[dict]) -> float:
+    return (max(s["end"] for s in spans) - min(s["start"] for s in spans)).total_seconds()
+
+
+def _pick(traces: dict[str, list[dict]], trace_id: str | None, invoice_id: int | None) -> str | None:
+    if trace_id:
+        trace_id = trace_id if trace_id.startswith("0x") else f"0x{trace_id}"
+        return trace_id if trace_id in traces else None
+    candidates = traces
+    if invoice_id is not None:
+        candidates = {
+            tid: spans for tid, spans in traces.items()
+            if any(s.get("attributes", {}).get("invoice.id") == invoice_id for s in spans)
+        }
+    if not candidates:
+        return None
+    return max(candidates, key=lambda tid: _duration(candidates[tid]))
+
+
+def _print_tree(spans: list[dict]) -> None:
+    ids = {s["context"]["span_id"] for s in spans}
+    children: dict[str | None, list[dict]] = defaultdict(list)
+    for span in spans:
+        parent = span.get("parent_id")
+        children[parent if parent in ids else None].append(span)
+    origin = min(s["start"] for s in spans)
+
+    def walk(parent: str | None, depth: int) -> None:
+        for span in sorted(children[parent], key=lambda s: s["start"]):
+            offset = (span["start"] - origin).total_seconds() * 1000
+            duration = (span["end"] - span["start"]).total_seconds() * 1000
+            failed = " ERROR" if span.get("status", {}).get("status_code") == "ERROR" else ""
+            print(f"{offset:>10.1f} {duration:>10.1f}  {span['service']:<20} {'  ' * depth}{span['name']}{failed}")
+            walk(span["context"]["span_id"], depth + 1)
+
+    print(f"{'start ms':>10} {'dur ms':>10}  {'service':<20} span")
+    walk(None, 0)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="+", help="span files (JSON lines) of the API and the extractor")
+    parser.add_argument("--trace-id", help="trace to show (hex)")
+    parser.add_argument("--invoice-id", type=int, help="show the slowest trace of this invoice")
+    args = parser.parse_args()
+
+    traces = _load(args.files)
+    trace_id = _pick(traces, args.trace_id, args.invoice_id)
+    if trace_id is None:
+        raise SystemExit("No matching trace")
+
+    spans = traces[trace_id]
+    print(f"trace {trace_id}: {len(spans)} spans, {_duration(spans) * 1000:.1f} ms")
+    _print_tree(spans)
+
+
+if __name__ == "__main__":
+    main()
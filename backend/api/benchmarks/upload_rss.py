@@ -0,0 +1,92 @@
+"""
+Peak-RSS benchmark for concurrent uploads through save_uploaded_file
+
+Each mode runs in a fresh subprocess so ru_maxrss is not shared between runs:
+  - buffered:  the previous implementation (await file.read() of the whole body)
+  - streaming: the current chunked save_uploaded_file
+
+Uploads are backed by temporary files on disk, like Starlette's spooled
+multipart files once they exceed the in-memory threshold.
+
+Usage (from backend/api):
+    python -m benchmarks.upload_rss --uploads 8 --size-mb 50
+"""
+import argparse
+import asyncio
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def _buffered_save(file, storage_path: str) -> int:
+    """Previous save_uploaded_file: read everything, then write"""
+    import aiofiles
+    content = await file.read()
+    async with aiofiles.open(os.path.join(storage_path, file.filename), 'wb') as f:
+        await f.write(content)
+    return len(content)
+
+
+async def _run_mode(mode: str, uploads: int, size_mb: int) -> None:
+    from starlette.datastructures import UploadFile
+    from app.services.file_service import save_uploaded_file
+    from app.config import get_settings
+
+    settings = get_settings()
+    chunk = os.urandom(1024 * 1024)
+
+    sources = []
+    for n in range(uploads):
+        source = tempfile.TemporaryFile()
+        for _ in range(size_mb):
+            source.write(chunk)
+        source.seek(0)
+        sources.append(UploadFile(file=source, filename=f"invoice_{n}.pdf", size=size_mb * 1024 * 1024))
+
+    baseline = _peak_rss_mb()
+    started = time.perf_counter()
+
+    if mode == "buffered":
+        os.makedirs(settings.STORAGE_PATH, exist_ok=True)
+        await asyncio.gather(*(_buffered_save(f, settings.STORAGE_PATH) for f in sources))
+    else:
+        await asyncio.gather(*(save_uploaded_file(f) for f in sources))
+
+    elapsed = time.perf_counter() - started
+    peak = _peak_rss_mb()
+    print(f"{mode:<10} uploads={uploads} size={size_mb}MB "
+          f"peak_rss={peak:.0f}MB (+{peak - baseline:.0f}MB over baseline) time={elapsed:.2f}s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uploads", type=int, default=8, help="concurrent uploads")
+    parser.add_argument("--size-mb", type=int, default=50, help="size of each upload in MB")
+    parser.add_argument("--mode", choices=["buffered", "streaming"], help="run a single mode in-process")
+    args = parser.parse_args()
+
+    if args.mode:
+        asyncio.run(_run_mode(args.mode, args.uploads, args.size_mb))
+        return
+
+    with tempfile.TemporaryDirectory() as storage:
+        env = {**os.environ, "STORAGE_PATH": storage}
+        for mode in ("buffered", "streaming"):
+            subprocess.run(
+                [sys.executable, "-m", "benchmarks.upload_rss", "--mode", mode,
+                 "--uploads", str(args.uploads), "--size-mb", str(args.size_mb)],
+                env=env,
+                check=True
+            )
+
+
+if __name__ == "__main__":
+    main()